@@ -0,0 +1,17 @@
+# Generated by Django 2.2.28 on 2026-10-18 08:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0002_auto_20190225_1639'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['-modified', '-id'], name='article_modified_id_idx'),
+        ),
+    ]
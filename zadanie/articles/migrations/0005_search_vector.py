@@ -0,0 +1,35 @@
+# Generated by Django 2.2.28 on 2026-10-18 09:02
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+def set_search_vector(apps, schema_editor):
+    Article = apps.get_model('articles', 'Article')
+    search_vector = (
+        SearchVector('title', weight='A', config='english') +
+        SearchVector('body', weight='B', config='english')
+    )
+    Article.objects.update(search_vector=search_vector)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0004_is_published'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(set_search_vector, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='article',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='article_search_idx'),
+        ),
+    ]
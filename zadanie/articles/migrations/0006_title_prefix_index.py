@@ -0,0 +1,20 @@
+# Generated by Django 2.2.28 on 2026-10-18 09:57
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0005_search_vector'),
+    ]
+
+    operations = [
+        # Django 2.2 cannot declare an index over an expression. It has
+        # to match search.vectors.get_title_vector() to be used.
+        migrations.RunSQL(
+            "CREATE INDEX article_title_prefix_idx ON articles_article USING gin "
+            "(to_tsvector('simple'::regconfig, COALESCE(title, '')::text))",
+            "DROP INDEX article_title_prefix_idx",
+        ),
+    ]
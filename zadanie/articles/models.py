@@ -1,19 +1,22 @@
 from django.contrib.contenttypes.fields import GenericRelation
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.urls import reverse
 from django.utils import timezone
 
 from comments.models import Comment
+from search.vectors import update_search_vector
+from utilities.routers import read_from_replica
 from utilities.utilities import hundred_years_from_now
 
 
 class PublishedArticleManager(models.Manager):
 
     def get_queryset(self):
-        now = timezone.now()
         queryset = super().get_queryset()
-        queryset = queryset.filter(pub_date__lt = now)
-        return queryset
+        queryset = queryset.filter(is_published = True)
+        return read_from_replica(queryset)
 
 
 class Article(models.Model):
@@ -22,19 +25,45 @@ class Article(models.Model):
     created = models.DateTimeField(auto_now_add = True)
     modified = models.DateTimeField(auto_now = True)
     pub_date = models.DateTimeField(default = hundred_years_from_now)
+    is_published = models.BooleanField(default = False, editable = False)
     comments_count = models.PositiveSmallIntegerField(default = 0)
     comments = GenericRelation(Comment)
+    search_vector = SearchVectorField(null = True, editable = False)
 
     objects = models.Manager()
     published = PublishedArticleManager()
 
     class Meta:
         ordering = ['-modified']
+        indexes = [
+            models.Index(
+                fields = ['-modified', '-id'],
+                name = 'article_published_idx',
+                condition = models.Q(is_published = True),
+            ),
+            models.Index(
+                fields = ['pub_date'],
+                name = 'article_scheduled_idx',
+                condition = models.Q(is_published = False),
+            ),
+            GinIndex(
+                fields = ['search_vector'],
+                name = 'article_search_idx',
+            ),
+        ]
         verbose_name_plural = "Articles"
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        self.is_published = self.pub_date < timezone.now()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'pub_date' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'is_published'}
+        super().save(*args, **kwargs)
+        update_search_vector(self, kwargs.get('update_fields'))
+
     def get_absolut_url(self):
         viewname = 'articles:detail'
         kwargs = {'pk': self.id}
@@ -0,0 +1,18 @@
+from haystack import indexes
+
+from search.incremental import IncrementalIndexMixin
+
+from .models import Article
+
+
+class ArticleIndex(
+    IncrementalIndexMixin,
+    indexes.SearchIndex,
+    indexes.Indexable,
+):
+    text = indexes.CharField(document=True, use_template=True)
+    pub_date = indexes.DateTimeField(model_attr='pub_date')
+    title = indexes.CharField(model_attr='title')
+
+    def get_model(self):
+        return Article
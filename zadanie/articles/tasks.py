@@ -0,0 +1,10 @@
+from celery import task
+
+from utilities.publishing import publish_due
+
+from .models import Article
+
+
+@task
+def publish_due_articles():
+    return publish_due(Article)
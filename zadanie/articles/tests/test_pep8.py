@@ -12,6 +12,8 @@ class TestCodeFormat(TestCase):
             'articles/apps.py',
             'articles/forms.py',
             'articles/models.py',
+            'articles/signals.py',
+            'articles/tasks.py',
             'articles/urls.py',
             'articles/views.py',
         ]
@@ -1,13 +1,21 @@
+from unittest import mock
+
+from django.contrib.contenttypes.models import ContentType
 from django.test import RequestFactory, TestCase
 from django.urls import reverse
 from django.utils import timezone
 from django.views import generic, View
 
+from comments.counters import comments_count_buffer
+from comments.views import ObjectCommentsView
+from utilities.views import PublishedDetailMixin
+
 from django.contrib.auth.models import AnonymousUser
 
 from ..forms import ArticleForm
 from ..models import Article
 from ..views import (
+    ArticleCommentsView,
     ArticleCreateView,
     ArticleCreatedTemplateView,
     ArticleDeleteView,
@@ -124,13 +132,77 @@ class TestArticleCreatedTemplateView(TestCase):
         self.assertEqual(status_code_expected, status_code_given)
 
 
-class TestArticleDetailView(TestCase):
+class TestArticleCommentsView(TestCase):
+
+    def setUp(self):
+        in_the_past = timezone.now() - timezone.timedelta(days = 1)
+        self.article = Article.objects.create(
+            title = 'tre',
+            body = 'test',
+            pub_date = in_the_past,
+        )
+        self.page_size = ArticleCommentsView.paginate_by
+        for number in range(self.page_size + 1):
+            self.article.comments.create(body = 'comment %s' % number)
+        self.path = reverse(
+            'articles:comments',
+            kwargs = {'pk': self.article.pk},
+        )
 
     def test_view_inherits_from_correct_class(self):
-        class_expected = View
-        class_given = ArticleDetailView().__class__.__base__
+        class_expected = ObjectCommentsView
+        class_given = ArticleCommentsView.__base__
         self.assertEqual(class_expected, class_given)
 
+    def test_view_parent_queryset_attr(self):
+        queryset_expected = Article.published
+        queryset_given = ArticleCommentsView.parent_queryset
+        self.assertEqual(queryset_expected, queryset_given)
+
+    def test_view_returns_next_slice_of_comments(self):
+        response = self.client.get(self.path)
+        first_page = response.context['page_obj']
+        self.assertEqual(self.page_size, len(first_page.object_list))
+        self.assertTrue(first_page.has_next())
+        data = {'after': first_page.next_cursor}
+        response = self.client.get(self.path, data)
+        second_page = response.context['page_obj']
+        self.assertEqual(1, len(second_page.object_list))
+        self.assertFalse(second_page.has_next())
+        oldest_comment = self.article.comments.order_by('id').first()
+        self.assertEqual([oldest_comment], second_page.object_list)
+
+    def test_view_returns_404_for_not_published_object(self):
+        in_the_future = timezone.now() + timezone.timedelta(days = 1)
+        self.article.pub_date = in_the_future
+        self.article.save()
+        response = self.client.get(self.path)
+        status_code_expected = 404
+        status_code_given = response.status_code
+        self.assertEqual(status_code_expected, status_code_given)
+
+
+class TestArticleDetailView(TestCase):
+
+    def test_view_inherits_from_correct_classes(self):
+        class_expected_as_first_on_the_left = PublishedDetailMixin
+        class_expected_as_second_on_the_left = View
+        classes_given = ArticleDetailView.__bases__
+        self.assertEqual(
+            class_expected_as_first_on_the_left,
+            classes_given[0]
+        )
+        self.assertEqual(
+            class_expected_as_second_on_the_left,
+            classes_given[1]
+        )
+
+    def test_view_handlers_are_built_once(self):
+        handlers_first = ArticleDetailView.get_handlers()
+        handlers_second = ArticleDetailView.get_handlers()
+        self.assertIs(handlers_first['get'], handlers_second['get'])
+        self.assertIs(handlers_first['post'], handlers_second['post'])
+
     def test_view_get_method_runs_another_view(self):
         view_class_expected = ArticleDetailJustDisplayView
         url = '/fake-url'
@@ -142,7 +214,7 @@ class TestArticleDetailView(TestCase):
             pub_date = in_the_past,
         )
         pk = article_published.pk
-        response = ArticleDetailView.get(self, request, pk = pk)
+        response = ArticleDetailView.as_view()(request, pk = pk)
         view_used_after_get = response.__dict__['context_data']['view']
         view_class_given = view_used_after_get.__class__
         self.assertEqual(view_class_expected, view_class_given)
@@ -158,7 +230,7 @@ class TestArticleDetailView(TestCase):
             pub_date = in_the_past,
         )
         pk = article_published.pk
-        response = ArticleDetailView.post(self, request, pk = pk)
+        response = ArticleDetailView.as_view()(request, pk = pk)
         view_used_after_post = response.context_data['view']
         view_class_given = view_used_after_post.__class__
         self.assertEqual(view_class_expected, view_class_given)
@@ -203,10 +275,31 @@ class TestArticleDetailJustDisplayView(TestCase):
         )
         article_published.comments.create(body = 'few words')
         pk = article_published.pk
-        response = ArticleDetailView.get(self, request, pk = pk)
+        response = ArticleDetailView.as_view()(request, pk = pk)
         self.assertTrue(response.context_data['form'])
         self.assertTrue(response.context_data['comments'])
 
+    def test_get_context_data_paginates_comments(self):
+        url = '/fake-url'
+        request = RequestFactory().get(url)
+        in_the_past = timezone.now() - timezone.timedelta(days = 1)
+        article_published = Article.objects.create(
+            title = 'tre',
+            body = 'test',
+            pub_date = in_the_past,
+        )
+        page_size = ArticleCommentsView.paginate_by
+        for number in range(page_size + 1):
+            article_published.comments.create(body = 'comment %s' % number)
+        pk = article_published.pk
+        response = ArticleDetailView.as_view()(request, pk = pk)
+        comments = response.context_data['comments']
+        comments_page = response.context_data['comments_page']
+        self.assertEqual(page_size, len(comments))
+        self.assertTrue(comments_page.has_next())
+        newest_comment = article_published.comments.order_by('-id').first()
+        self.assertEqual(newest_comment, comments[0])
+
     def test_status_code(self):
         status_code_expected = 200
         url = '/fake-url'
@@ -219,7 +312,7 @@ class TestArticleDetailJustDisplayView(TestCase):
         )
         article_published.comments.create(body = 'few words')
         pk = article_published.pk
-        response = ArticleDetailView.get(self, request, pk = pk)
+        response = ArticleDetailView.as_view()(request, pk = pk)
         status_code_given = response.status_code
         self.assertEqual(status_code_expected, status_code_given)
 
@@ -229,6 +322,41 @@ class TestArticleDetailAddCommentView(TestCase):
     def setUp(self):
         self.view = ArticleDetailAddCommentView()
 
+    def tearDown(self):
+        with mock.patch('comments.tasks.flush_comments_count.delay'):
+            comments_count_buffer.flush()
+
+    def test_comment_post_costs_one_select_and_one_insert(self):
+        in_the_past = timezone.now() - timezone.timedelta(days = 1)
+        article_published = Article.objects.create(
+            title = 'tre',
+            body = 'test',
+            pub_date = in_the_past,
+        )
+        ContentType.objects.get_for_model(Article)
+        kwargs = {'pk': article_published.pk}
+        path = reverse('articles:detail', kwargs = kwargs)
+        data = {'body': 'few words'}
+        with self.assertNumQueries(2) as context:
+            response = self.client.post(path, data)
+        queries = [query['sql'] for query in context.captured_queries]
+        self.assertTrue(queries[0].startswith('SELECT'))
+        self.assertTrue(queries[1].startswith('INSERT'))
+        self.assertRedirects(response, path, fetch_redirect_response = False)
+        self.assertEqual(1, article_published.comments.count())
+
+    def test_comment_post_for_not_published_object_returns_404(self):
+        in_the_future = timezone.now() + timezone.timedelta(days = 1)
+        article_not_published = Article.objects.create(
+            title = 'tre',
+            body = 'test',
+            pub_date = in_the_future,
+        )
+        kwargs = {'pk': article_not_published.pk}
+        path = reverse('articles:detail', kwargs = kwargs)
+        response = self.client.post(path, {'body': 'few words'})
+        self.assertEqual(404, response.status_code)
+
     def test_view_inherits_from_correct_classes(self):
         class_expected_as_first_on_the_left = generic.detail.SingleObjectMixin
         class_expected_as_second_on_the_left = generic.FormView
@@ -373,6 +501,32 @@ class TestArticlesListView(TestCase):
         self.assertIn(object_supposed_to_be_in_queryset, queryset_given)
         self.assertNotIn(object_not_supposed_to_be_in_queryset, queryset_given)
 
+    def test_view_paginates_by_cursor(self):
+        in_the_past = timezone.now() - timezone.timedelta(days = 1)
+        for number in range(ArticlesListView.paginate_by + 1):
+            Article.objects.create(
+                title = 'title %s' % number,
+                body = 'published',
+                pub_date = in_the_past,
+            )
+        response = ArticlesListView.as_view()(self.request)
+        page = response.context_data['page_obj']
+        self.assertEqual(ArticlesListView.paginate_by, len(page.object_list))
+        self.assertTrue(page.has_next())
+        request = RequestFactory().get('/fake-url', {'after': page.next_cursor})
+        response = ArticlesListView.as_view()(request)
+        page = response.context_data['page_obj']
+        self.assertEqual(1, len(page.object_list))
+        self.assertFalse(page.has_next())
+        self.assertTrue(page.has_previous())
+
+    def test_view_returns_404_for_invalid_cursor(self):
+        path = reverse('articles:list')
+        response = self.client.get(path, {'after': 'broken'})
+        status_code_expected = 404
+        status_code_given = response.status_code
+        self.assertEqual(status_code_expected, status_code_given)
+
 
 class TestArticleUpdateView(TestCase):
 
@@ -20,6 +20,10 @@ urlpatterns = [
         '<int:pk>/',
         views.ArticleDetailView.as_view(),
         name = 'detail'),
+    path(
+        '<int:pk>/comments/',
+        views.ArticleCommentsView.as_view(),
+        name = 'comments'),
     path(
         '<int:pk>/delete/',
         views.ArticleDeleteView.as_view(),
@@ -1,10 +1,23 @@
+from django.conf import settings
 from django.http import HttpResponseRedirect
 from django.urls import reverse
+from django.utils.decorators import method_decorator
 from django.views import generic, View
 
+from comments.counters import count_comment
 from comments.forms import CommentForm
 from comments.models import Comment
-from comments.tasks import increase_comments_count
+from comments.views import ObjectCommentsView
+from utilities.cache import cache_page_versioned
+from utilities.cache import list_versions, object_versions
+from utilities.conditional import conditional_page
+from utilities.conditional import list_validators, object_validators
+from utilities.outages import serve_stale_on_error
+from utilities.outages import unavailable_on_database_error
+from utilities.pagination import keyset_paginate
+from utilities.routers import read_from_replica
+from utilities.surrogate import list_keys, object_keys, surrogate_keys
+from utilities.views import PublishedDetailMixin
 
 from .forms import ArticleForm
 from .models import Article
@@ -21,15 +34,12 @@ class ArticleCreatedTemplateView(generic.TemplateView):
     template_name = 'articles/article-created.html'
 
 
-class ArticleDetailView(View):
-
-    def get(self, request, *args, **kwargs):
-        view = ArticleDetailJustDisplayView.as_view()
-        return view(request, *args, **kwargs)
-
-    def post(self, request, *args, **kwargs):
-        view = ArticleDetailAddCommentView.as_view()
-        return view(request, *args, **kwargs)
+@method_decorator(
+    surrogate_keys(object_keys(Article)),
+    name = 'get',
+)
+class ArticleCommentsView(ObjectCommentsView):
+    parent_queryset = Article.published
 
 
 class ArticleDetailJustDisplayView(generic.DetailView):
@@ -40,13 +50,21 @@ class ArticleDetailJustDisplayView(generic.DetailView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['form'] = CommentForm()
-        context['comments'] = self.object.comments.all()
+        comments = read_from_replica(self.object.comments.all())
+        comments_page = keyset_paginate(comments, settings.COMMENTS_PAGE_SIZE)
+        context['comments'] = comments_page.object_list
+        context['comments_page'] = comments_page
+        context['comments_url'] = reverse(
+            'articles:comments',
+            kwargs = {'pk': self.object.pk},
+        )
         return context
 
 
 class ArticleDetailAddCommentView(
     generic.detail.SingleObjectMixin,
-    generic.FormView,):
+    generic.FormView,
+):
 
     form_class = CommentForm
     queryset = Article.published
@@ -54,7 +72,7 @@ class ArticleDetailAddCommentView(
 
     def form_valid(self, form):
         body = form.cleaned_data['body']
-        obj = self.get_object()
+        obj = self.object
         Comment.objects.create(
             content_object = obj,
             body = body,
@@ -62,13 +80,12 @@ class ArticleDetailAddCommentView(
         app_name = obj._meta.app_label
         model_name = obj._meta.model_name
         pk = obj.pk
-        increase_comments_count.delay(app_name, model_name, pk)
+        count_comment(app_name, model_name, pk)
         return HttpResponseRedirect(self.get_success_url())
 
     def get_success_url(self):
         viewname = 'articles:detail'
-        obj = self.get_object()
-        kwargs = {'pk': obj.pk}
+        kwargs = {'pk': self.object.pk}
         success_url = reverse(viewname, kwargs = kwargs)
         return success_url
 
@@ -77,6 +94,25 @@ class ArticleDetailAddCommentView(
         return super().post(request, *args, **kwargs)
 
 
+@method_decorator(
+    surrogate_keys(object_keys(Article)),
+    name = 'get',
+)
+@method_decorator(serve_stale_on_error, name = 'get')
+@method_decorator(unavailable_on_database_error, name = 'post')
+@method_decorator(
+    conditional_page(object_validators(Article.published)),
+    name = 'get',
+)
+@method_decorator(
+    cache_page_versioned(object_versions(Article)),
+    name = 'get',
+)
+class ArticleDetailView(PublishedDetailMixin, View):
+    display_view_class = ArticleDetailJustDisplayView
+    add_comment_view_class = ArticleDetailAddCommentView
+
+
 class ArticleDeleteView(generic.DeleteView):
     form_class = ArticleForm
     model = Article
@@ -88,15 +124,35 @@ class ArticleDeletedTemplateView(generic.TemplateView):
     template_name = 'articles/article-deleted.html'
 
 
+@method_decorator(
+    surrogate_keys(list_keys(Article)),
+    name = 'get',
+)
+@method_decorator(serve_stale_on_error, name = 'get')
+@method_decorator(
+    conditional_page(list_validators(Article.published)),
+    name = 'get',
+)
+@method_decorator(
+    cache_page_versioned(list_versions(Article)),
+    name = 'get',
+)
 class ArticlesListView(generic.ListView):
     context_object_name = 'articles'
     model = Article
+    paginate_by = 20
     template_name = 'articles/articles.html'
 
     def get_queryset(self):
         queryset = Article.published.all()
         return queryset
 
+    def paginate_queryset(self, queryset, page_size):
+        after = self.request.GET.get('after')
+        before = self.request.GET.get('before')
+        page = keyset_paginate(queryset, page_size, after, before)
+        return (None, page, page.object_list, page.has_other_pages())
+
 
 class ArticleUpdateView(generic.UpdateView):
     context_object_name = 'article'
@@ -0,0 +1,38 @@
+# Generated by Django 2.2.28 on 2026-10-18 09:00
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def set_is_published(apps, schema_editor):
+    Entry = apps.get_model('blog', 'Entry')
+    now = timezone.now()
+    Entry.objects.filter(pub_date__lt=now).update(is_published=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_modified_id_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='entry',
+            name='entry_modified_id_idx',
+        ),
+        migrations.AddField(
+            model_name='entry',
+            name='is_published',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(set_is_published, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='entry',
+            index=models.Index(condition=models.Q(is_published=True), fields=['-modified', '-id'], name='entry_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='entry',
+            index=models.Index(condition=models.Q(is_published=False), fields=['pub_date'], name='entry_scheduled_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 2.2.28 on 2026-10-18 09:02
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+def set_search_vector(apps, schema_editor):
+    Entry = apps.get_model('blog', 'Entry')
+    search_vector = (
+        SearchVector('title', weight='A', config='english') +
+        SearchVector('body', weight='B', config='english')
+    )
+    Entry.objects.update(search_vector=search_vector)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_is_published'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='entry',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(set_search_vector, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='entry',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='entry_search_idx'),
+        ),
+    ]
@@ -1,15 +1,18 @@
 from haystack import indexes
+
+from search.incremental import IncrementalIndexMixin
+
 from .models import Entry
 
 
-class EntryIndex(indexes.SearchIndex, indexes.Indexable):
+class EntryIndex(
+    IncrementalIndexMixin,
+    indexes.SearchIndex,
+    indexes.Indexable,
+):
     text = indexes.CharField(document=True, use_template=True)
     pub_date = indexes.DateTimeField(model_attr='pub_date')
-    title = indexes.CharField()
+    title = indexes.CharField(model_attr='title')
 
     def get_model(self):
         return Entry
-
-    def index_queryset(self, using=None):
-        """Used when the entire index for model is updated."""
-        return self.get_model().published.all()
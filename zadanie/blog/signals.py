@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from utilities.cache import invalidate_object
+
+from .models import Entry
+
+
+@receiver([post_save, post_delete], sender = Entry)
+def invalidate_entry_pages(sender, instance, **kwargs):
+    invalidate_object(sender, instance.pk)
@@ -0,0 +1,10 @@
+from celery import task
+
+from utilities.publishing import publish_due
+
+from .models import Entry
+
+
+@task
+def publish_due_entries():
+    return publish_due(Entry)
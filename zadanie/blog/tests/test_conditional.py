@@ -0,0 +1,68 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from utilities.testing import commit_immediately
+
+from ..models import Entry
+
+
+class TestEntryConditionalGet(TestCase):
+
+    def setUp(self):
+        commit_immediately(self)
+        cache.clear()
+        in_the_past = timezone.now() - timezone.timedelta(days = 1)
+        self.entry = Entry.objects.create(
+            title = 'Bologna',
+            pub_date = in_the_past,
+        )
+        self.detail_path = reverse('blog:entry-detail', kwargs = {'pk': self.entry.pk})
+        self.list_path = reverse('blog:entries')
+
+    def test_detail_revalidation_returns_304_without_a_query(self):
+        etag = self.client.get(self.detail_path)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                self.detail_path,
+                HTTP_IF_NONE_MATCH = etag,
+            )
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(b'', response.content)
+
+    def test_detail_revalidation_after_comment_returns_200(self):
+        etag = self.client.get(self.detail_path)['ETag']
+        self.entry.comments.create(body = 'Buonissimo')
+        response = self.client.get(self.detail_path, HTTP_IF_NONE_MATCH = etag)
+        self.assertEqual(200, response.status_code)
+        self.assertContains(response, 'Buonissimo')
+
+    def test_detail_revalidation_after_older_comment_delete_returns_200(self):
+        older = self.entry.comments.create(body = 'Primo')
+        self.entry.comments.create(body = 'Secondo')
+        etag = self.client.get(self.detail_path)['ETag']
+        older.delete()
+        response = self.client.get(self.detail_path, HTTP_IF_NONE_MATCH = etag)
+        self.assertEqual(200, response.status_code)
+        self.assertNotContains(response, 'Primo')
+
+    def test_list_revalidation_returns_304_without_a_query(self):
+        etag = self.client.get(self.list_path)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.list_path, HTTP_IF_NONE_MATCH = etag)
+        self.assertEqual(304, response.status_code)
+
+    def test_list_revalidation_after_edit_returns_200(self):
+        etag = self.client.get(self.list_path)['ETag']
+        self.entry.title = 'Parma'
+        self.entry.save()
+        response = self.client.get(self.list_path, HTTP_IF_NONE_MATCH = etag)
+        self.assertContains(response, 'Parma')
+
+    def test_detail_of_not_published_object_returns_404(self):
+        in_the_future = timezone.now() + timezone.timedelta(days = 1)
+        entry = Entry.objects.create(pub_date = in_the_future)
+        path = reverse('blog:entry-detail', kwargs = {'pk': entry.pk})
+        response = self.client.get(path, HTTP_IF_NONE_MATCH = '"x"')
+        self.assertEqual(404, response.status_code)
@@ -1,4 +1,6 @@
 from django.contrib.contenttypes.fields import GenericRelation
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.urls import reverse
 from django.test import TestCase
@@ -57,6 +59,55 @@ class TestEntry(TestCase):
         default_given = field.default
         self.assertEqual(default_expected, default_given)
 
+    def test_is_published_field(self):
+        field = Entry._meta.get_field('is_published')
+        field_type_expected = models.BooleanField
+        field_type_given = field.__class__
+        self.assertEqual(field_type_expected, field_type_given)
+        self.assertFalse(field.default)
+        self.assertFalse(field.editable)
+
+    def test_model_partial_indexes(self):
+        indexes = {
+            index.name: index for index in Entry._meta.indexes
+        }
+        published_index = indexes['entry_published_idx']
+        self.assertEqual(['-modified', '-id'], published_index.fields)
+        self.assertEqual(
+            models.Q(is_published = True),
+            published_index.condition,
+        )
+        scheduled_index = indexes['entry_scheduled_idx']
+        self.assertEqual(['pub_date'], scheduled_index.fields)
+        self.assertEqual(
+            models.Q(is_published = False),
+            scheduled_index.condition,
+        )
+
+    def test_search_vector_field(self):
+        field = Entry._meta.get_field('search_vector')
+        field_type_expected = SearchVectorField
+        field_type_given = field.__class__
+        self.assertEqual(field_type_expected, field_type_given)
+        self.assertTrue(field.null)
+        self.assertFalse(field.editable)
+
+    def test_model_search_index(self):
+        indexes = {index.name: index for index in Entry._meta.indexes}
+        search_index = indexes['entry_search_idx']
+        self.assertEqual(GinIndex, search_index.__class__)
+        self.assertEqual(['search_vector'], search_index.fields)
+
+    def test_save_sets_is_published_from_pub_date(self):
+        in_the_past = timezone.now() - timezone.timedelta(days = 1)
+        in_the_future = timezone.now() + timezone.timedelta(days = 1)
+        instance = Entry.objects.create(pub_date = in_the_future)
+        self.assertFalse(instance.is_published)
+        instance.pub_date = in_the_past
+        instance.save(update_fields = ['pub_date'])
+        instance.refresh_from_db()
+        self.assertTrue(instance.is_published)
+
     def test_comments_count_field(self):
         field = Entry._meta.get_field('comments_count')
         field_type_expected = models.PositiveSmallIntegerField
@@ -155,3 +206,8 @@ class TestPublishedEntryManager(TestCase):
         self.assertIn(entry_published_2, queryset_returned)
         self.assertNotIn(entry_not_published_1, queryset_returned)
         self.assertNotIn(entry_not_published_2, queryset_returned)
+
+    def test_manager_filters_on_is_published_only(self):
+        query = str(Entry.published.all().query)
+        self.assertIn('"is_published" = true', query.lower())
+        self.assertNotIn('pub_date" <', query)
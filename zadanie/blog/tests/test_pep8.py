@@ -12,6 +12,8 @@ class TestCodeFormat(TestCase):
             'blog/apps.py',
             'blog/forms.py',
             'blog/models.py',
+            'blog/signals.py',
+            'blog/tasks.py',
             'blog/urls.py',
             'blog/views.py',
         ]
@@ -0,0 +1,62 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from utilities.cache import get_list_version_name, get_object_version_name
+from utilities.cache import get_versions
+from utilities.testing import commit_immediately
+
+from ..models import Entry
+
+
+class TestEntryPageInvalidation(TestCase):
+
+    def setUp(self):
+        commit_immediately(self)
+        cache.clear()
+        in_the_past = timezone.now() - timezone.timedelta(days = 1)
+        self.entry = Entry.objects.create(
+            title = 'Bologna',
+            body = 'test',
+            pub_date = in_the_past,
+        )
+        self.names = [
+            get_object_version_name(Entry, self.entry.pk),
+            get_list_version_name(Entry),
+        ]
+
+    def test_save_bumps_versions(self):
+        object_version, list_version = get_versions(self.names)
+        self.entry.save()
+        versions_given = get_versions(self.names)
+        self.assertEqual([object_version + 1, list_version + 1], versions_given)
+
+    def test_delete_bumps_versions(self):
+        object_version, list_version = get_versions(self.names)
+        self.entry.delete()
+        versions_given = get_versions(self.names)
+        self.assertEqual([object_version + 1, list_version + 1], versions_given)
+
+    def test_edit_shows_up_immediately(self):
+        detail_path = reverse('blog:entry-detail', kwargs = {'pk': self.entry.pk})
+        list_path = reverse('blog:entries')
+        self.assertContains(self.client.get(detail_path), 'Bologna')
+        self.assertContains(self.client.get(list_path), 'Bologna')
+        self.entry.title = 'Parma'
+        self.entry.save()
+        self.assertContains(self.client.get(detail_path), 'Parma')
+        self.assertContains(self.client.get(list_path), 'Parma')
+
+    def test_repeated_read_is_served_from_cache(self):
+        detail_path = reverse('blog:entry-detail', kwargs = {'pk': self.entry.pk})
+        self.client.get(detail_path)
+        with self.assertNumQueries(0):
+            response = self.client.get(detail_path)
+        self.assertContains(response, 'Bologna')
+
+    def test_new_comment_shows_up_immediately(self):
+        detail_path = reverse('blog:entry-detail', kwargs = {'pk': self.entry.pk})
+        self.client.get(detail_path)
+        self.entry.comments.create(body = 'Buonissimo')
+        self.assertContains(self.client.get(detail_path), 'Buonissimo')
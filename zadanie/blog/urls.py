@@ -8,6 +8,10 @@ urlpatterns = [
         'entries/<int:pk>/',
         views.EntryDetailView.as_view(),
         name = 'entry-detail'),
+    path(
+        'entries/<int:pk>/comments/',
+        views.EntryCommentsView.as_view(),
+        name = 'entry-comments'),
     path(
         'entries/<int:pk>/delete/',
         views.EntryDeleteView.as_view(),
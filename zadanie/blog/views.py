@@ -1,10 +1,23 @@
+from django.conf import settings
 from django.http import HttpResponseRedirect
 from django.urls import reverse
+from django.utils.decorators import method_decorator
 from django.views import generic, View
 
+from comments.counters import count_comment
 from comments.forms import CommentForm
 from comments.models import Comment
-from comments.tasks import increase_comments_count
+from comments.views import ObjectCommentsView
+from utilities.cache import cache_page_versioned
+from utilities.cache import list_versions, object_versions
+from utilities.conditional import conditional_page
+from utilities.conditional import list_validators, object_validators
+from utilities.outages import serve_stale_on_error
+from utilities.outages import unavailable_on_database_error
+from utilities.pagination import keyset_paginate
+from utilities.routers import read_from_replica
+from utilities.surrogate import list_keys, object_keys, surrogate_keys
+from utilities.views import PublishedDetailMixin
 
 from .forms import EntryForm
 from .models import Entry
@@ -32,15 +45,12 @@ class EntryDeletedTemplateView(generic.TemplateView):
     template_name = 'blog/entry-deleted.html'
 
 
-class EntryDetailView(View):
-
-    def get(self, request, *args, **kwargs):
-        view = EntryDetailJustDisplayView.as_view()
-        return view(request, *args, **kwargs)
-
-    def post(self, request, *args, **kwargs):
-        view = EntryDetailAddCommentView.as_view()
-        return view(request, *args, **kwargs)
+@method_decorator(
+    surrogate_keys(object_keys(Entry)),
+    name = 'get',
+)
+class EntryCommentsView(ObjectCommentsView):
+    parent_queryset = Entry.published
 
 
 class EntryDetailJustDisplayView(generic.DetailView):
@@ -51,7 +61,14 @@ class EntryDetailJustDisplayView(generic.DetailView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['form'] = CommentForm()
-        context['comments'] = self.object.comments.all()
+        comments = read_from_replica(self.object.comments.all())
+        comments_page = keyset_paginate(comments, settings.COMMENTS_PAGE_SIZE)
+        context['comments'] = comments_page.object_list
+        context['comments_page'] = comments_page
+        context['comments_url'] = reverse(
+            'blog:entry-comments',
+            kwargs = {'pk': self.object.pk},
+        )
         return context
 
 
@@ -66,7 +83,7 @@ class EntryDetailAddCommentView(
 
     def form_valid(self, form):
         body = form.cleaned_data['body']
-        obj = self.get_object()
+        obj = self.object
         Comment.objects.create(
             content_object = obj,
             body = body,
@@ -74,13 +91,12 @@ class EntryDetailAddCommentView(
         app_name = obj._meta.app_label
         model_name = obj._meta.model_name
         pk = obj.pk
-        increase_comments_count.delay(app_name, model_name, pk)
+        count_comment(app_name, model_name, pk)
         return HttpResponseRedirect(self.get_success_url())
 
     def get_success_url(self):
         viewname = 'blog:entry-detail'
-        obj = self.get_object()
-        kwargs = {'pk': obj.pk}
+        kwargs = {'pk': self.object.pk}
         success_url = reverse(viewname, kwargs = kwargs)
         return success_url
 
@@ -89,15 +105,54 @@ class EntryDetailAddCommentView(
         return super().post(request, *args, **kwargs)
 
 
+@method_decorator(
+    surrogate_keys(object_keys(Entry)),
+    name = 'get',
+)
+@method_decorator(serve_stale_on_error, name = 'get')
+@method_decorator(unavailable_on_database_error, name = 'post')
+@method_decorator(
+    conditional_page(object_validators(Entry.published)),
+    name = 'get',
+)
+@method_decorator(
+    cache_page_versioned(object_versions(Entry)),
+    name = 'get',
+)
+class EntryDetailView(PublishedDetailMixin, View):
+    display_view_class = EntryDetailJustDisplayView
+    add_comment_view_class = EntryDetailAddCommentView
+
+
+@method_decorator(
+    surrogate_keys(list_keys(Entry)),
+    name = 'get',
+)
+@method_decorator(serve_stale_on_error, name = 'get')
+@method_decorator(
+    conditional_page(list_validators(Entry.published)),
+    name = 'get',
+)
+@method_decorator(
+    cache_page_versioned(list_versions(Entry)),
+    name = 'get',
+)
 class EntryListView(generic.ListView):
     context_object_name = 'entries'
     model = Entry
+    paginate_by = 20
     template_name = 'blog/entries.html'
 
     def get_queryset(self):
         queryset = Entry.published.all()
         return queryset
 
+    def paginate_queryset(self, queryset, page_size):
+        after = self.request.GET.get('after')
+        before = self.request.GET.get('before')
+        page = keyset_paginate(queryset, page_size, after, before)
+        return (None, page, page.object_list, page.has_other_pages())
+
 
 class EntryUpdateView(generic.UpdateView):
     context_object_name = 'entry'
@@ -0,0 +1,89 @@
+import operator
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.db.models import Case, F, IntegerField, Value, When
+
+from utilities.buffers import CoalescingBuffer
+
+from .signals import comments_count_changed
+
+
+def update_comments_counts(deltas):
+    """Add ``delta`` to ``comments_count`` of every listed object.
+
+    ``deltas`` is a list of ``(app_name, model_name, pk, delta)``. Each
+    model gets one UPDATE, and ``modified`` is left untouched because
+    QuerySet.update() skips ``auto_now``.
+    """
+    deltas_per_model = defaultdict(dict)
+    for app_name, model_name, pk, delta in deltas:
+        model_deltas = deltas_per_model[(app_name, model_name)]
+        model_deltas[pk] = model_deltas.get(pk, 0) + delta
+    rows_updated = 0
+    for (app_name, model_name), model_deltas in deltas_per_model.items():
+        model_class = apps.get_model(app_name, model_name)
+        whens = [
+            When(pk = pk, then = Value(delta))
+            for pk, delta in model_deltas.items()
+        ]
+        increment = Case(
+            *whens,
+            default = Value(0),
+            output_field = IntegerField(),
+        )
+        queryset = model_class.objects.filter(pk__in = list(model_deltas))
+        rows_updated += queryset.update(
+            comments_count = F('comments_count') + increment,
+        )
+        comments_count_changed.send(
+            sender = update_comments_counts,
+            model = model_class,
+            pks = list(model_deltas),
+        )
+    return rows_updated
+
+
+def send_comments_counts(items):
+    from .tasks import flush_comments_count
+
+    deltas = [
+        (app_name, model_name, pk, delta)
+        for (app_name, model_name, pk), delta in items.items()
+    ]
+    flush_comments_count.delay(deltas)
+
+
+comments_count_buffer = CoalescingBuffer(
+    flush_callback = send_comments_counts,
+    merge = operator.add,
+    interval = settings.COMMENTS_COUNT_FLUSH_INTERVAL,
+    max_size = settings.COMMENTS_COUNT_FLUSH_SIZE,
+)
+
+
+def count_comment(app_name, model_name, pk):
+    key = (app_name, model_name, pk)
+    comments_count_buffer.add(key, 1)
+
+
+def set_comments_counts(model_class, counts, chunk_size = 1000):
+    """Write ``counts`` ({pk: count}) to ``comments_count`` in chunks.
+
+    Every chunk is a single UPDATE ... SET comments_count = CASE ... END.
+    """
+    rows_updated = 0
+    items = sorted(counts.items())
+    for start in range(0, len(items), chunk_size):
+        chunk = items[start:start + chunk_size]
+        whens = [When(pk = pk, then = Value(count)) for pk, count in chunk]
+        new_count = Case(*whens, output_field = IntegerField())
+        queryset = model_class.objects.filter(pk__in = [pk for pk, _ in chunk])
+        rows_updated += queryset.update(comments_count = new_count)
+        comments_count_changed.send(
+            sender = set_comments_counts,
+            model = model_class,
+            pks = [pk for pk, _ in chunk],
+        )
+    return rows_updated
@@ -0,0 +1,100 @@
+import operator
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from articles.models import Article
+from comments.counters import update_comments_counts
+from comments.tasks import increase_comments_count
+from utilities.buffers import CoalescingBuffer
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the per-comment increase_comments_count task with the '
+        'batched comments counter. Runs inside a transaction that is '
+        'rolled back, so no data is left behind.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--comments',
+            type = int,
+            default = 1000,
+            help = 'Number of comments to count with each strategy.',
+        )
+        parser.add_argument(
+            '--objects',
+            type = int,
+            default = 10,
+            help = 'Number of articles the comments are spread over.',
+        )
+
+    def handle(self, *args, **options):
+        number_of_comments = options['comments']
+        number_of_objects = options['objects']
+        with transaction.atomic():
+            in_the_past = timezone.now() - timezone.timedelta(days = 1)
+            articles = [
+                Article.objects.create(
+                    title = 'benchmark %s' % number,
+                    pub_date = in_the_past,
+                )
+                for number in range(number_of_objects)
+            ]
+            keys = [
+                ('articles', 'article', articles[n % number_of_objects].pk)
+                for n in range(number_of_comments)
+            ]
+
+            per_comment = self.run_per_comment_task(keys)
+            batched = self.run_batched(keys)
+
+            counts = Article.objects.filter(
+                pk__in = [article.pk for article in articles],
+            ).values_list('comments_count', flat = True)
+            total = sum(counts)
+            transaction.set_rollback(True)
+
+        self.report('per-comment task', number_of_comments, per_comment)
+        self.report('batched counter', number_of_comments, batched)
+        self.stdout.write(
+            'speedup: %.1fx' % (per_comment / batched if batched else 0)
+        )
+        self.stdout.write(
+            'comments counted: %s of %s'
+            % (total, 2 * number_of_comments)
+        )
+
+    def run_per_comment_task(self, keys):
+        # The task body runs in-process, so the broker round trip that
+        # every comment pays in production is not even included here.
+        start = time.perf_counter()
+        for app_name, model_name, pk in keys:
+            increase_comments_count(app_name, model_name, pk)
+        return time.perf_counter() - start
+
+    def run_batched(self, keys):
+        def flush_callback(items):
+            deltas = [key + (delta,) for key, delta in items.items()]
+            update_comments_counts(deltas)
+
+        buffer = CoalescingBuffer(
+            flush_callback = flush_callback,
+            merge = operator.add,
+            interval = 3600,
+            max_size = len(keys) + 1,
+        )
+        start = time.perf_counter()
+        for key in keys:
+            buffer.add(key, 1)
+        buffer.flush()
+        return time.perf_counter() - start
+
+    def report(self, label, number_of_comments, seconds):
+        rate = number_of_comments / seconds if seconds else 0
+        self.stdout.write(
+            '%-18s %8.3f s  %10.0f comments/s' % (label, seconds, rate)
+        )
@@ -9,3 +9,13 @@ class Comment(models.Model):
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
     object_id = models.PositiveIntegerField()
     content_object = GenericForeignKey('content_type', 'object_id')
+
+    class Meta:
+        ordering = ['-created']
+        indexes = [
+            models.Index(
+                fields = ['content_type', 'object_id', '-created', '-id'],
+                name = 'comment_object_created_idx',
+            ),
+            models.Index(fields = ['created'], name = 'comment_created_idx'),
+        ]
@@ -0,0 +1,23 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from utilities.cache import invalidate_object
+
+from .models import Comment
+
+# Sent after comments_count of ``pks`` of ``model`` has been written.
+comments_count_changed = Signal(providing_args = ['model', 'pks'])
+
+
+@receiver([post_save, post_delete], sender = Comment)
+def invalidate_commented_object_pages(sender, instance, **kwargs):
+    content_type = ContentType.objects.get_for_id(instance.content_type_id)
+    model = content_type.model_class()
+    invalidate_object(model, instance.object_id, lists = False)
+
+
+@receiver(comments_count_changed)
+def invalidate_recounted_object_pages(sender, model, pks, **kwargs):
+    for pk in pks:
+        invalidate_object(model, pk, lists = False)
@@ -3,6 +3,8 @@ from celery import task
 from django.apps import apps
 from django.db.models import F
 
+from .counters import update_comments_counts
+
 
 @task
 def increase_comments_count(app_name, model_name, pk):
@@ -10,3 +12,8 @@ def increase_comments_count(app_name, model_name, pk):
     object_instance = model_class.objects.get(pk = pk)
     object_instance.comments_count = F('comments_count') + 1
     return object_instance.save()
+
+
+@task
+def flush_comments_count(deltas):
+    return update_comments_counts(deltas)
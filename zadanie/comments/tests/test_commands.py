@@ -0,0 +1,133 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from articles.models import Article
+from blog.models import Entry
+from utilities.surrogate import purge_buffer
+from utilities.testing import commit_immediately
+
+from ..management.commands.recount_comments import get_commented_models
+from ..models import Comment
+
+
+@override_settings(COMMENTS_COUNT_SETTLE_SECONDS = 0)
+class TestRecountComments(TestCase):
+
+    def setUp(self):
+        commit_immediately(self)
+        in_the_past = timezone.now() - timezone.timedelta(days = 1)
+        self.article = Article.objects.create(
+            title = 'uno',
+            pub_date = in_the_past,
+        )
+        self.entry = Entry.objects.create(
+            title = 'due',
+            pub_date = in_the_past,
+        )
+        self.article.comments.create(body = 'one')
+        self.article.comments.create(body = 'two')
+        self.entry.comments.create(body = 'three')
+
+    def recount(self, *args):
+        out = StringIO()
+        call_command('recount_comments', *args, stdout = out)
+        return out.getvalue()
+
+    def test_get_commented_models(self):
+        models_given = get_commented_models()
+        self.assertIn(Article, models_given)
+        self.assertIn(Entry, models_given)
+        self.assertNotIn(Comment, models_given)
+
+    def test_counts_are_recomputed(self):
+        output = self.recount()
+        self.article.refresh_from_db()
+        self.entry.refresh_from_db()
+        self.assertEqual(2, self.article.comments_count)
+        self.assertEqual(1, self.entry.comments_count)
+        self.assertIn('articles.article: 1 updated', output)
+        self.assertIn('blog.entry: 1 updated', output)
+
+    def test_counts_without_comments_are_reset(self):
+        Article.objects.update(comments_count = 7)
+        self.article.comments.all().delete()
+        self.recount()
+        self.article.refresh_from_db()
+        self.assertEqual(0, self.article.comments_count)
+
+    def test_since_only_touches_recently_commented_objects(self):
+        an_hour_ago = timezone.now() - timezone.timedelta(hours = 1)
+        self.entry.comments.update(
+            created = an_hour_ago,
+        )
+        self.recount('--since', '10')
+        self.article.refresh_from_db()
+        self.entry.refresh_from_db()
+        self.assertEqual(2, self.article.comments_count)
+        self.assertEqual(0, self.entry.comments_count)
+
+    def test_since_counts_all_comments_of_recent_objects(self):
+        an_hour_ago = timezone.now() - timezone.timedelta(hours = 1)
+        first_comment = self.article.comments.order_by('id').first()
+        Comment.objects.filter(pk = first_comment.pk).update(
+            created = an_hour_ago,
+        )
+        self.recount('--since', '10')
+        self.article.refresh_from_db()
+        self.assertEqual(2, self.article.comments_count)
+
+    def test_counts_are_read_with_one_aggregated_query(self):
+        ContentType.objects.clear_cache()
+        with self.assertNumQueries(6):
+            # content types, GROUP BY over comments, then one SELECT
+            # and one UPDATE per commented model
+            self.recount()
+
+    def test_objects_commented_while_counting_are_skipped(self):
+        # The +1 of the entry's comment is still buffered in a web process.
+        output = self.recount('--settle', '60')
+        self.entry.refresh_from_db()
+        self.assertEqual(0, self.entry.comments_count)
+        self.assertIn('blog.entry: 0 updated, 1 skipped', output)
+
+    def test_objects_with_settled_comments_are_recounted(self):
+        an_hour_ago = timezone.now() - timezone.timedelta(hours = 1)
+        self.entry.comments.update(created = an_hour_ago)
+        self.recount('--since', '120', '--settle', '60')
+        self.entry.refresh_from_db()
+        self.article.refresh_from_db()
+        self.assertEqual(1, self.entry.comments_count)
+        self.assertEqual(0, self.article.comments_count)
+
+    def test_purges_are_sent_before_the_command_returns(self):
+        delay_path = 'utilities.tasks.purge_surrogate_keys.delay'
+        with self.settings(PURGE_ENDPOINT = 'http://127.0.0.1:9/purge'):
+            with mock.patch(delay_path) as delay:
+                self.recount()
+        delay.assert_called_once_with([
+            'article-%s' % self.article.pk,
+            'entry-%s' % self.entry.pk,
+        ])
+        self.assertEqual(0, len(purge_buffer))
+
+    def test_since_reads_recent_objects_before_counting(self):
+        ContentType.objects.clear_cache()
+        with self.assertNumQueries(7) as context:
+            # content types, recently commented objects, GROUP BY over
+            # their comments, then one SELECT and one UPDATE per model
+            self.recount('--since', '10')
+        recent_sql = context.captured_queries[1]['sql']
+        self.assertIn('DISTINCT', recent_sql)
+        self.assertNotIn('EXISTS', context.captured_queries[2]['sql'])
+
+    def test_since_without_recent_comments_counts_nothing(self):
+        an_hour_ago = timezone.now() - timezone.timedelta(hours = 1)
+        Comment.objects.update(created = an_hour_ago)
+        output = self.recount('--since', '10')
+        self.assertIn('articles.article: 0 updated', output)
+        self.assertIn('blog.entry: 0 updated', output)
@@ -0,0 +1,96 @@
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from articles.models import Article
+from blog.models import Entry
+
+from ..counters import comments_count_buffer, count_comment
+from ..counters import send_comments_counts, update_comments_counts
+from ..tasks import flush_comments_count
+
+
+class TestUpdateCommentsCounts(TestCase):
+
+    def setUp(self):
+        in_the_past = timezone.now() - timezone.timedelta(days = 1)
+        self.article_1 = Article.objects.create(
+            title = 'uno',
+            pub_date = in_the_past,
+        )
+        self.article_2 = Article.objects.create(
+            title = 'due',
+            pub_date = in_the_past,
+        )
+        self.entry = Entry.objects.create(
+            title = 'tre',
+            pub_date = in_the_past,
+        )
+
+    def test_counts_are_increased_by_delta(self):
+        deltas = [
+            ('articles', 'article', self.article_1.pk, 3),
+            ('articles', 'article', self.article_2.pk, 1),
+            ('blog', 'entry', self.entry.pk, 2),
+        ]
+        rows_updated = update_comments_counts(deltas)
+        self.assertEqual(3, rows_updated)
+        self.article_1.refresh_from_db()
+        self.article_2.refresh_from_db()
+        self.entry.refresh_from_db()
+        self.assertEqual(3, self.article_1.comments_count)
+        self.assertEqual(1, self.article_2.comments_count)
+        self.assertEqual(2, self.entry.comments_count)
+
+    def test_one_update_per_model(self):
+        deltas = [
+            ('articles', 'article', self.article_1.pk, 3),
+            ('articles', 'article', self.article_2.pk, 1),
+            ('blog', 'entry', self.entry.pk, 2),
+        ]
+        with self.assertNumQueries(2):
+            update_comments_counts(deltas)
+
+    def test_modified_is_not_touched(self):
+        modified_expected = self.article_1.modified
+        deltas = [('articles', 'article', self.article_1.pk, 1)]
+        update_comments_counts(deltas)
+        self.article_1.refresh_from_db()
+        modified_given = self.article_1.modified
+        self.assertEqual(modified_expected, modified_given)
+
+    def test_task_applies_deltas(self):
+        deltas = [['articles', 'article', self.article_1.pk, 4]]
+        flush_comments_count(deltas)
+        self.article_1.refresh_from_db()
+        self.assertEqual(4, self.article_1.comments_count)
+
+
+class TestCountComment(TestCase):
+
+    def tearDown(self):
+        with mock.patch('comments.tasks.flush_comments_count.delay'):
+            comments_count_buffer.flush()
+
+    def test_comments_are_coalesced_per_object(self):
+        count_comment('articles', 'article', 1)
+        count_comment('articles', 'article', 1)
+        count_comment('blog', 'entry', 1)
+        path = 'comments.tasks.flush_comments_count.delay'
+        with mock.patch(path) as delay:
+            comments_count_buffer.flush()
+        delay.assert_called_once()
+        deltas_given = sorted(delay.call_args[0][0])
+        deltas_expected = [
+            ('articles', 'article', 1, 2),
+            ('blog', 'entry', 1, 1),
+        ]
+        self.assertEqual(deltas_expected, deltas_given)
+
+    def test_send_comments_counts_enqueues_one_task(self):
+        items = {('articles', 'article', 1): 5}
+        path = 'comments.tasks.flush_comments_count.delay'
+        with mock.patch(path) as delay:
+            send_comments_counts(items)
+        delay.assert_called_once_with([('articles', 'article', 1, 5)])
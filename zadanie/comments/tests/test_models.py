@@ -50,3 +50,14 @@ class TestComment(TestCase):
         field_type_expected = GenericForeignKey
         field_type_given = field.__class__
         self.assertEqual(field_type_expected, field_type_given)
+
+    def test_model_ordering(self):
+        ordering_expected = ['-created']
+        ordering_given = self.model._meta.ordering
+        self.assertEqual(ordering_expected, ordering_given)
+
+    def test_model_object_created_index(self):
+        index = self.model._meta.indexes[0]
+        fields_expected = ['content_type', 'object_id', '-created', '-id']
+        fields_given = index.fields
+        self.assertEqual(fields_expected, fields_given)
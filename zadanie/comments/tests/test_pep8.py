@@ -10,8 +10,12 @@ class TestCodeFormat(TestCase):
         list_of_files = [
             'comments/admin.py',
             'comments/apps.py',
+            'comments/counters.py',
             'comments/forms.py',
             'comments/models.py',
+            'comments/signals.py',
+            'comments/tasks.py',
+            'comments/views.py',
         ]
         style = pycodestyle.StyleGuide(
             ignore = list_of_error_codes_to_ignore,
@@ -0,0 +1,52 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from articles.models import Article
+from utilities.cache import get_list_version_name, get_object_version_name
+from utilities.cache import get_versions
+from utilities.testing import commit_immediately
+
+from ..counters import set_comments_counts, update_comments_counts
+
+
+class TestCommentPageInvalidation(TestCase):
+
+    def setUp(self):
+        commit_immediately(self)
+        cache.clear()
+        in_the_past = timezone.now() - timezone.timedelta(days = 1)
+        self.article = Article.objects.create(
+            title = 'Lucca',
+            pub_date = in_the_past,
+        )
+        self.names = [
+            get_object_version_name(Article, self.article.pk),
+            get_list_version_name(Article),
+        ]
+
+    def test_comment_save_bumps_only_object_version(self):
+        object_version, list_version = get_versions(self.names)
+        self.article.comments.create(body = 'ciao')
+        versions_given = get_versions(self.names)
+        self.assertEqual([object_version + 1, list_version], versions_given)
+
+    def test_comment_delete_bumps_only_object_version(self):
+        comment = self.article.comments.create(body = 'ciao')
+        object_version, list_version = get_versions(self.names)
+        comment.delete()
+        versions_given = get_versions(self.names)
+        self.assertEqual([object_version + 1, list_version], versions_given)
+
+    def test_counter_flush_bumps_object_version(self):
+        object_version, list_version = get_versions(self.names)
+        deltas = [('articles', 'article', self.article.pk, 1)]
+        update_comments_counts(deltas)
+        versions_given = get_versions(self.names)
+        self.assertEqual([object_version + 1, list_version], versions_given)
+
+    def test_recount_bumps_object_version(self):
+        object_version, list_version = get_versions(self.names)
+        set_comments_counts(Article, {self.article.pk: 3})
+        versions_given = get_versions(self.names)
+        self.assertEqual([object_version + 1, list_version], versions_given)
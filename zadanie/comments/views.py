@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.shortcuts import get_object_or_404
+from django.views import generic
+
+from utilities.pagination import keyset_paginate
+from utilities.routers import read_from_replica
+
+
+class ObjectCommentsView(generic.ListView):
+    """Next slice of comments of a published object, newest first.
+
+    Subclasses set ``parent_queryset`` to the published manager of the
+    commented model.
+    """
+    context_object_name = 'comments'
+    paginate_by = settings.COMMENTS_PAGE_SIZE
+    parent_queryset = None
+    template_name = 'comments/_comments.html'
+
+    def get_queryset(self):
+        pk = self.kwargs['pk']
+        parent = get_object_or_404(self.parent_queryset, pk = pk)
+        queryset = read_from_replica(parent.comments.all())
+        return queryset
+
+    def paginate_queryset(self, queryset, page_size):
+        after = self.request.GET.get('after')
+        page = keyset_paginate(queryset, page_size, after)
+        return (None, page, page.object_list, page.has_other_pages())
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['comments_url'] = self.request.path
+        return context
@@ -0,0 +1,5 @@
+from django import forms
+
+
+class SearchForm(forms.Form):
+    q = forms.CharField(label = 'Search', max_length = 200, required = False)
@@ -0,0 +1,78 @@
+import os
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+
+def read_last_reindex():
+    """Start of the previous successful run, or None before the first.
+
+    It is kept in a file rather than the cache, which may live only as
+    long as one manage.py process.
+    """
+    path = settings.SEARCH_REINDEX_STATE_PATH
+    if not os.path.exists(path):
+        return None
+    with open(path) as state_file:
+        return parse_datetime(state_file.read().strip())
+
+
+def write_last_reindex(started):
+    path = settings.SEARCH_REINDEX_STATE_PATH
+    os.makedirs(os.path.dirname(path), exist_ok = True)
+    temporary_path = path + '.tmp'
+    with open(temporary_path, 'w') as state_file:
+        state_file.write(started.isoformat())
+    os.replace(temporary_path, path)
+
+
+class Command(BaseCommand):
+    help = (
+        'Update the haystack index with objects changed or published '
+        'since the previous successful run, in parallel worker '
+        'processes. The first run, or one with --full, reindexes '
+        'everything.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action = 'store_true',
+            help = 'Reindex every published object.',
+        )
+        parser.add_argument(
+            '--workers',
+            type = int,
+            default = settings.SEARCH_REINDEX_WORKERS,
+            help = 'Number of worker processes.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type = int,
+            default = settings.SEARCH_REINDEX_BATCH_SIZE,
+            help = 'Number of objects sent to the backend at once.',
+        )
+
+    def handle(self, *args, **options):
+        started = timezone.now()
+        last_reindex = read_last_reindex()
+        update_options = {
+            'age': None,
+            'batchsize': options['batch_size'],
+            'remove': True,
+            'verbosity': options['verbosity'],
+            'workers': options['workers'],
+        }
+        if last_reindex is not None and not options['full']:
+            # Objects go live up to PUBLISH_DUE_INTERVAL after pub_date.
+            overlap = timezone.timedelta(
+                seconds = settings.PUBLISH_DUE_INTERVAL,
+            )
+            start_date = last_reindex - overlap
+            update_options['start_date'] = start_date.isoformat()
+            update_options['remove'] = False
+        call_command('update_index', **update_options)
+        write_last_reindex(started)
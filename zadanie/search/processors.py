@@ -0,0 +1,100 @@
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import signals
+
+from haystack import connection_router, connections
+from haystack.signals import BaseSignalProcessor
+
+from articles.models import Article
+from blog.models import Entry
+from utilities.buffers import CoalescingBuffer
+
+QUEUED_MODELS = [Article, Entry]
+
+
+def apply_index_changes(changes):
+    """Push queued ``(app_label, model_name, pk, action)`` changes.
+
+    Every model gets one query for its updated objects and one bulk
+    update per backend. Deleted objects and objects that are no longer
+    published are removed from the index.
+    """
+    pks_per_model = defaultdict(lambda: {'update': set(), 'delete': set()})
+    for app_label, model_name, pk, action in changes:
+        pks_per_model[(app_label, model_name)][action].add(pk)
+    for (app_label, model_name), pks in pks_per_model.items():
+        model = apps.get_model(app_label, model_name)
+        for using in connection_router.for_write():
+            backend = connections[using].get_backend()
+            index = connections[using].get_unified_index().get_index(model)
+            objects = []
+            if pks['update']:
+                queryset = index.index_queryset(using = using)
+                objects = list(queryset.filter(pk__in = pks['update']))
+            if objects:
+                backend.update(index, objects)
+            indexed_pks = {obj.pk for obj in objects}
+            removed_pks = pks['delete'] | (pks['update'] - indexed_pks)
+            for pk in sorted(removed_pks):
+                identifier = '%s.%s.%s' % (app_label, model_name, pk)
+                backend.remove(identifier)
+    return len(changes)
+
+
+def send_index_changes(items):
+    from .tasks import update_search_index
+
+    changes = [
+        (app_label, model_name, pk, action)
+        for (app_label, model_name, pk), action in items.items()
+    ]
+    update_search_index.delay(changes)
+
+
+def keep_last(old_action, new_action):
+    return new_action
+
+
+search_index_buffer = CoalescingBuffer(
+    flush_callback = send_index_changes,
+    merge = keep_last,
+    interval = settings.SEARCH_INDEX_FLUSH_INTERVAL,
+    max_size = settings.SEARCH_INDEX_FLUSH_SIZE,
+)
+
+
+class QueuedSignalProcessor(BaseSignalProcessor):
+    """Queue index changes of articles and entries instead of sending them.
+
+    Saves and deletes are buffered once their transaction commits;
+    repeated changes of one object within the flush interval collapse
+    into the last one, and the batch goes to the backend from the
+    update_search_index Celery task.
+    """
+
+    def setup(self):
+        for model in QUEUED_MODELS:
+            signals.post_save.connect(self.handle_save, sender = model)
+            signals.post_delete.connect(self.handle_delete, sender = model)
+
+    def teardown(self):
+        for model in QUEUED_MODELS:
+            signals.post_save.disconnect(self.handle_save, sender = model)
+            signals.post_delete.disconnect(self.handle_delete, sender = model)
+
+    def handle_save(self, sender, instance, **kwargs):
+        self.enqueue(instance, 'update')
+
+    def handle_delete(self, sender, instance, **kwargs):
+        self.enqueue(instance, 'delete')
+
+    def enqueue(self, instance, action):
+        key = (
+            instance._meta.app_label,
+            instance._meta.model_name,
+            instance.pk,
+        )
+        transaction.on_commit(lambda: search_index_buffer.add(key, action))
@@ -0,0 +1,17 @@
+from django.urls import path
+
+from haystack.views import SearchView
+
+from . import views
+
+app_name = 'search'
+urlpatterns = [
+    path(
+        '',
+        SearchView(),
+        name = 'search'),
+    path(
+        'suggest/',
+        views.SuggestView.as_view(),
+        name = 'suggest'),
+]
@@ -0,0 +1,104 @@
+import hashlib
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.core.cache import cache
+from django.db.models import CharField, F, Value
+from django.urls import reverse
+
+from articles.models import Article
+from blog.models import Entry
+
+from .vectors import TITLE_PREFIX_CONFIG, get_title_vector
+
+WORD_RE = re.compile(r'\w+')
+
+SUGGESTED_MODELS = [
+    (Article, 'article', 'articles:detail'),
+    (Entry, 'entry', 'blog:entry-detail'),
+]
+
+
+def normalize_fragment(text):
+    words = WORD_RE.findall(text.lower())
+    return ' '.join(words)
+
+
+def get_prefix_query(fragment):
+    """Match title words starting with every word of ``fragment``.
+
+    Each word becomes a ``word:*`` term of a raw tsquery over the
+    unstemmed title vector. search_vector is stemmed, so a partial word
+    such as "runn" would never match the "run" stored for "Running".
+    """
+    terms = ['%s:*' % word for word in fragment.split()]
+    raw_query = ' & '.join(terms)
+    return SearchQuery(
+        raw_query,
+        config = TITLE_PREFIX_CONFIG,
+        search_type = 'raw',
+    )
+
+
+def find_suggestions(fragment, limit):
+    """Up to ``limit`` titles matching ``fragment``, best ranked first.
+
+    A short prefix matches a large share of all titles, so only the
+    first ``limit * SUGGEST_CANDIDATE_FACTOR`` matches of each model,
+    found through the title prefix index, are ranked and sorted.
+    """
+    search_query = get_prefix_query(fragment)
+    number_of_candidates = limit * settings.SUGGEST_CANDIDATE_FACTOR
+    querysets = []
+    for model, kind, viewname in SUGGESTED_MODELS:
+        candidates = model.published.annotate(
+            title_vector = get_title_vector(),
+        ).filter(title_vector = search_query)
+        candidates = candidates.order_by().values('pk')[:number_of_candidates]
+        queryset = model.published.filter(pk__in = candidates)
+        queryset = queryset.annotate(
+            title_vector = get_title_vector(),
+            kind = Value(kind, output_field = CharField()),
+            rank = SearchRank(F('title_vector'), search_query),
+        )
+        querysets.append(
+            queryset.order_by().values('kind', 'pk', 'title', 'rank'),
+        )
+    queryset = querysets[0].union(*querysets[1:], all = True)
+    queryset = queryset.order_by('-rank', 'title')[:limit]
+    viewnames = {kind: viewname for model, kind, viewname in SUGGESTED_MODELS}
+    suggestions = [
+        {
+            'kind': row['kind'],
+            'title': row['title'],
+            'url': reverse(viewnames[row['kind']], kwargs = {'pk': row['pk']}),
+        }
+        for row in queryset
+    ]
+    return suggestions
+
+
+def get_suggestion_cache_key(fragment, limit):
+    fragment_hash = hashlib.md5(fragment.encode()).hexdigest()
+    return 'suggest:%s:%s' % (fragment_hash, limit)
+
+
+def get_suggestions(text, limit = None):
+    """Published titles for a typed fragment, cached per fragment.
+
+    Entries live for SUGGEST_CACHE_TIMEOUT seconds whatever is edited in
+    between, so a new or renamed title shows up once they expire; tying
+    them to the list versions emptied the cache on every save.
+    """
+    if limit is None:
+        limit = settings.SUGGEST_LIMIT
+    fragment = normalize_fragment(text)
+    if len(fragment) < settings.SUGGEST_MIN_LENGTH:
+        return []
+    key = get_suggestion_cache_key(fragment, limit)
+    suggestions = cache.get(key)
+    if suggestions is None:
+        suggestions = find_suggestions(fragment, limit)
+        cache.set(key, suggestions, settings.SUGGEST_CACHE_TIMEOUT)
+    return suggestions
@@ -0,0 +1,8 @@
+from celery import task
+
+from .processors import apply_index_changes
+
+
+@task
+def update_search_index(changes):
+    return apply_index_changes(changes)
@@ -0,0 +1,67 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+
+from ..management.commands.reindex_search import read_last_reindex
+
+
+@override_settings(PUBLISH_DUE_INTERVAL = 60)
+class TestReindexSearchCommand(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        state_settings = override_settings(
+            SEARCH_REINDEX_STATE_PATH = os.path.join(directory, 'state'),
+        )
+        state_settings.enable()
+        self.addCleanup(state_settings.disable)
+        patcher = mock.patch(
+            'search.management.commands.reindex_search.call_command',
+        )
+        self.update_index = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_first_run_reindexes_everything_in_parallel(self):
+        call_command('reindex_search', workers = 3, batch_size = 100)
+        args, options = self.update_index.call_args
+        self.assertEqual(('update_index',), args)
+        self.assertNotIn('start_date', options)
+        self.assertIsNone(options['age'])
+        self.assertEqual(3, options['workers'])
+        self.assertEqual(100, options['batchsize'])
+        self.assertTrue(options['remove'])
+
+    def test_next_run_starts_before_previous_one(self):
+        call_command('reindex_search')
+        last_reindex = read_last_reindex()
+        call_command('reindex_search')
+        args, options = self.update_index.call_args
+        start_date = last_reindex - timezone.timedelta(seconds = 60)
+        self.assertEqual(start_date.isoformat(), options['start_date'])
+        self.assertFalse(options['remove'])
+
+    def test_full_ignores_previous_run(self):
+        call_command('reindex_search')
+        call_command('reindex_search', full = True)
+        args, options = self.update_index.call_args
+        self.assertNotIn('start_date', options)
+
+    def test_state_directory_is_created(self):
+        directory = os.path.dirname(settings.SEARCH_REINDEX_STATE_PATH)
+        path = os.path.join(directory, 'var', 'state')
+        with self.settings(SEARCH_REINDEX_STATE_PATH = path):
+            call_command('reindex_search')
+            self.assertIsNotNone(read_last_reindex())
+
+    def test_failed_run_is_not_remembered(self):
+        self.update_index.side_effect = RuntimeError
+        with self.assertRaises(RuntimeError):
+            call_command('reindex_search')
+        self.assertIsNone(read_last_reindex())
@@ -0,0 +1,63 @@
+from django.test import TestCase
+from django.utils import timezone
+
+from articles.models import Article
+from articles.search_indexes import ArticleIndex
+from blog.models import Entry
+from blog.search_indexes import EntryIndex
+
+
+class TestIncrementalIndex(TestCase):
+
+    def setUp(self):
+        now = timezone.now()
+        self.window_start = now - timezone.timedelta(hours = 1)
+        long_ago = now - timezone.timedelta(days = 10)
+        self.changed = Entry.objects.create(title = 'Changed')
+        Entry.objects.filter(pk = self.changed.pk).update(
+            pub_date = long_ago,
+            is_published = True,
+        )
+        self.went_live = Entry.objects.create(title = 'Went live')
+        Entry.objects.filter(pk = self.went_live.pk).update(
+            modified = long_ago,
+            pub_date = now - timezone.timedelta(minutes = 1),
+            is_published = True,
+        )
+        self.untouched = Entry.objects.create(title = 'Untouched')
+        Entry.objects.filter(pk = self.untouched.pk).update(
+            modified = long_ago,
+            pub_date = long_ago,
+            is_published = True,
+        )
+        self.not_published = Entry.objects.create(title = 'Scheduled')
+        self.index = EntryIndex()
+
+    def test_updated_field_is_modified(self):
+        self.assertEqual('modified', self.index.get_updated_field())
+        self.assertEqual('modified', ArticleIndex().get_updated_field())
+
+    def test_full_queryset_is_every_published_object(self):
+        queryset = self.index.build_queryset()
+        objects_expected = [self.changed, self.went_live, self.untouched]
+        self.assertEqual(objects_expected, list(queryset))
+
+    def test_window_picks_changed_and_newly_published_objects(self):
+        queryset = self.index.build_queryset(start_date = self.window_start)
+        self.assertEqual([self.changed, self.went_live], list(queryset))
+
+    def test_index_queryset_defers_search_vector(self):
+        entry = self.index.index_queryset().get(pk = self.changed.pk)
+        self.assertIn('search_vector', entry.get_deferred_fields())
+
+    def test_title_is_indexed(self):
+        prepared = self.index.prepare(self.changed)
+        self.assertEqual('Changed', prepared['title'])
+
+    def test_article_index(self):
+        in_the_past = timezone.now() - timezone.timedelta(days = 1)
+        article = Article.objects.create(title = 'Pisa', pub_date = in_the_past)
+        index = ArticleIndex()
+        self.assertEqual(Article, index.get_model())
+        self.assertEqual([article], list(index.build_queryset()))
+        self.assertEqual('Pisa', index.prepare(article)['title'])
@@ -0,0 +1,118 @@
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from haystack import connection_router, connections
+
+from articles.models import Article
+from blog.models import Entry
+
+from ..processors import (
+    QueuedSignalProcessor,
+    apply_index_changes,
+    search_index_buffer,
+)
+from ..tasks import update_search_index
+
+
+def run_on_commit(callback):
+    callback()
+
+
+class TestQueuedSignalProcessor(TestCase):
+
+    def setUp(self):
+        self.processor = QueuedSignalProcessor(connections, connection_router)
+        self.addCleanup(self.processor.teardown)
+        patcher = mock.patch('search.tasks.update_search_index.delay')
+        self.delay = patcher.start()
+        self.addCleanup(patcher.stop)
+        # Only the processor's own module, so page invalidation, which
+        # waits for the commit as well, is not counted here.
+        patcher = mock.patch('search.processors.transaction')
+        transaction = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.on_commit = transaction.on_commit
+        self.on_commit.side_effect = run_on_commit
+        self.addCleanup(search_index_buffer.flush)
+
+    def test_save_is_queued_after_commit_not_sent(self):
+        entry = Entry.objects.create(title = 'Venezia')
+        self.assertEqual(1, self.on_commit.call_count)
+        self.delay.assert_not_called()
+        key = ('blog', 'entry', entry.pk)
+        self.assertEqual('update', search_index_buffer.items[key])
+
+    def test_repeated_changes_of_one_object_are_coalesced(self):
+        article = Article.objects.create(title = 'Verona')
+        article.title = 'Vicenza'
+        article.save()
+        article_pk = article.pk
+        article.delete()
+        search_index_buffer.flush()
+        self.delay.assert_called_once_with(
+            [('articles', 'article', article_pk, 'delete')],
+        )
+
+    def test_other_models_are_ignored(self):
+        Article.objects.create(title = 'Verona')
+        self.on_commit.reset_mock()
+        article = Article.objects.first()
+        article.comments.create(body = 'ciao')
+        self.on_commit.assert_not_called()
+
+
+class TestApplyIndexChanges(TestCase):
+
+    def setUp(self):
+        in_the_past = timezone.now() - timezone.timedelta(days = 1)
+        self.published = Entry.objects.create(
+            title = 'Torino',
+            pub_date = in_the_past,
+        )
+        self.not_published = Entry.objects.create(title = 'Milano')
+        backend_path = 'haystack.backends.solr_backend.SolrSearchBackend'
+        patcher = mock.patch(backend_path + '.update')
+        self.update = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch(backend_path + '.remove')
+        self.remove = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_updates_are_sent_in_one_batch(self):
+        article = Article.objects.create(
+            title = 'Genova',
+            pub_date = self.published.pub_date,
+        )
+        changes = [
+            ('blog', 'entry', self.published.pk, 'update'),
+            ('articles', 'article', article.pk, 'update'),
+        ]
+        apply_index_changes(changes)
+        self.assertEqual(2, self.update.call_count)
+        objects_sent = [call[0][1] for call in self.update.call_args_list]
+        self.assertIn([self.published], objects_sent)
+        self.assertIn([article], objects_sent)
+        self.remove.assert_not_called()
+
+    def test_deleted_and_not_published_objects_are_removed(self):
+        changes = [
+            ('blog', 'entry', self.not_published.pk, 'update'),
+            ('blog', 'entry', 999, 'delete'),
+        ]
+        apply_index_changes(changes)
+        self.update.assert_not_called()
+        identifiers_removed = sorted(
+            call[0][0] for call in self.remove.call_args_list
+        )
+        identifiers_expected = sorted([
+            'blog.entry.%s' % self.not_published.pk,
+            'blog.entry.999',
+        ])
+        self.assertEqual(identifiers_expected, identifiers_removed)
+
+    def test_task_applies_changes(self):
+        changes = [('blog', 'entry', self.published.pk, 'update')]
+        self.assertEqual(1, update_search_index(changes))
+        self.update.assert_called_once()
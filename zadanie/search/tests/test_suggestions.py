@@ -0,0 +1,127 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from articles.models import Article
+from blog.models import Entry
+
+from ..suggestions import get_suggestions, normalize_fragment
+
+
+@override_settings(SUGGEST_LIMIT = 8, SUGGEST_MIN_LENGTH = 2)
+class TestGetSuggestions(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        in_the_past = timezone.now() - timezone.timedelta(days = 1)
+        in_the_future = timezone.now() + timezone.timedelta(days = 1)
+        self.article = Article.objects.create(
+            title = 'Napoli by night',
+            body = 'Margherita',
+            pub_date = in_the_past,
+        )
+        self.entry = Entry.objects.create(
+            title = 'Weekend in Napoli',
+            body = 'Lungomare',
+            pub_date = in_the_past,
+        )
+        Article.objects.create(title = 'Napoli tomorrow', pub_date = in_the_future)
+
+    def titles(self, text, limit = None):
+        suggestions = get_suggestions(text, limit)
+        return [suggestion['title'] for suggestion in suggestions]
+
+    def test_normalize_fragment(self):
+        self.assertEqual('napo ni', normalize_fragment('  Napo, ni!'))
+
+    def test_prefix_matches_published_titles_of_both_models(self):
+        titles = self.titles('nap')
+        self.assertEqual(
+            sorted(['Napoli by night', 'Weekend in Napoli']),
+            sorted(titles),
+        )
+
+    def test_every_word_is_a_prefix(self):
+        self.assertEqual(['Napoli by night'], self.titles('napoli ni'))
+
+    def test_partial_words_are_not_stemmed(self):
+        Article.objects.create(
+            title = 'Running quickly',
+            pub_date = self.article.pub_date,
+        )
+        self.assertEqual(['Running quickly'], self.titles('runn'))
+        self.assertEqual(['Running quickly'], self.titles('quickl'))
+        self.assertEqual(['Running quickly'], self.titles('running quic'))
+
+    def test_stop_words_are_matched(self):
+        self.assertEqual(['Napoli by night'], self.titles('napoli by'))
+        self.assertEqual(['Weekend in Napoli'], self.titles('in'))
+
+    def test_body_is_not_matched(self):
+        self.assertEqual([], self.titles('margh'))
+
+    def test_short_fragment_returns_nothing_without_query(self):
+        with self.assertNumQueries(0):
+            self.assertEqual([], self.titles('n'))
+
+    def test_limit(self):
+        self.assertEqual(1, len(self.titles('nap', limit = 1)))
+
+    def test_suggestions_link_to_detail_pages(self):
+        suggestions = get_suggestions('weekend')
+        suggestion_expected = {
+            'kind': 'entry',
+            'title': 'Weekend in Napoli',
+            'url': self.entry.get_absolut_url(),
+        }
+        self.assertEqual([suggestion_expected], suggestions)
+
+    def test_hot_prefix_is_served_from_cache(self):
+        self.titles('nap')
+        with self.assertNumQueries(0):
+            self.titles('Nap')
+
+    def test_saves_leave_cached_prefix_until_it_expires(self):
+        self.titles('nap')
+        Entry.objects.create(
+            title = 'Napoli again',
+            pub_date = self.entry.pub_date,
+        )
+        self.assertNotIn('Napoli again', self.titles('nap'))
+        cache.clear()
+        self.assertIn('Napoli again', self.titles('nap'))
+
+    @override_settings(SUGGEST_CANDIDATE_FACTOR = 1)
+    def test_only_a_bounded_set_of_matches_is_ranked(self):
+        for number in range(3):
+            Article.objects.create(
+                title = 'Napoli %s' % number,
+                pub_date = self.article.pub_date,
+            )
+        with self.assertNumQueries(1) as context:
+            titles = self.titles('nap', limit = 2)
+        self.assertEqual(2, len(titles))
+        sql = context.captured_queries[0]['sql']
+        self.assertEqual(2, sql.count('LIMIT 2)'))
+
+
+class TestSuggestView(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        in_the_past = timezone.now() - timezone.timedelta(days = 1)
+        Article.objects.create(title = 'Capri', pub_date = in_the_past)
+        self.path = reverse('search:suggest')
+
+    def test_view_returns_json(self):
+        response = self.client.get(self.path, {'q': 'cap'})
+        self.assertEqual('application/json', response['Content-Type'])
+        data = response.json()
+        self.assertEqual('cap', data['query'])
+        titles = [suggestion['title'] for suggestion in data['suggestions']]
+        self.assertEqual(['Capri'], titles)
+
+    def test_view_without_query(self):
+        response = self.client.get(self.path)
+        self.assertEqual({'query': '', 'suggestions': []}, response.json())
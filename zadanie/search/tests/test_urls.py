@@ -0,0 +1,40 @@
+from django.test import TestCase
+
+from django.urls import resolve, reverse
+
+
+class TestSearchUrl(TestCase):
+
+    def setUp(self):
+        self.url_resolved = resolve('/search/')
+
+    def test_url_reverse(self):
+        url_given = reverse('search:search')
+        url_expected = '/search/'
+        self.assertEqual(url_given, url_expected)
+
+    def test_url_func_name(self):
+        func_name_given = self.url_resolved.func.__name__
+        func_name_expected = 'SearchView'
+        self.assertEqual(func_name_given, func_name_expected)
+
+    def test_url_namespace(self):
+        namespace_given = self.url_resolved.namespace
+        namespace_expected = 'search'
+        self.assertEqual(namespace_given, namespace_expected)
+
+
+class TestSuggestUrl(TestCase):
+
+    def setUp(self):
+        self.url_resolved = resolve('/search/suggest/')
+
+    def test_url_reverse(self):
+        url_given = reverse('search:suggest')
+        url_expected = '/search/suggest/'
+        self.assertEqual(url_given, url_expected)
+
+    def test_url_func_name(self):
+        func_name_given = self.url_resolved.func.__name__
+        func_name_expected = 'SuggestView'
+        self.assertEqual(func_name_given, func_name_expected)
@@ -0,0 +1,49 @@
+from django.test import TestCase
+from django.utils import timezone
+
+from articles.models import Article
+from blog.models import Entry
+
+from ..vectors import get_search_query, update_search_vector
+
+
+class TestSearchVector(TestCase):
+
+    def setUp(self):
+        in_the_past = timezone.now() - timezone.timedelta(days = 1)
+        self.article = Article.objects.create(
+            title = 'Napoli',
+            body = 'Pizza margherita',
+            pub_date = in_the_past,
+        )
+
+    def search(self, model, text):
+        queryset = model.objects.filter(search_vector = get_search_query(text))
+        return list(queryset)
+
+    def test_save_fills_search_vector(self):
+        self.assertEqual([self.article], self.search(Article, 'napoli'))
+        self.assertEqual([self.article], self.search(Article, 'pizzas'))
+
+    def test_save_keeps_search_vector_current(self):
+        self.article.body = 'Spaghetti'
+        self.article.save()
+        self.assertEqual([], self.search(Article, 'pizza'))
+        self.assertEqual([self.article], self.search(Article, 'spaghetti'))
+
+    def test_entry_save_fills_search_vector(self):
+        entry = Entry.objects.create(title = 'Roma', body = 'Carbonara')
+        self.assertEqual([entry], self.search(Entry, 'carbonara'))
+
+    def test_save_of_other_fields_skips_update(self):
+        with self.assertNumQueries(0):
+            rows = update_search_vector(self.article, ['pub_date'])
+        self.assertEqual(0, rows)
+
+    def test_save_of_searched_field_updates_vector(self):
+        Article.objects.filter(pk = self.article.pk).update(title = 'Bari')
+        self.article.title = 'Bari'
+        with self.assertNumQueries(1):
+            rows = update_search_vector(self.article, ['title'])
+        self.assertEqual(1, rows)
+        self.assertEqual([self.article], self.search(Article, 'bari'))
@@ -0,0 +1,76 @@
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django.views import generic
+
+from articles.models import Article
+from blog.models import Entry
+
+from ..forms import SearchForm
+from ..views import SearchView
+
+
+class TestSearchView(TestCase):
+
+    def setUp(self):
+        in_the_past = timezone.now() - timezone.timedelta(days = 1)
+        in_the_future = timezone.now() + timezone.timedelta(days = 1)
+        self.article = Article.objects.create(
+            title = 'Pizza',
+            body = 'Pizza from Napoli',
+            pub_date = in_the_past,
+        )
+        self.entry = Entry.objects.create(
+            title = 'Trip',
+            body = 'We ate pizza in Roma',
+            pub_date = in_the_past,
+        )
+        self.not_published = Article.objects.create(
+            title = 'Pizza again',
+            body = 'pizza',
+            pub_date = in_the_future,
+        )
+        self.path = reverse('search:search')
+
+    def test_view_inherits_from_correct_class(self):
+        class_expected = generic.ListView
+        class_given = SearchView.__base__
+        self.assertEqual(class_expected, class_given)
+
+    def test_view_has_correct_template_name_attr(self):
+        template_name_expected = 'search/fulltext.html'
+        template_name_given = SearchView.template_name
+        self.assertEqual(template_name_expected, template_name_given)
+
+    def test_view_without_query_returns_no_results(self):
+        response = self.client.get(self.path)
+        self.assertEqual(200, response.status_code)
+        self.assertIsInstance(response.context['form'], SearchForm)
+        self.assertEqual([], list(response.context['results']))
+
+    def test_view_searches_both_content_types_ranked(self):
+        response = self.client.get(self.path, {'q': 'pizza'})
+        results = [
+            (result['kind'], result['pk'])
+            for result in response.context['results']
+        ]
+        results_expected = [
+            ('article', self.article.pk),
+            ('entry', self.entry.pk),
+        ]
+        self.assertEqual(results_expected, results)
+
+    def test_view_links_results(self):
+        response = self.client.get(self.path, {'q': 'pizza'})
+        article_url = self.article.get_absolut_url()
+        self.assertContains(response, 'href="%s"' % article_url)
+        self.assertContains(response, 'href="%s"' % self.entry.get_absolut_url())
+
+    def test_view_runs_one_ranked_query_per_page(self):
+        with self.assertNumQueries(2):
+            self.client.get(self.path, {'q': 'pizza'})
+
+    def test_view_ignores_not_matching_objects(self):
+        response = self.client.get(self.path, {'q': 'carbonara'})
+        self.assertEqual([], list(response.context['results']))
+        self.assertContains(response, 'No results found.')
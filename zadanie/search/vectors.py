@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchVector
+
+SEARCHED_FIELDS = {'title', 'body'}
+
+# Title words as typed, neither stemmed nor dropped as stop words, so a
+# partial word still matches as a prefix. Migrations index this exact
+# expression.
+TITLE_PREFIX_CONFIG = 'simple'
+
+
+def get_search_vector():
+    config = settings.SEARCH_CONFIG
+    title = SearchVector('title', weight = 'A', config = config)
+    body = SearchVector('body', weight = 'B', config = config)
+    return title + body
+
+
+def get_title_vector():
+    return SearchVector('title', config = TITLE_PREFIX_CONFIG)
+
+
+def get_search_query(text):
+    return SearchQuery(text, config = settings.SEARCH_CONFIG)
+
+
+def update_search_vector(instance, update_fields = None):
+    """Recompute the stored search_vector of one saved instance.
+
+    Saves that do not touch a searched field leave the vector alone.
+    """
+    if update_fields is not None:
+        if not SEARCHED_FIELDS.intersection(update_fields):
+            return 0
+    model = instance.__class__
+    queryset = model.objects.filter(pk = instance.pk)
+    return queryset.update(search_vector = get_search_vector())
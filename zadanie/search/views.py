@@ -0,0 +1,71 @@
+from django.contrib.postgres.search import SearchRank
+from django.db.models import CharField, F, Value
+from django.http import JsonResponse
+from django.views import generic
+
+from articles.models import Article
+from blog.models import Entry
+
+from .forms import SearchForm
+from .suggestions import get_suggestions
+from .vectors import get_search_query
+
+
+def get_ranked_results(model, kind, search_query):
+    queryset = model.published.filter(search_vector = search_query)
+    queryset = queryset.annotate(
+        kind = Value(kind, output_field = CharField()),
+        rank = SearchRank(F('search_vector'), search_query),
+    )
+    queryset = queryset.order_by().values('kind', 'pk', 'title', 'rank')
+    return queryset
+
+
+class SearchView(generic.ListView):
+    """Published articles and entries matching ``q``, best match first.
+
+    Both content types are searched in one UNION query ranked by
+    ts_rank over the stored search_vector columns.
+    """
+    context_object_name = 'results'
+    paginate_by = 20
+    template_name = 'search/fulltext.html'
+
+    def get_form(self):
+        form = SearchForm(self.request.GET)
+        return form
+
+    def get_query(self):
+        form = self.form
+        if not form.is_valid():
+            return ''
+        query = form.cleaned_data['q'].strip()
+        return query
+
+    def get_queryset(self):
+        self.form = self.get_form()
+        query = self.get_query()
+        if not query:
+            return Article.objects.none().values('pk')
+        search_query = get_search_query(query)
+        articles = get_ranked_results(Article, 'article', search_query)
+        entries = get_ranked_results(Entry, 'entry', search_query)
+        queryset = articles.union(entries, all = True)
+        queryset = queryset.order_by('-rank', 'kind', '-pk')
+        return queryset
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['form'] = self.form
+        context['query'] = self.get_query()
+        return context
+
+
+class SuggestView(generic.View):
+    """JSON titles of published articles and entries for ``q``."""
+
+    def get(self, request, *args, **kwargs):
+        query = request.GET.get('q', '')
+        suggestions = get_suggestions(query)
+        data = {'query': query, 'suggestions': suggestions}
+        return JsonResponse(data)
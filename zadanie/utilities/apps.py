@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class UtilitiesConfig(AppConfig):
+    name = 'utilities'
+
+    def ready(self):
+        from . import checks, metrics, profiling  # noqa: F401
+        from . import queries, tracing  # noqa: F401
@@ -0,0 +1,138 @@
+import gc
+import math
+import time
+import tracemalloc
+from importlib import import_module
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from comments.models import Comment
+from search.vectors import get_search_vector
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of ``values`` (0 < fraction <= 1)."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0
+    # Rounded first, as 0.95 * 100 is a hair above 95.
+    rank = math.ceil(round(fraction * len(ordered), 6))
+    return ordered[min(max(rank, 1), len(ordered)) - 1]
+
+
+def seed(model, number_of_objects, comments_per_object, batch_size = 1000):
+    """Create published objects with comments; return their primary keys."""
+    in_the_past = timezone.now() - timezone.timedelta(days = 1)
+    name = model._meta.model_name
+    objects = [
+        model(
+            title = '%s %s' % (name, number),
+            body = 'benchmark %s %s' % (name, number),
+            pub_date = in_the_past,
+            is_published = True,
+            comments_count = comments_per_object,
+        )
+        for number in range(number_of_objects)
+    ]
+    objects = model.objects.bulk_create(objects, batch_size = batch_size)
+    pks = [obj.pk for obj in objects]
+    model.objects.filter(pk__in = pks).update(
+        search_vector = get_search_vector(),
+    )
+    content_type = ContentType.objects.get_for_model(model)
+    comments = [
+        Comment(
+            content_type = content_type,
+            object_id = pk,
+            body = 'comment %s' % number,
+        )
+        for pk in pks
+        for number in range(comments_per_object)
+    ]
+    Comment.objects.bulk_create(comments, batch_size = batch_size)
+    return pks
+
+
+def get_routes(app_names):
+    """Named GET routes of the url modules of ``app_names``.
+
+    Yields ``(viewname, needs_pk)``; routes with a ``pk`` are requested
+    for a seeded object of the app.
+    """
+    for app_name in app_names:
+        urls = import_module('%s.urls' % app_name)
+        for pattern in urls.urlpatterns:
+            if not pattern.name:
+                continue
+            viewname = '%s:%s' % (urls.app_name, pattern.name)
+            needs_pk = 'pk' in pattern.pattern.converters
+            yield viewname, needs_pk
+
+
+def measure_route(client, path, requests, cold_cache = False):
+    """Latencies (ms), queries and allocated KiB of GET ``path``.
+
+    Latency and queries come from ``requests`` plain requests; memory
+    from one more request traced with tracemalloc, whose overhead would
+    distort the timings.
+    """
+    latencies = []
+    queries = []
+    status_code = None
+    for _ in range(requests):
+        if cold_cache:
+            cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            response = client.get(path)
+            latencies.append((time.perf_counter() - start) * 1000)
+        queries.append(len(context.captured_queries))
+        status_code = response.status_code
+
+    if cold_cache:
+        cache.clear()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        client.get(path)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'status': status_code,
+        'p50': percentile(latencies, 0.50),
+        'p95': percentile(latencies, 0.95),
+        'p99': percentile(latencies, 0.99),
+        'queries': max(queries) if queries else 0,
+        'alloc_kib': peak / 1024,
+    }
+
+
+def compare(results, baseline, threshold):
+    """Rows of ``(route, metric, baseline, current, change, regressed)``.
+
+    Latency and allocations regress when they grow by more than
+    ``threshold`` (a fraction), queries whenever there is one more.
+    """
+    rows = []
+    for route, current in sorted(results.items()):
+        previous = baseline.get(route)
+        if previous is None:
+            continue
+        for metric in ('p50', 'p95', 'p99', 'queries', 'alloc_kib'):
+            old = previous.get(metric)
+            new = current.get(metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old if old else 0
+            if metric == 'queries':
+                regressed = new > old
+            else:
+                regressed = change > threshold
+            rows.append((route, metric, old, new, change, regressed))
+    return rows
@@ -0,0 +1,50 @@
+import atexit
+import threading
+
+
+class CoalescingBuffer:
+    """Collect values per key in memory and hand them over in batches.
+
+    Values added for a key that is already buffered are combined with
+    ``merge``. The buffer is flushed ``interval`` seconds after the first
+    value arrives, as soon as it holds ``max_size`` keys, and at process
+    exit, whichever comes first.
+    """
+
+    def __init__(self, flush_callback, merge, interval, max_size):
+        self.flush_callback = flush_callback
+        self.merge = merge
+        self.interval = interval
+        self.max_size = max_size
+        self.items = {}
+        self.lock = threading.Lock()
+        self.timer = None
+        atexit.register(self.flush)
+
+    def __len__(self):
+        return len(self.items)
+
+    def add(self, key, value):
+        with self.lock:
+            if key in self.items:
+                self.items[key] = self.merge(self.items[key], value)
+            else:
+                self.items[key] = value
+            is_full = len(self.items) >= self.max_size
+            if not is_full and self.timer is None:
+                self.timer = threading.Timer(self.interval, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+        if is_full:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            items = self.items
+            self.items = {}
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+        if items:
+            self.flush_callback(items)
+        return items
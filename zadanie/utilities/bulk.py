@@ -0,0 +1,49 @@
+import csv
+from io import StringIO
+
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+def can_copy(using = DEFAULT_DB_ALIAS):
+    return connections[using].vendor == 'postgresql'
+
+
+def copy_rows(model, fields, rows, using = DEFAULT_DB_ALIAS):
+    """Insert ``rows`` (tuples of ``fields`` values) with COPY FROM STDIN.
+
+    Values are written as they are, so ``auto_now`` and ``auto_now_add``
+    fields keep the values given; fields left out get their column
+    defaults. Returns the number of rows copied.
+    """
+    buffer = StringIO()
+    writer = csv.writer(buffer, quoting = csv.QUOTE_NONNUMERIC)
+    number_of_rows = 0
+    for row in rows:
+        writer.writerow([
+            value.isoformat() if hasattr(value, 'isoformat') else value
+            for value in row
+        ])
+        number_of_rows += 1
+    buffer.seek(0)
+    connection = connections[using]
+    quote_name = connection.ops.quote_name
+    columns = ', '.join(
+        quote_name(model._meta.get_field(field).column) for field in fields
+    )
+    sql = 'COPY %s (%s) FROM STDIN WITH (FORMAT csv)' % (
+        quote_name(model._meta.db_table),
+        columns,
+    )
+    with connection.cursor() as cursor:
+        cursor.copy_expert(sql, buffer)
+    return number_of_rows
+
+
+def reset_sequences(models, using = DEFAULT_DB_ALIAS):
+    """Move primary key sequences past rows inserted with explicit ids."""
+    connection = connections[using]
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
@@ -0,0 +1,281 @@
+import functools
+import hashlib
+import math
+import random
+import secrets
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import Http404, HttpResponse
+from django.utils.cache import patch_cache_control
+
+from .metrics import get_route, increase
+from .routers import reading_from_primary
+from .surrogate import get_list_key, get_object_key, purge
+
+
+def get_list_version_name(model):
+    return '%s:list' % model._meta.label_lower
+
+
+def get_object_version_name(model, pk):
+    return '%s:%s' % (model._meta.label_lower, pk)
+
+
+def get_versions(names):
+    """Return the current version of every name, creating missing ones.
+
+    New versions start from the current time in milliseconds rather than
+    from 1, so a version key that was evicted never comes back with a
+    value that old pages are still cached under.
+    """
+    keys = ['version:%s' % name for name in names]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            initial = int(time.time() * 1000)
+            cache.add(key, initial, timeout = None)
+            versions[key] = cache.get(key, initial)
+    return [versions[key] for key in keys]
+
+
+def bump_version(name):
+    key = 'version:%s' % name
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = int(time.time() * 1000)
+        cache.set(key, version, timeout = None)
+        return version
+
+
+def invalidate_object(model, pk, lists = True):
+    """Drop the cached pages of an object, and of its lists by default.
+
+    Both the local page cache and the caching proxy in front are
+    invalidated once the current transaction commits; a page rendered
+    before that would still show the old row, under the new version.
+    """
+    def invalidate():
+        bump_version(get_object_version_name(model, pk))
+        purge([get_object_key(model, pk)])
+    transaction.on_commit(invalidate)
+    if lists:
+        invalidate_list(model)
+
+
+def invalidate_list(model):
+    def invalidate():
+        bump_version(get_list_version_name(model))
+        purge([get_list_key(model)])
+    transaction.on_commit(invalidate)
+
+
+def list_versions(model):
+    def get_version_names(request, *args, **kwargs):
+        return [get_list_version_name(model)]
+    return get_version_names
+
+
+def object_versions(model):
+    def get_version_names(request, *args, **kwargs):
+        return [get_object_version_name(model, kwargs['pk'])]
+    return get_version_names
+
+
+def is_cacheable_request(request):
+    user = getattr(request, 'user', None)
+    if user is None or user.is_authenticated:
+        return False
+    return request.method in ('GET', 'HEAD')
+
+
+def get_page_cache_key(request):
+    path = request.get_full_path().encode()
+    path_hash = hashlib.md5(path).hexdigest()
+    return 'page:%s' % path_hash
+
+
+def is_due_for_refresh(expires, delta, now):
+    """Whether to regenerate a fresh value before it expires.
+
+    The chance grows as expiry nears and with the time the value took
+    to compute (``delta``), so one worker usually refreshes a hot key
+    ahead of the others ("XFetch").
+    """
+    beta = settings.PAGE_CACHE_EARLY_REFRESH_BETA
+    return now - delta * beta * math.log(1 - random.random()) >= expires
+
+
+def acquire_lock(key):
+    token = secrets.token_hex(8)
+    lock_key = 'lock:%s' % key
+    if cache.add(lock_key, token, settings.PAGE_CACHE_LOCK_TIMEOUT):
+        return token
+    return None
+
+
+def release_lock(key, token):
+    lock_key = 'lock:%s' % key
+    if cache.get(lock_key) == token:
+        cache.delete(lock_key)
+
+
+def get_age(entry):
+    """Seconds since the value of a read_through() entry was computed."""
+    value, version, expires, delta = entry
+    computed_at = expires - settings.PAGE_CACHE_TIMEOUT
+    return max(0, int(time.time() - computed_at))
+
+
+def mark_stale(response, entry):
+    """Keep caches in front from storing a stale page as a fresh one."""
+    response['Age'] = str(get_age(entry))
+    patch_cache_control(response, no_store = True)
+    return response
+
+
+def read_through(key, version, regenerate, labels = ()):
+    """``(value, result, stale_entry)`` of ``key`` at ``version``.
+
+    ``regenerate()`` returns ``(value, result)``; a value that is not
+    None is cached, and result is whatever the caller needs back from a
+    fresh computation (None when the value came from the cache).
+    stale_entry is the cache entry when a stale value is served, and
+    None otherwise. A None
+    value drops what was cached, so a page that is gone is not served
+    stale by the workers waiting for the lock.
+
+    A value of another version or past PAGE_CACHE_TIMEOUT is stale but
+    kept for PAGE_CACHE_STALE_TIMEOUT more: while one worker holds the
+    lock and regenerates it, the others serve it as it is. Without any
+    value the others wait up to PAGE_CACHE_LOCK_WAIT seconds for the
+    one regenerating. Fresh values are refreshed early now and then.
+
+    ``regenerate()`` reads from the primary unless it refreshes a value
+    of the same version computed more than READ_YOUR_WRITES_SECONDS ago,
+    by when the replicas have caught up with what that value showed; a
+    lagging replica would store old content under a new version.
+    """
+    entry = cache.get(key)
+    now = time.time()
+    if entry is None:
+        increase('zadanie_page_cache_misses_total', labels)
+        reason = 'missing'
+    else:
+        value, entry_version, expires, delta = entry
+        if entry_version == version and expires > now:
+            if not is_due_for_refresh(expires, delta, now):
+                increase('zadanie_page_cache_hits_total', labels + (
+                    ('state', 'fresh'),
+                ))
+                return value, None, None
+            reason = 'early'
+        else:
+            reason = 'expired'
+    from_replica = False
+    if entry is not None and entry[1] == version:
+        from_replica = get_age(entry) > settings.READ_YOUR_WRITES_SECONDS
+
+    token = acquire_lock(key)
+    if token is None and entry is not None:
+        if reason == 'early':
+            increase('zadanie_page_cache_hits_total', labels + (
+                ('state', 'fresh'),
+            ))
+            return value, None, None
+        increase('zadanie_page_cache_hits_total', labels + (
+            ('state', 'stale'),
+        ))
+        return value, None, entry
+    deadline = now + settings.PAGE_CACHE_LOCK_WAIT
+    while token is None and time.time() < deadline:
+        time.sleep(settings.PAGE_CACHE_LOCK_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None and entry[1] == version:
+            increase('zadanie_page_cache_hits_total', labels + (
+                ('state', 'coalesced'),
+            ))
+            return entry[0], None, None
+        token = acquire_lock(key)
+
+    increase('zadanie_page_cache_regenerations_total', labels + (
+        ('reason', reason),
+    ))
+    try:
+        start = time.time()
+        if from_replica:
+            value, result = regenerate()
+        else:
+            with reading_from_primary():
+                value, result = regenerate()
+        if value is not None:
+            end = time.time()
+            expires = end + settings.PAGE_CACHE_TIMEOUT
+            timeout = (
+                settings.PAGE_CACHE_TIMEOUT + settings.PAGE_CACHE_STALE_TIMEOUT
+            )
+            cache.set(key, (value, version, expires, end - start), timeout)
+        else:
+            cache.delete(key)
+    finally:
+        if token is not None:
+            release_lock(key, token)
+    return value, result, None
+
+
+def cache_page_versioned(get_version_names):
+    """Cache full responses for anonymous users under version keys.
+
+    ``get_version_names(request, *args, **kwargs)`` names the versions
+    the page depends on; bumping any of them makes the cached page
+    stale, and read_through() lets one worker render it again while the
+    others serve the stale one, marked with its Age and no-store.
+    """
+    def decorator(view_func):
+        @functools.wraps(view_func)
+        def wrapped_view(request, *args, **kwargs):
+            if not is_cacheable_request(request):
+                return view_func(request, *args, **kwargs)
+            names = get_version_names(request, *args, **kwargs)
+            versions = get_versions(names)
+            version = '.'.join(str(version) for version in versions)
+            key = get_page_cache_key(request)
+
+            def regenerate():
+                try:
+                    response = view_func(request, *args, **kwargs)
+                    if hasattr(response, 'render') and callable(
+                        response.render,
+                    ):
+                        response = response.render()
+                except Http404:
+                    cache.delete(key)
+                    raise
+                if response.status_code != 200 or response.streaming:
+                    return None, response
+                content = response.content.decode(response.charset)
+                return (response['Content-Type'], content), response
+
+            labels = (('route', get_route(request)),)
+            cached, response, stale_entry = read_through(
+                key,
+                version,
+                regenerate,
+                labels,
+            )
+            if response is None:
+                response = build_response(cached)
+            if stale_entry is not None:
+                mark_stale(response, stale_entry)
+            return response
+        return wrapped_view
+    return decorator
+
+
+def build_response(cached):
+    content_type, content = cached
+    response = HttpResponse(content, content_type = content_type)
+    return response
@@ -0,0 +1,49 @@
+import sys
+
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+from celery.signals import worker_init
+
+PROCESS_LOCAL_CACHES = {'django.core.cache.backends.locmem.LocMemCache'}
+SHARED_CACHE_HINT = (
+    'Page versions, page cache locks and the database outage flag are '
+    'set by one process and read by the others. Set CACHE_BACKEND to '
+    'Memcached or Redis.'
+)
+
+
+def is_cache_shared():
+    return settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    if settings.DEBUG or is_cache_shared():
+        return []
+    return [Warning(
+        'The default cache is local to each process.',
+        hint = SHARED_CACHE_HINT,
+        id = 'utilities.W001',
+    )]
+
+
+@register(Tags.caches, deploy = True)
+def check_shared_cache_deploy(app_configs, **kwargs):
+    if is_cache_shared():
+        return []
+    return [Error(
+        'The default cache is local to each process.',
+        hint = SHARED_CACHE_HINT,
+        id = 'utilities.E001',
+    )]
+
+
+@worker_init.connect
+def refuse_process_local_cache(**kwargs):
+    # A worker is a process of its own: the versions it bumps after
+    # writes would never reach the web processes. Celery logs and
+    # swallows exceptions of signal handlers, so only an exit stops it.
+    # As with check_shared_cache(), development setups are let through.
+    if not settings.DEBUG and not is_cache_shared():
+        sys.exit('Celery workers need a shared cache. %s' % SHARED_CACHE_HINT)
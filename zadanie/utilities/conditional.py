@@ -0,0 +1,76 @@
+import functools
+
+from django.views.decorators.http import condition
+
+from .cache import get_list_version_name, get_object_version_name
+from .cache import get_versions
+from .cache import is_cacheable_request
+from .routers import reading_from_primary
+
+
+def object_validators(manager):
+    """Validators of a detail page from the object version in the cache.
+
+    Edits, publishing, new and deleted comments and comments_count
+    flushes all bump that version, so no query is needed. There is no
+    Last-Modified; the ETag alone answers conditional GETs.
+    """
+    def get_validators(request, *args, **kwargs):
+        name = get_object_version_name(manager.model, kwargs['pk'])
+        version, = get_versions([name])
+        return (str(version), None)
+    return get_validators
+
+
+def list_validators(manager):
+    """Validators of a list page from the list version in the cache.
+
+    Every change that can show on a list (an edit, a delete, an object
+    going live, an import) bumps that version, so no query is needed.
+    There is no Last-Modified; the ETag alone answers conditional GETs.
+    """
+    def get_validators(request, *args, **kwargs):
+        name = get_list_version_name(manager.model)
+        version, = get_versions([name])
+        return (str(version), None)
+    return get_validators
+
+
+def conditional_page(get_validators):
+    """Answer conditional GETs of anonymous visitors before rendering.
+
+    ``get_validators(request, *args, **kwargs)`` returns ``(etag,
+    last_modified)``; it runs once per request and a matching
+    If-None-Match or If-Modified-Since gets a 304 without calling the
+    view. Pages of logged in users differ per user, so they are left
+    alone.
+    """
+    def decorator(view_func):
+
+        def get_request_validators(request, *args, **kwargs):
+            validators = getattr(request, '_page_validators', None)
+            if validators is None:
+                # Validators from a lagging replica would hand out 304s
+                # for pages that already changed.
+                with reading_from_primary():
+                    validators = get_validators(request, *args, **kwargs)
+                request._page_validators = validators
+            return validators
+
+        def etag_func(request, *args, **kwargs):
+            return get_request_validators(request, *args, **kwargs)[0]
+
+        def last_modified_func(request, *args, **kwargs):
+            return get_request_validators(request, *args, **kwargs)[1]
+
+        conditional_view = condition(etag_func, last_modified_func)(
+            view_func,
+        )
+
+        @functools.wraps(view_func)
+        def wrapped_view(request, *args, **kwargs):
+            if not is_cacheable_request(request):
+                return view_func(request, *args, **kwargs)
+            return conditional_view(request, *args, **kwargs)
+        return wrapped_view
+    return decorator
@@ -0,0 +1,92 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from utilities.benchmark import measure_route
+
+PIPELINE_MIDDLEWARE = 'utilities.pipeline.RouteAwarePipelineMiddleware'
+
+
+def get_flat_middleware():
+    """MIDDLEWARE with the full path inlined, as it was before the split."""
+    middleware = []
+    for middleware_path in settings.MIDDLEWARE:
+        if middleware_path == PIPELINE_MIDDLEWARE:
+            middleware.extend(settings.FULL_PATH_MIDDLEWARE)
+        else:
+            middleware.append(middleware_path)
+    return middleware
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the per-request cost of anonymous GETs of public routes '
+        'through the flat middleware stack and through the route-aware '
+        'pipeline. Pages are requested warm, so the difference is mostly '
+        'the middleware.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'routes',
+            nargs = '*',
+            default = ['home', 'articles:list', 'blog:entries'],
+            help = 'URL names without arguments to request.',
+        )
+        parser.add_argument(
+            '--requests',
+            type = int,
+            default = 500,
+            help = 'Number of measured requests per route and stack.',
+        )
+        parser.add_argument(
+            '--warmup',
+            type = int,
+            default = 50,
+            help = 'Number of unmeasured requests per route and stack.',
+        )
+
+    def handle(self, *args, **options):
+        stacks = [
+            ('flat', get_flat_middleware()),
+            ('pipeline', settings.MIDDLEWARE),
+        ]
+        self.stdout.write(
+            '%-18s %-9s %9s %9s %8s %10s  %s' % (
+                'route', 'stack', 'p50 ms', 'p95 ms', 'queries',
+                'alloc KiB', 'headers',
+            )
+        )
+        for viewname in options['routes']:
+            path = reverse(viewname)
+            p50s = []
+            for label, middleware in stacks:
+                with override_settings(MIDDLEWARE = middleware):
+                    client = Client(HTTP_HOST = 'localhost')
+                    for _ in range(options['warmup']):
+                        response = client.get(path)
+                    result = measure_route(client, path, options['requests'])
+                p50s.append(result['p50'])
+                headers = ', '.join(
+                    '%s: %s' % (header, response[header])
+                    for header in ('Vary', 'Cache-Control')
+                    if response.has_header(header)
+                )
+                self.stdout.write(
+                    '%-18s %-9s %9.3f %9.3f %8s %10.1f  %s' % (
+                        viewname,
+                        label,
+                        result['p50'],
+                        result['p95'],
+                        result['queries'],
+                        result['alloc_kib'],
+                        headers,
+                    )
+                )
+            flat, pipeline = p50s
+            saved = (flat - pipeline) / flat if flat else 0
+            self.stdout.write(
+                '%-18s %-9s %+9.3f ms per request (%.0f%%)'
+                % (viewname, 'saved', flat - pipeline, saved * 100)
+            )
@@ -0,0 +1,182 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.urls import reverse
+
+from comments.management.commands.recount_comments import (
+    get_commented_models,
+)
+from utilities.benchmark import compare, get_routes, measure_route, seed
+from utilities.cache import bump_version, get_list_version_name
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed articles and entries with comments, request every named '
+        'route of articles/urls.py and blog/urls.py through the test '
+        'client as an anonymous visitor, and report p50/p95/p99 latency, '
+        'queries and allocated memory per request. Results can be saved '
+        'as a baseline and later runs compared against it. Runs inside a '
+        'transaction that is rolled back, so no data is left behind.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--objects',
+            type = int,
+            default = 100,
+            help = 'Number of articles and of entries to seed.',
+        )
+        parser.add_argument(
+            '--comments',
+            type = int,
+            default = 10,
+            help = 'Number of comments of every seeded object.',
+        )
+        parser.add_argument(
+            '--requests',
+            type = int,
+            default = 50,
+            help = 'Number of measured requests per route.',
+        )
+        parser.add_argument(
+            '--warmup',
+            type = int,
+            default = 3,
+            help = 'Number of unmeasured requests per route.',
+        )
+        parser.add_argument(
+            '--cold-cache',
+            action = 'store_true',
+            help = 'Clear the cache before every request.',
+        )
+        parser.add_argument(
+            '--baseline',
+            help = 'JSON file of an earlier run to compare against.',
+        )
+        parser.add_argument(
+            '--save-baseline',
+            help = 'JSON file to write the results of this run to.',
+        )
+        parser.add_argument(
+            '--threshold',
+            type = float,
+            default = 0.1,
+            help = 'Relative growth of latency or memory that regresses.',
+        )
+        parser.add_argument(
+            '--fail-on-regression',
+            action = 'store_true',
+            help = 'Exit with an error when the comparison finds any.',
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as baseline_file:
+                    baseline = json.load(baseline_file)['routes']
+            except (OSError, ValueError, KeyError) as error:
+                raise CommandError(
+                    'Cannot read baseline %s: %s'
+                    % (options['baseline'], error)
+                )
+
+        models = get_commented_models()
+        with transaction.atomic():
+            pks = {}
+            for model in models:
+                pks[model._meta.app_label] = seed(
+                    model,
+                    options['objects'],
+                    options['comments'],
+                )
+                bump_version(get_list_version_name(model))
+            results = self.run(pks, options)
+            transaction.set_rollback(True)
+        for model in models:
+            bump_version(get_list_version_name(model))
+
+        self.report(results)
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w') as baseline_file:
+                json.dump({
+                    'objects': options['objects'],
+                    'comments': options['comments'],
+                    'requests': options['requests'],
+                    'cold_cache': options['cold_cache'],
+                    'routes': results,
+                }, baseline_file, indent = 2, sort_keys = True)
+        if baseline is not None:
+            rows = compare(results, baseline, options['threshold'])
+            regressions = self.report_comparison(rows)
+            if regressions and options['fail_on_regression']:
+                raise CommandError(
+                    '%s metrics regressed against the baseline.'
+                    % regressions
+                )
+
+    def run(self, pks, options):
+        client = Client(HTTP_HOST = 'localhost')
+        results = {}
+        for app_name, app_pks in sorted(pks.items()):
+            # A published object from the middle of the list, so detail
+            # pages are not all served from the first rows of the table.
+            pk = app_pks[len(app_pks) // 2] if app_pks else 0
+            for viewname, needs_pk in get_routes([app_name]):
+                kwargs = {'pk': pk} if needs_pk else {}
+                path = reverse(viewname, kwargs = kwargs)
+                for _ in range(options['warmup']):
+                    client.get(path)
+                results[viewname] = measure_route(
+                    client,
+                    path,
+                    options['requests'],
+                    cold_cache = options['cold_cache'],
+                )
+        return results
+
+    def report(self, results):
+        self.stdout.write(
+            '%-24s %6s %9s %9s %9s %8s %10s' % (
+                'route', 'status', 'p50 ms', 'p95 ms', 'p99 ms',
+                'queries', 'alloc KiB',
+            )
+        )
+        for viewname, result in sorted(results.items()):
+            self.stdout.write(
+                '%-24s %6s %9.2f %9.2f %9.2f %8s %10.1f' % (
+                    viewname,
+                    result['status'],
+                    result['p50'],
+                    result['p95'],
+                    result['p99'],
+                    result['queries'],
+                    result['alloc_kib'],
+                )
+            )
+
+    def report_comparison(self, rows):
+        regressions = 0
+        self.stdout.write('')
+        self.stdout.write(
+            '%-24s %-9s %10s %10s %8s' % (
+                'route', 'metric', 'baseline', 'current', 'change',
+            )
+        )
+        for route, metric, old, new, change, regressed in rows:
+            if regressed:
+                regressions += 1
+            line = '%-24s %-9s %10.2f %10.2f %+7.1f%% %s' % (
+                route,
+                metric,
+                old,
+                new,
+                change * 100,
+                'REGRESSION' if regressed else '',
+            )
+            self.stdout.write(line.rstrip())
+        self.stdout.write('%s regressions' % regressions)
+        return regressions
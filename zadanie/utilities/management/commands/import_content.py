@@ -0,0 +1,282 @@
+import csv
+import itertools
+import json
+import os
+import time
+from collections import defaultdict
+
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from comments.counters import update_comments_counts
+from comments.models import Comment
+from search.vectors import get_search_vector
+from utilities.bulk import can_copy, copy_rows, reset_sequences
+from utilities.cache import invalidate_list
+from utilities.surrogate import purge_buffer
+
+OBJECT_FIELDS = ['title', 'body', 'created', 'modified', 'pub_date']
+COMMENT_TYPE = 'comments.comment'
+
+
+def read_records(path, input_format):
+    with open(path, newline = '') as input_file:
+        if input_format == 'csv':
+            for row in csv.DictReader(input_file):
+                yield {
+                    field: value for field, value in row.items()
+                    if value != ''
+                }
+        else:
+            for line in input_file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def read_checkpoint(path):
+    if path is None or not os.path.exists(path):
+        return 0
+    with open(path) as checkpoint_file:
+        return int(checkpoint_file.read().strip() or 0)
+
+
+def write_checkpoint(path, number_of_records):
+    if path is None:
+        return
+    temporary_path = path + '.tmp'
+    with open(temporary_path, 'w') as checkpoint_file:
+        checkpoint_file.write(str(number_of_records))
+    os.replace(temporary_path, path)
+
+
+def to_python(model, field_name, value):
+    return model._meta.get_field(field_name).to_python(value)
+
+
+def get_object_id(record):
+    return to_python(Comment, 'object_id', record['object_id'])
+
+
+class Command(BaseCommand):
+    help = (
+        'Import articles, entries and comments from NDJSON or CSV in the '
+        'format written by export_content. Every chunk is inserted in one '
+        'transaction with COPY on PostgreSQL (bulk_create otherwise, '
+        'which stamps created and modified with the current time), '
+        'comments are attached through content_type and object_id, and '
+        'comments_count is set in the same pass. With --checkpoint an '
+        'interrupted import continues after the last committed chunk.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help = 'File to import.')
+        parser.add_argument(
+            '--format',
+            choices = ['csv', 'ndjson'],
+            help = 'Input format, guessed from the file extension if omitted.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type = int,
+            default = 1000,
+            help = 'Number of records inserted per transaction.',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help = 'File recording how many records are already imported.',
+        )
+        parser.add_argument(
+            '--no-copy',
+            action = 'store_true',
+            help = 'Use bulk_create even on PostgreSQL.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError('%s does not exist.' % path)
+        input_format = options['format']
+        if input_format is None:
+            is_csv = path.endswith('.csv')
+            input_format = 'csv' if is_csv else 'ndjson'
+        chunk_size = options['chunk_size']
+        checkpoint = options['checkpoint']
+        self.use_copy = can_copy() and not options['no_copy']
+        self.pending_counts = defaultdict(int)
+        self.models_with_ids = set()
+        self.imported_models = set()
+        self.number_of_objects = 0
+        self.number_of_comments = 0
+
+        start = time.perf_counter()
+        skipped = read_checkpoint(checkpoint)
+        records = read_records(path, input_format)
+        records = itertools.islice(records, skipped, None)
+        number_of_records = skipped
+        while True:
+            chunk = list(itertools.islice(records, chunk_size))
+            if not chunk:
+                break
+            with transaction.atomic():
+                self.import_chunk(chunk)
+            number_of_records += len(chunk)
+            write_checkpoint(checkpoint, number_of_records)
+            elapsed = time.perf_counter() - start
+            self.stderr.write(
+                '%s records imported, %.0f rows/s'
+                % (number_of_records, self.get_rate(elapsed))
+            )
+
+        self.finish()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            'imported %s objects and %s comments in %.2fs (%.0f rows/s)'
+            % (
+                self.number_of_objects,
+                self.number_of_comments,
+                elapsed,
+                self.get_rate(elapsed),
+            )
+        )
+        if skipped:
+            self.stdout.write('skipped %s records imported before' % skipped)
+        orphans = sum(self.pending_counts.values())
+        if orphans:
+            self.stdout.write(
+                '%s comments belong to objects that do not exist' % orphans
+            )
+
+    def get_rate(self, elapsed):
+        rows = self.number_of_objects + self.number_of_comments
+        return rows / elapsed if elapsed else 0
+
+    def import_chunk(self, chunk):
+        objects_per_model = defaultdict(list)
+        comments_per_model = defaultdict(list)
+        for record in chunk:
+            record_type = record.get('type')
+            if record_type == COMMENT_TYPE:
+                model = apps.get_model(record['object_type'])
+                comments_per_model[model].append(record)
+            elif record_type:
+                model = apps.get_model(record_type)
+                objects_per_model[model].append(record)
+            else:
+                raise CommandError('Record without a type: %r' % record)
+
+        counts = defaultdict(int)
+        for model, records in comments_per_model.items():
+            for record in records:
+                object_id = get_object_id(record)
+                counts[(model, object_id)] += 1
+
+        for model, records in objects_per_model.items():
+            self.create_objects(model, records, counts)
+        for model, records in comments_per_model.items():
+            self.create_comments(model, records)
+
+        deltas = []
+        missing_per_model = defaultdict(dict)
+        for (model, pk), count in counts.items():
+            missing_per_model[model][pk] = count
+        for model, model_counts in missing_per_model.items():
+            existing_pks = model.objects.filter(
+                pk__in = list(model_counts),
+            ).values_list('pk', flat = True)
+            for pk in existing_pks:
+                count = model_counts.pop(pk)
+                deltas.append(
+                    (model._meta.app_label, model._meta.model_name, pk, count)
+                )
+            for pk, count in model_counts.items():
+                self.pending_counts[(model, pk)] += count
+        if deltas:
+            update_comments_counts(deltas)
+
+    def create_objects(self, model, records, counts):
+        now = timezone.now()
+        instances = []
+        for record in records:
+            instance = model(**{
+                field: to_python(model, field, record[field])
+                for field in OBJECT_FIELDS if field in record
+            })
+            if 'id' in record:
+                instance.pk = to_python(model, 'id', record['id'])
+                self.models_with_ids.add(model)
+                key = (model, instance.pk)
+                instance.comments_count = (
+                    counts.pop(key, 0) + self.pending_counts.pop(key, 0)
+                )
+            instance.is_published = instance.pub_date < now
+            if instance.created is None:
+                instance.created = now
+            if instance.modified is None:
+                instance.modified = now
+            instances.append(instance)
+
+        has_ids = all(instance.pk is not None for instance in instances)
+        if self.use_copy and has_ids:
+            fields = ['id', 'is_published', 'comments_count'] + OBJECT_FIELDS
+            rows = (
+                [getattr(instance, field) for field in fields]
+                for instance in instances
+            )
+            copy_rows(model, fields, rows)
+        else:
+            model.objects.bulk_create(instances)
+
+        pks = [instance.pk for instance in instances if instance.pk]
+        model.objects.filter(pk__in = pks).update(
+            search_vector = get_search_vector(),
+        )
+        self.imported_models.add(model)
+        self.number_of_objects += len(instances)
+
+    def create_comments(self, model, records):
+        content_type = ContentType.objects.get_for_model(model)
+        now = timezone.now()
+        comments = []
+        for record in records:
+            comment = Comment(
+                content_type = content_type,
+                object_id = get_object_id(record),
+                body = record.get('body', ''),
+            )
+            if 'created' in record:
+                created = record['created']
+                comment.created = to_python(Comment, 'created', created)
+            else:
+                comment.created = now
+            comments.append(comment)
+
+        if self.use_copy:
+            fields = ['content_type', 'object_id', 'body', 'created']
+            rows = (
+                [
+                    comment.content_type_id,
+                    comment.object_id,
+                    comment.body,
+                    comment.created,
+                ]
+                for comment in comments
+            )
+            copy_rows(Comment, fields, rows)
+        else:
+            Comment.objects.bulk_create(comments)
+        self.number_of_comments += len(comments)
+
+    def finish(self):
+        if self.models_with_ids:
+            reset_sequences(sorted(
+                self.models_with_ids,
+                key = lambda model: model._meta.label,
+            ))
+        for model in self.imported_models:
+            invalidate_list(model)
+        # Send the purges now; the atexit flush is not a promise the
+        # interpreter keeps on every way out of a command.
+        purge_buffer.flush()
@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from utilities.profiling import make_token
+
+
+class Command(BaseCommand):
+    help = (
+        'Print a signed value for the profiling header. A request sending '
+        'it is profiled whatever the sample rate, until the token expires.'
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write('%s: %s' % (settings.PROFILING_HEADER, make_token()))
@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from utilities.queries import get_report, query_totals
+
+ORDERINGS = {
+    'count': 'queries',
+    'repeated': 'repeated',
+    'slow': 'slow',
+    'time': 'seconds',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Show the SQL statements that cost the most, per view or task, '
+        'as fingerprinted by utilities.queries. Statements repeated more '
+        'than QUERY_REPEAT_THRESHOLD times in one request are counted as '
+        'possible N+1 patterns. Statistics of other processes are read '
+        'from METRICS_DIRECTORY.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type = int,
+            default = 20,
+            help = 'Number of statements to show.',
+        )
+        parser.add_argument(
+            '--order-by',
+            choices = sorted(ORDERINGS),
+            default = 'time',
+            help = 'Rank statements by total time, count, N+1 or slow runs.',
+        )
+        parser.add_argument(
+            '--view',
+            help = 'Only show statements of this URL or task name.',
+        )
+
+    def handle(self, *args, **options):
+        report = get_report(query_totals.collect(), view = options['view'])
+        field = ORDERINGS[options['order_by']]
+        report.sort(key = lambda row: row[field], reverse = True)
+        report = report[:options['limit']]
+        if not report:
+            self.stdout.write('No queries observed.')
+            return
+
+        self.stdout.write(
+            '%-28s %8s %10s %8s %8s %6s %8s  %s' % (
+                'view', 'queries', 'total ms', 'mean ms', 'per unit',
+                'slow', 'N+1', 'statement',
+            )
+        )
+        for row in report:
+            self.stdout.write(
+                '%-28s %8d %10.1f %8.2f %8.1f %6d %8d  %s' % (
+                    row['view'],
+                    row['queries'],
+                    row['seconds'] * 1000,
+                    row['mean_ms'],
+                    row['per_unit'],
+                    row['slow'],
+                    row['repeated'],
+                    row['sql'],
+                )
+            )
+        self.stdout.write(
+            'N+1: statements run more than %s times in one request or task.'
+            % settings.QUERY_REPEAT_THRESHOLD
+        )
@@ -0,0 +1,47 @@
+from http.server import ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+from utilities.tracing import CollectorHandler
+
+
+class Command(BaseCommand):
+    help = (
+        'Run a local stand-in for an OTLP/HTTP trace collector. Spans '
+        'POSTed as JSON, for example by TRACING_OTLP_ENDPOINT set to '
+        'http://127.0.0.1:4318/v1/traces, are appended to a JSON lines '
+        'file.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--address',
+            default = '127.0.0.1',
+            help = 'Address to listen on.',
+        )
+        parser.add_argument(
+            '--port',
+            type = int,
+            default = 4318,
+            help = 'Port to listen on.',
+        )
+        parser.add_argument(
+            '--output',
+            default = 'spans.jsonl',
+            help = 'File the received spans are appended to.',
+        )
+
+    def handle(self, *args, **options):
+        address = (options['address'], options['port'])
+        server = ThreadingHTTPServer(address, CollectorHandler)
+        server.output_path = options['output']
+        self.stdout.write(
+            'Collecting spans on http://%s:%s/v1/traces into %s'
+            % (options['address'], options['port'], options['output'])
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
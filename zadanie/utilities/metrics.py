@@ -0,0 +1,333 @@
+import glob
+import json
+import operator
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from celery.signals import after_task_publish, before_task_publish
+
+from .buffers import CoalescingBuffer
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576)
+
+# name: (type, help)
+FAMILIES = {
+    'zadanie_request_duration_seconds': (
+        'histogram',
+        'Time spent handling a request, per URL name.',
+    ),
+    'zadanie_request_queries_total': (
+        'counter',
+        'SQL queries executed while handling requests.',
+    ),
+    'zadanie_request_query_seconds_total': (
+        'counter',
+        'Time spent in SQL queries while handling requests.',
+    ),
+    'zadanie_request_render_seconds_total': (
+        'counter',
+        'Time spent rendering templates of template responses.',
+    ),
+    'zadanie_response_size_bytes': (
+        'histogram',
+        'Size of response bodies, per URL name.',
+    ),
+    'zadanie_page_cache_hits_total': (
+        'counter',
+        'Pages served from the page cache, per state of the page.',
+    ),
+    'zadanie_page_cache_misses_total': (
+        'counter',
+        'Pages that were not in the page cache at all.',
+    ),
+    'zadanie_page_cache_regenerations_total': (
+        'counter',
+        'Pages rendered for the page cache, per reason.',
+    ),
+    'zadanie_celery_enqueue_seconds': (
+        'histogram',
+        'Time spent publishing a task to the broker, per task.',
+    ),
+}
+UNRESOLVED_ROUTE = '<unresolved>'
+
+_publishing = threading.local()
+
+
+def to_key(value):
+    """JSON lists back to the tuples they were written from."""
+    if isinstance(value, list):
+        return tuple(to_key(item) for item in value)
+    return value
+
+
+class ProcessTotals:
+    """Counters summed per process and shared with the other workers.
+
+    Deltas are buffered and added to the totals of the process every
+    METRICS_FLUSH_INTERVAL seconds. With ``settings.METRICS_DIRECTORY``
+    every process also writes its totals to a file of its own there, so
+    writers never contend, and collect() sums the files of all workers.
+    A process that reuses the pid of a dead one carries on from its
+    totals instead of resetting them.
+    """
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.totals = defaultdict(float)
+        self.lock = threading.Lock()
+        self.loaded = False
+        self.buffer = CoalescingBuffer(
+            flush_callback = self.store,
+            merge = operator.add,
+            interval = settings.METRICS_FLUSH_INTERVAL,
+            max_size = settings.METRICS_FLUSH_SIZE,
+        )
+
+    def add(self, key, amount = 1):
+        self.buffer.add(key, amount)
+
+    def get_path(self, directory):
+        file_name = '%s-%s.json' % (self.prefix, os.getpid())
+        return os.path.join(directory, file_name)
+
+    def read(self, path):
+        with open(path) as totals_file:
+            return {
+                to_key(key): value for key, value in json.load(totals_file)
+            }
+
+    def write(self, path):
+        temporary_path = path + '.tmp'
+        with open(temporary_path, 'w') as totals_file:
+            json.dump(list(self.totals.items()), totals_file)
+        os.replace(temporary_path, path)
+
+    def load(self, directory):
+        if directory and not self.loaded:
+            path = self.get_path(directory)
+            if os.path.exists(path):
+                for key, value in self.read(path).items():
+                    self.totals[key] += value
+        self.loaded = True
+
+    def store(self, items):
+        directory = settings.METRICS_DIRECTORY
+        with self.lock:
+            self.load(directory)
+            for key, delta in items.items():
+                self.totals[key] += delta
+            if directory:
+                os.makedirs(directory, exist_ok = True)
+                self.write(self.get_path(directory))
+
+    def collect(self):
+        """Totals of this process plus those other workers have written."""
+        self.buffer.flush()
+        directory = settings.METRICS_DIRECTORY
+        with self.lock:
+            self.load(directory)
+            totals = defaultdict(float, self.totals)
+        if not directory:
+            return totals
+        own_path = self.get_path(directory)
+        pattern = os.path.join(directory, '%s-*.json' % self.prefix)
+        for path in glob.glob(pattern):
+            if path == own_path:
+                continue
+            try:
+                process_totals = self.read(path)
+            except (OSError, ValueError):
+                # Removed or replaced between glob and open.
+                continue
+            for key, value in process_totals.items():
+                totals[key] += value
+        return totals
+
+
+# Keyed by (name, labels), where labels is a tuple of (label, value).
+request_metrics = ProcessTotals('metrics')
+
+
+def increase(name, labels, amount = 1):
+    request_metrics.add((name, labels), amount)
+
+
+def observe(name, labels, value, buckets):
+    for bound in buckets:
+        if value <= bound:
+            increase(name + '_bucket', labels + (('le', repr(bound)),))
+    increase(name + '_bucket', labels + (('le', '+Inf'),))
+    increase(name + '_sum', labels, value)
+    increase(name + '_count', labels)
+
+
+def collect():
+    return request_metrics.collect()
+
+
+def get_family(name):
+    for suffix in ('_bucket', '_sum', '_count'):
+        family = name[:-len(suffix)]
+        if name.endswith(suffix) and family in FAMILIES:
+            return family
+    return name
+
+
+def format_value(value):
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    pairs = []
+    for key, value in labels:
+        value = value.replace('\\', '\\\\').replace('\n', '\\n')
+        pairs.append('%s="%s"' % (key, value.replace('"', '\\"')))
+    return '{%s}' % ','.join(pairs)
+
+
+def get_sort_key(item):
+    (name, labels), value = item
+    bound = dict(labels).get('le')
+    other_labels = tuple(pair for pair in labels if pair[0] != 'le')
+    if bound is None:
+        bound = float('inf')
+    else:
+        bound = float(bound)
+    return (get_family(name), other_labels, name, bound)
+
+
+def render(samples):
+    """Samples in the Prometheus text exposition format."""
+    lines = []
+    family = None
+    for (name, labels), value in sorted(samples.items(), key = get_sort_key):
+        sample_family = get_family(name)
+        if sample_family != family:
+            family = sample_family
+            family_type, family_help = FAMILIES.get(
+                family,
+                ('untyped', ''),
+            )
+            lines.append('# HELP %s %s' % (family, family_help))
+            lines.append('# TYPE %s %s' % (family, family_type))
+        lines.append(
+            '%s%s %s' % (name, format_labels(labels), format_value(value))
+        )
+    return '\n'.join(lines) + '\n'
+
+
+class QueryTimer:
+    """Database execute wrapper counting queries and their duration."""
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.queries += 1
+
+
+def get_route(request):
+    resolver_match = getattr(request, 'resolver_match', None)
+    if resolver_match is None:
+        return UNRESOLVED_ROUTE
+    return resolver_match.view_name
+
+
+class MetricsMiddleware:
+    """Record latency, SQL, render time and size of every request.
+
+    Samples are labelled with the resolved URL name, so unknown paths
+    share one label instead of growing a series each. It goes first in
+    MIDDLEWARE: its process_template_response then runs right before
+    the template is rendered.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        query_timer = QueryTimer()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(query_timer))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        labels = (('route', get_route(request)),)
+        observe(
+            'zadanie_request_duration_seconds',
+            labels,
+            duration,
+            LATENCY_BUCKETS,
+        )
+        increase('zadanie_request_queries_total', labels, query_timer.queries)
+        increase(
+            'zadanie_request_query_seconds_total',
+            labels,
+            query_timer.seconds,
+        )
+        render_seconds = getattr(request, '_render_seconds', None)
+        if render_seconds is not None:
+            increase(
+                'zadanie_request_render_seconds_total',
+                labels,
+                render_seconds,
+            )
+        if not response.streaming:
+            observe(
+                'zadanie_response_size_bytes',
+                labels,
+                len(response.content),
+                SIZE_BUCKETS,
+            )
+        return response
+
+    def process_template_response(self, request, response):
+        start = time.perf_counter()
+
+        def record_render_time(response):
+            request._render_seconds = time.perf_counter() - start
+
+        response.add_post_render_callback(record_render_time)
+        return response
+
+
+@before_task_publish.connect
+def start_publish_timer(headers = None, **kwargs):
+    task_id = (headers or {}).get('id')
+    _publishing.started = (task_id, time.perf_counter())
+
+
+@after_task_publish.connect
+def record_publish_time(sender = None, headers = None, **kwargs):
+    task_id, started = getattr(_publishing, 'started', (None, None))
+    if started is None or task_id != (headers or {}).get('id'):
+        return
+    _publishing.started = (None, None)
+    observe(
+        'zadanie_celery_enqueue_seconds',
+        (('task', str(sender)),),
+        time.perf_counter() - started,
+        LATENCY_BUCKETS,
+    )
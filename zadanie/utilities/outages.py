@@ -0,0 +1,131 @@
+import functools
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import InterfaceError, OperationalError
+from django.http import HttpResponse
+
+from .cache import build_response, get_page_cache_key, is_cacheable_request
+from .cache import mark_stale
+from .metrics import get_route, increase
+
+logger = logging.getLogger(__name__)
+
+# What the ORM raises when it cannot reach or talk to the database.
+DATABASE_ERRORS = (OperationalError, InterfaceError)
+# SQLSTATE classes of a lost or refused connection: connection exceptions
+# and server shutdowns. Errors without a SQLSTATE never reached a server.
+CONNECTION_PGCODE_PREFIXES = ('08', '57P')
+UNAVAILABLE_KEY = 'database:unavailable'
+UNAVAILABLE_MESSAGE = (
+    'Comments are unavailable for a moment, please try again shortly.'
+)
+
+
+def is_connection_error(error):
+    """Whether ``error`` means the database cannot be reached.
+
+    Statement timeouts, cancellations and deadlocks are OperationalErrors
+    too, but the server answered them and the next query may well work.
+    """
+    if isinstance(error, InterfaceError):
+        return True
+    pgcode = getattr(error.__cause__, 'pgcode', None)
+    return pgcode is None or pgcode.startswith(CONNECTION_PGCODE_PREFIXES)
+
+
+def mark_database_unavailable():
+    cache.set(UNAVAILABLE_KEY, True, settings.DATABASE_UNAVAILABLE_SECONDS)
+
+
+def is_database_unavailable():
+    return cache.get(UNAVAILABLE_KEY, False)
+
+
+def get_stale_response(request):
+    """The last good rendering of the page for ``request``, or None.
+
+    The page cache keeps it for PAGE_CACHE_STALE_TIMEOUT seconds past
+    its expiry; it is marked stale and with a Warning.
+    """
+    entry = cache.get(get_page_cache_key(request))
+    if entry is None:
+        return None
+    response = mark_stale(build_response(entry[0]), entry)
+    response['Warning'] = '111 - "Revalidation Failed"'
+    increase('zadanie_page_cache_hits_total', (
+        ('route', get_route(request)),
+        ('state', 'error'),
+    ))
+    return response
+
+
+def serve_stale_on_error(view_func):
+    """Serve anonymous visitors the cached page when the database fails.
+
+    After a connection error, pages with a cached rendering are served
+    without trying the database for DATABASE_UNAVAILABLE_SECONDS. Pages
+    that were never cached still fail, as do queries the server refused.
+    """
+    @functools.wraps(view_func)
+    def wrapped_view(request, *args, **kwargs):
+        if not is_cacheable_request(request):
+            return view_func(request, *args, **kwargs)
+        if is_database_unavailable():
+            response = get_stale_response(request)
+            if response is not None:
+                return response
+        try:
+            return view_func(request, *args, **kwargs)
+        except DATABASE_ERRORS as error:
+            if not is_connection_error(error):
+                raise
+            mark_database_unavailable()
+            response = get_stale_response(request)
+            if response is None:
+                raise
+            logger.warning(
+                'Served a stale %s, the database failed: %s',
+                request.path,
+                error,
+            )
+            return response
+    return wrapped_view
+
+
+def get_unavailable_response():
+    response = HttpResponse(
+        UNAVAILABLE_MESSAGE,
+        status = 503,
+        content_type = 'text/plain; charset=utf-8',
+    )
+    response['Retry-After'] = str(settings.DATABASE_UNAVAILABLE_SECONDS)
+    return response
+
+
+def unavailable_on_database_error(view_func):
+    """Answer 503 right away while the database is known to be down.
+
+    A connection error raised by the view marks it down, so the writes
+    that follow do not each wait for the connection to time out. Other
+    database errors, such as a deadlock, are raised as before.
+    """
+    @functools.wraps(view_func)
+    def wrapped_view(request, *args, **kwargs):
+        if is_database_unavailable():
+            return get_unavailable_response()
+        try:
+            return view_func(request, *args, **kwargs)
+        except DATABASE_ERRORS as error:
+            if not is_connection_error(error):
+                raise
+            mark_database_unavailable()
+            logger.warning(
+                'Refused %s %s, the database failed: %s',
+                request.method,
+                request.path,
+                error,
+            )
+            return get_unavailable_response()
+    return wrapped_view
@@ -0,0 +1,130 @@
+import base64
+import binascii
+import json
+
+from django.db.models import Q
+from django.http import Http404
+
+
+class KeysetPage:
+    """Page of objects that knows the cursors of its neighbours.
+
+    Mirrors the parts of django.core.paginator.Page used by templates,
+    so it can be handed to ListView as ``page_obj``.
+    """
+
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def get_keyset_ordering(model):
+    ordering = list(model._meta.ordering)
+    descending = not ordering or ordering[0].startswith('-')
+    fields = [name.lstrip('-') for name in ordering]
+    if 'id' not in fields and 'pk' not in fields:
+        fields.append('id')
+    return fields, descending
+
+
+def encode_cursor(obj, fields):
+    values = []
+    for name in fields:
+        value = getattr(obj, name)
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        values.append(value)
+    raw = json.dumps(values, separators = (',', ':')).encode()
+    cursor = base64.urlsafe_b64encode(raw).decode().rstrip('=')
+    return cursor
+
+
+def decode_cursor(cursor, model, fields):
+    padding = '=' * (-len(cursor) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(cursor + padding)
+        values = json.loads(raw.decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise Http404('Invalid cursor.')
+    if not isinstance(values, list) or len(values) != len(fields):
+        raise Http404('Invalid cursor.')
+    decoded = []
+    for name, value in zip(fields, values):
+        field = model._meta.get_field(name)
+        try:
+            decoded.append(field.to_python(value))
+        except Exception:
+            raise Http404('Invalid cursor.')
+    return decoded
+
+
+def build_keyset_filter(fields, values, lookup):
+    # (a, b) < (x, y)  <=>  a < x OR (a = x AND b < y)
+    condition = Q()
+    equal = {}
+    for name, value in zip(fields, values):
+        condition |= Q(**equal, **{'%s__%s' % (name, lookup): value})
+        equal[name] = value
+    # The OR alone gives the planner no range on the index; the redundant
+    # a <= x does, so the scan starts at the cursor instead of the top.
+    bound = Q(**{'%s__%se' % (fields[0], lookup): values[0]})
+    return bound & condition
+
+
+def keyset_paginate(queryset, page_size, after = None, before = None):
+    """Slice ``queryset`` after or before a cursor without using OFFSET.
+
+    The keyset is the model's ``Meta.ordering`` with ``id`` appended as
+    a tiebreaker, so every page costs one indexed range scan.
+    """
+    model = queryset.model
+    fields, descending = get_keyset_ordering(model)
+    forward_lookup = 'lt' if descending else 'gt'
+    backward_lookup = 'gt' if descending else 'lt'
+    forward_ordering = [('-' if descending else '') + f for f in fields]
+    backward_ordering = [('' if descending else '-') + f for f in fields]
+
+    if before:
+        values = decode_cursor(before, model, fields)
+        condition = build_keyset_filter(fields, values, backward_lookup)
+        queryset = queryset.filter(condition).order_by(*backward_ordering)
+        object_list = list(queryset[:page_size + 1])
+        has_previous = len(object_list) > page_size
+        object_list = object_list[:page_size]
+        object_list.reverse()
+        has_next = True
+    else:
+        if after:
+            values = decode_cursor(after, model, fields)
+            condition = build_keyset_filter(fields, values, forward_lookup)
+            queryset = queryset.filter(condition)
+        queryset = queryset.order_by(*forward_ordering)
+        object_list = list(queryset[:page_size + 1])
+        has_next = len(object_list) > page_size
+        object_list = object_list[:page_size]
+        has_previous = bool(after)
+
+    next_cursor = None
+    previous_cursor = None
+    if object_list and has_next:
+        next_cursor = encode_cursor(object_list[-1], fields)
+    if object_list and has_previous:
+        previous_cursor = encode_cursor(object_list[0], fields)
+    page = KeysetPage(object_list, next_cursor, previous_cursor)
+    return page
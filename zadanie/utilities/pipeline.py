@@ -0,0 +1,159 @@
+import functools
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.handlers.exception import convert_exception_to_response
+from django.urls import Resolver404, resolve
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.module_loading import import_string
+
+FAST = 'fast'
+FULL = 'full'
+
+
+class Pipeline:
+    """A chain of middleware built the way BaseHandler builds MIDDLEWARE."""
+
+    def __init__(self, middleware_paths, get_response):
+        self.view_middleware = []
+        self.template_response_middleware = []
+        self.exception_middleware = []
+        handler = convert_exception_to_response(get_response)
+        for middleware_path in reversed(middleware_paths):
+            middleware = import_string(middleware_path)
+            try:
+                instance = middleware(handler)
+            except MiddlewareNotUsed:
+                continue
+            if instance is None:
+                raise ImproperlyConfigured(
+                    'Middleware factory %s returned None.' % middleware_path
+                )
+            if hasattr(instance, 'process_view'):
+                self.view_middleware.insert(0, instance.process_view)
+            if hasattr(instance, 'process_template_response'):
+                self.template_response_middleware.append(
+                    instance.process_template_response,
+                )
+            if hasattr(instance, 'process_exception'):
+                self.exception_middleware.append(instance.process_exception)
+            handler = convert_exception_to_response(instance)
+        self.handler = handler
+
+    def __call__(self, request):
+        return self.handler(request)
+
+
+@functools.lru_cache(maxsize = 4096)
+def get_view_name(path_info):
+    # Resolving every request would eat most of what the short chain saves.
+    try:
+        return resolve(path_info).view_name
+    except Resolver404:
+        return None
+
+
+@functools.lru_cache(maxsize = 16)
+def get_cookie_names(session_cookie, message_storage, extra):
+    names = {session_cookie}
+    storage = import_string(message_storage)
+    for storage_class in getattr(storage, 'storage_classes', [storage]):
+        if issubclass(storage_class, CookieStorage):
+            names.add(storage_class.cookie_name)
+    names.update(extra)
+    return frozenset(names)
+
+
+def get_blocking_cookies():
+    """Cookies that mean a session or pending messages.
+
+    Their names come from the session and message storage settings,
+    plus any in FAST_PATH_BLOCKING_COOKIES. The CSRF cookie is not one:
+    fast-path pages render no token and only GETs take the fast path.
+    """
+    return get_cookie_names(
+        settings.SESSION_COOKIE_NAME,
+        settings.MESSAGE_STORAGE,
+        tuple(settings.FAST_PATH_BLOCKING_COOKIES),
+    )
+
+
+def get_pipeline_name(request):
+    """FAST for cookie-less anonymous reads of FAST_PATH_ROUTES."""
+    if request.method not in ('GET', 'HEAD'):
+        return FULL
+    cookies = request.COOKIES
+    if any(name in cookies for name in get_blocking_cookies()):
+        return FULL
+    if get_view_name(request.path_info) not in settings.FAST_PATH_ROUTES:
+        return FULL
+    return FAST
+
+
+class RouteAwarePipelineMiddleware:
+    """Run public reads of anonymous visitors through a shorter chain.
+
+    Requests for FAST_PATH_ROUTES without a session or messages cookie
+    cannot belong to a logged in user or carry flash messages, so
+    they skip FULL_PATH_MIDDLEWARE (sessions, CSRF, auth, messages) for
+    FAST_PATH_MIDDLEWARE, get an AnonymousUser and are marked public for
+    shared caches. They still vary on Cookie: the page shows who is
+    signed in, so a shared cache must not hand it to a visitor with a
+    session. Everything else goes through FULL_PATH_MIDDLEWARE.
+    The view, template response and exception hooks of the chosen chain
+    are called for the request as BaseHandler would call them.
+    """
+
+    def __init__(self, get_response):
+        self.pipelines = {
+            FAST: Pipeline(settings.FAST_PATH_MIDDLEWARE, get_response),
+            FULL: Pipeline(settings.FULL_PATH_MIDDLEWARE, get_response),
+        }
+
+    def get_pipeline(self, request):
+        return self.pipelines[getattr(request, '_pipeline', FULL)]
+
+    def __call__(self, request):
+        request._pipeline = get_pipeline_name(request)
+        if request._pipeline == FULL:
+            return self.pipelines[FULL](request)
+
+        request.user = AnonymousUser()
+        response = self.pipelines[FAST](request)
+        patch_vary_headers(response, ('Cookie',))
+        if not response.cookies and response.status_code == 200:
+            patch_cache_control(
+                response,
+                public = True,
+                max_age = settings.FAST_PATH_MAX_AGE,
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        pipeline = self.get_pipeline(request)
+        for process_view in pipeline.view_middleware:
+            response = process_view(
+                request,
+                view_func,
+                view_args,
+                view_kwargs,
+            )
+            if response is not None:
+                return response
+        return None
+
+    def process_template_response(self, request, response):
+        pipeline = self.get_pipeline(request)
+        for process_response in pipeline.template_response_middleware:
+            response = process_response(request, response)
+        return response
+
+    def process_exception(self, request, exception):
+        pipeline = self.get_pipeline(request)
+        for process_exception in pipeline.exception_middleware:
+            response = process_exception(request, exception)
+            if response is not None:
+                return response
+        return None
@@ -0,0 +1,198 @@
+import cProfile
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.core import signing
+
+from celery.signals import task_postrun, task_prerun
+
+from .metrics import get_route
+
+SIGNING_SALT = 'utilities.profiling'
+EXTENSIONS = {
+    'collapsed': 'collapsed',
+    'pstats': 'prof',
+}
+# Below this many microseconds a stack follows only its heaviest caller.
+MIN_SPLIT_WEIGHT = 50
+
+_tasks = threading.local()
+
+
+def make_token():
+    """Value of the profiling header, valid for PROFILING_TOKEN_MAX_AGE."""
+    return signing.TimestampSigner(salt = SIGNING_SALT).sign('profile')
+
+
+def has_valid_token(request):
+    header = settings.PROFILING_HEADER
+    key = 'HTTP_' + header.upper().replace('-', '_')
+    token = request.META.get(key)
+    if not token:
+        return False
+    signer = signing.TimestampSigner(salt = SIGNING_SALT)
+    try:
+        signer.unsign(token, max_age = settings.PROFILING_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def is_sampled():
+    rate = settings.PROFILING_SAMPLE_RATE
+    return rate > 0 and random.random() < rate
+
+
+def get_function_label(function):
+    filename, line, name = function
+    if filename == '~':
+        return name
+    return '%s:%s(%s)' % (os.path.basename(filename), line, name)
+
+
+def get_collapsed_stacks(stats):
+    """Estimated ``{stack: microseconds}`` of folded call stacks.
+
+    cProfile only records caller and callee pairs, so the own time of
+    every function is split over its callers in proportion to the time
+    spent under each of them and followed up to the roots. That is the
+    usual approximation of flame graphs drawn from deterministic
+    profiles; recursion is cut where a function repeats in a stack, and
+    small weights stop splitting to keep the walk linear.
+    """
+    stacks = {}
+
+    def walk(function, weight, stack):
+        callers = stats.stats[function][4]
+        callers = {
+            caller: edge for caller, edge in callers.items()
+            if caller in stats.stats and caller not in stack
+        }
+        if callers and weight < MIN_SPLIT_WEIGHT:
+            heaviest = max(callers, key = lambda caller: callers[caller][3])
+            callers = {heaviest: callers[heaviest]}
+        total = sum(edge[3] for edge in callers.values())
+        if not callers or len(stack) > 64:
+            labels = [get_function_label(name) for name in stack]
+            key = ';'.join(reversed(labels))
+            stacks[key] = stacks.get(key, 0) + weight
+            return
+        for caller, edge in callers.items():
+            if total:
+                share = edge[3] / total
+            else:
+                share = 1 / len(callers)
+            walk(caller, weight * share, stack + (caller,))
+
+    for function, (_, _, own_time, _, _) in stats.stats.items():
+        weight = own_time * 1000000
+        if weight >= 1:
+            walk(function, weight, (function,))
+    return {
+        stack: int(round(weight)) for stack, weight in stacks.items()
+        if round(weight)
+    }
+
+
+def write_profile(profiler, tag):
+    """Save ``profiler`` in PROFILING_DIRECTORY and return the file name."""
+    directory = settings.PROFILING_DIRECTORY
+    output_format = settings.PROFILING_FORMAT
+    os.makedirs(directory, exist_ok = True)
+    file_name = '%s-%s-%s.%s' % (
+        int(time.time() * 1000000),
+        os.getpid(),
+        re.sub(r'[^\w.-]+', '-', tag),
+        EXTENSIONS[output_format],
+    )
+    path = os.path.join(directory, file_name)
+    if output_format == 'collapsed':
+        stats = pstats.Stats(profiler)
+        stacks = get_collapsed_stacks(stats)
+        with open(path, 'w') as profile_file:
+            for stack, weight in sorted(stacks.items()):
+                profile_file.write('%s %s\n' % (stack, weight))
+    else:
+        profiler.dump_stats(path)
+    enforce_disk_limit(directory, settings.PROFILING_MAX_BYTES)
+    return file_name
+
+
+def enforce_disk_limit(directory, max_bytes):
+    """Delete the oldest profiles until the directory fits in max_bytes."""
+    profiles = []
+    for entry in os.scandir(directory):
+        if entry.is_file():
+            stat = entry.stat()
+            profiles.append((stat.st_mtime, entry.name, stat.st_size))
+    profiles.sort()
+    total = sum(size for _, _, size in profiles)
+    for _, name, size in profiles:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+class ProfilingMiddleware:
+    """Run sampled requests, or ones with a signed header, under cProfile.
+
+    It goes last in MIDDLEWARE so the profile covers the view and the
+    rendering of its template rather than the other middleware. A
+    request is profiled at PROFILING_SAMPLE_RATE, or when it carries
+    PROFILING_HEADER with a token from make_token(); the file is tagged
+    with the URL name, and header requests get its name back.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.PROFILING_DIRECTORY or sys.getprofile():
+            return self.get_response(request)
+        requested = has_valid_token(request)
+        if not requested and not is_sampled():
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        file_name = write_profile(profiler, get_route(request))
+        if requested:
+            response[settings.PROFILING_HEADER + '-File'] = file_name
+        return response
+
+
+@task_prerun.connect
+def start_task_profile(task_id = None, task = None, **kwargs):
+    # Only one profiler can run per thread, so an eager task inside a
+    # profiled request stays part of the request's profile.
+    if not settings.PROFILING_DIRECTORY or sys.getprofile():
+        return
+    if task.name not in settings.PROFILING_TASKS or not is_sampled():
+        return
+    profiler = cProfile.Profile()
+    _tasks.profiler = (task_id, profiler)
+    profiler.enable()
+
+
+@task_postrun.connect
+def finish_task_profile(task_id = None, task = None, **kwargs):
+    running_task_id, profiler = getattr(_tasks, 'profiler', (None, None))
+    if profiler is None or running_task_id != task_id:
+        return
+    profiler.disable()
+    _tasks.profiler = (None, None)
+    write_profile(profiler, task.name)
@@ -0,0 +1,25 @@
+from django.utils import timezone
+
+from .cache import invalidate_list, invalidate_object
+
+
+def publish_due(model):
+    """Flip ``is_published`` of rows whose ``pub_date`` has passed.
+
+    Pages of every flipped object and the list of the model are
+    invalidated right away. Returns the primary keys of the flipped rows.
+    """
+    now = timezone.now()
+    due = model.objects.filter(is_published = False, pub_date__lt = now)
+    pks = list(due.values_list('pk', flat = True))
+    if not pks:
+        return []
+    model.objects.filter(
+        pk__in = pks,
+        is_published = False,
+        pub_date__lt = now,
+    ).update(is_published = True)
+    for pk in pks:
+        invalidate_object(model, pk, lists = False)
+    invalidate_list(model)
+    return pks
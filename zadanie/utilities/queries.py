@@ -0,0 +1,151 @@
+import functools
+import logging
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from celery.signals import task_postrun, task_prerun
+
+from .metrics import ProcessTotals, get_route
+
+logger = logging.getLogger(__name__)
+
+NORMALIZERS = [
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\s+'), ' '),
+    # IN lists and rows of VALUES, whatever their length.
+    (re.compile(r'\(\?(?: ?, ?\?)*\)'), '(?+)'),
+    (re.compile(r'\(\?\+\)(?: ?, ?\(\?\+\))+'), '(?+), ...'),
+]
+
+# Keyed by (view, fingerprint, field); field is one of 'queries',
+# 'seconds', 'slow' (queries over QUERY_SLOW_SECONDS), 'units' (requests
+# or tasks that ran the statement) and 'repeated' (units that ran it
+# more than QUERY_REPEAT_THRESHOLD times).
+query_totals = ProcessTotals('queries')
+
+_tasks = threading.local()
+
+
+@functools.lru_cache(maxsize = 1024)
+def fingerprint(sql):
+    """``sql`` with literals, placeholders and lists reduced to ``?``."""
+    for pattern, replacement in NORMALIZERS:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+class QueryObserver:
+    """Database execute wrapper grouping the queries of a request or task.
+
+    Only the fingerprint and its timings are kept while the unit runs;
+    finish() adds them to ``query_totals`` under the view or task name
+    and reports statements repeated more than QUERY_REPEAT_THRESHOLD
+    times, the mark of an N+1 pattern.
+    """
+
+    def __init__(self):
+        self.statements = defaultdict(lambda: [0, 0.0, 0])
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            statement = self.statements[fingerprint(sql)]
+            statement[0] += 1
+            statement[1] += duration
+            if duration >= settings.QUERY_SLOW_SECONDS:
+                statement[2] += 1
+
+    def observe(self):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self))
+        return stack
+
+    def finish(self, view):
+        threshold = settings.QUERY_REPEAT_THRESHOLD
+        for sql, (count, seconds, slow) in self.statements.items():
+            query_totals.add((view, sql, 'queries'), count)
+            query_totals.add((view, sql, 'seconds'), seconds)
+            query_totals.add((view, sql, 'units'))
+            if slow:
+                query_totals.add((view, sql, 'slow'), slow)
+            if count > threshold:
+                query_totals.add((view, sql, 'repeated'))
+                logger.warning(
+                    'Possible N+1 in %s: %s queries of %s', view, count, sql,
+                )
+
+
+def is_sampled():
+    rate = settings.QUERY_OBSERVER_SAMPLE_RATE
+    return rate > 0 and random.random() < rate
+
+
+def get_report(totals, view = None):
+    """Rows of statistics per (view, fingerprint) from ``totals``."""
+    rows = defaultdict(lambda: {
+        'queries': 0,
+        'seconds': 0.0,
+        'slow': 0,
+        'units': 0,
+        'repeated': 0,
+    })
+    for (row_view, sql, field), value in totals.items():
+        if view is None or row_view == view:
+            rows[(row_view, sql)][field] = value
+    report = []
+    for (row_view, sql), row in rows.items():
+        row['view'] = row_view
+        row['sql'] = sql
+        units = row['units'] or 1
+        row['per_unit'] = row['queries'] / units
+        row['mean_ms'] = row['seconds'] * 1000 / (row['queries'] or 1)
+        report.append(row)
+    return report
+
+
+class QueryObserverMiddleware:
+    """Fingerprint the queries of sampled requests, per URL name."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not is_sampled():
+            return self.get_response(request)
+        observer = QueryObserver()
+        with observer.observe():
+            response = self.get_response(request)
+        observer.finish(get_route(request))
+        return response
+
+
+@task_prerun.connect
+def start_task_observer(task_id = None, **kwargs):
+    if not is_sampled():
+        return
+    observer = QueryObserver()
+    _tasks.observed = (task_id, observer, observer.observe())
+
+
+@task_postrun.connect
+def finish_task_observer(task_id = None, task = None, **kwargs):
+    observed = getattr(_tasks, 'observed', None)
+    if observed is None or observed[0] != task_id:
+        return
+    _tasks.observed = None
+    running_task_id, observer, stack = observed
+    stack.close()
+    observer.finish(task.name)
@@ -0,0 +1,123 @@
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from celery.signals import task_postrun, task_prerun
+
+PIN_COOKIE_NAME = 'pin_primary'
+REPLICA_HINT = 'replica'
+
+_state = threading.local()
+
+
+def pin_to_primary():
+    _state.pinned = True
+
+
+def reset_pin():
+    _state.pinned = False
+    _state.wrote = False
+
+
+@contextmanager
+def reading_from_primary():
+    """Read from the primary inside the block, whatever the pin was."""
+    pinned = getattr(_state, 'pinned', False)
+    _state.pinned = True
+    try:
+        yield
+    finally:
+        _state.pinned = pinned
+
+
+def read_from_replica(queryset):
+    """``queryset`` marked to be read from a replica by ReplicaRouter."""
+    queryset = queryset.all()
+    queryset._hints = dict(queryset._hints, **{REPLICA_HINT: True})
+    return queryset
+
+
+def has_written():
+    return getattr(_state, 'wrote', False)
+
+
+def is_pinned():
+    return getattr(_state, 'pinned', False) or has_written()
+
+
+class ReplicaRouter:
+    """Read published listings and comments from replicas, write to primary.
+
+    Only querysets passed through read_from_replica() go to a random
+    alias of ``settings.REPLICA_DATABASES``, and not when the current
+    request or task has already written ``replicated_models``, was pinned
+    by PrimaryPinMiddleware or reading_from_primary(), or runs inside a
+    transaction on the primary. Every other read, such as the object an
+    edit form saves back, stays on the default database, as does
+    everything without replicas.
+    """
+    replicated_models = {'articles.article', 'blog.entry', 'comments.comment'}
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.REPLICA_DATABASES
+        if not replicas or not hints.get(REPLICA_HINT):
+            return None
+        if is_pinned() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        # Only content the replicas serve needs reading back; a session
+        # save would otherwise pin every visitor to the primary.
+        if model._meta.label_lower in self.replicated_models:
+            _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name = None, **hints):
+        if db in settings.REPLICA_DATABASES:
+            return False
+        return None
+
+
+class PrimaryPinMiddleware:
+    """Keep a visitor on the primary for a while after they wrote.
+
+    A request that writes sets a short-lived cookie, and requests that
+    carry it read from the primary, so the redirect after a comment POST
+    shows the new comment even if the replicas lag behind. Requests other
+    than GET and HEAD read from the primary too, as what they read feeds
+    what they write.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        reset_pin()
+        is_safe = request.method in ('GET', 'HEAD')
+        if request.COOKIES.get(PIN_COOKIE_NAME) or not is_safe:
+            pin_to_primary()
+        try:
+            response = self.get_response(request)
+            if has_written():
+                response.set_cookie(
+                    PIN_COOKIE_NAME,
+                    '1',
+                    max_age = settings.READ_YOUR_WRITES_SECONDS,
+                    httponly = True,
+                )
+        finally:
+            reset_pin()
+        return response
+
+
+@task_prerun.connect
+@task_postrun.connect
+def reset_task_pin(**kwargs):
+    reset_pin()
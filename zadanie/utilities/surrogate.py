@@ -0,0 +1,94 @@
+import functools
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+
+from celery.signals import task_postrun
+
+from .buffers import CoalescingBuffer
+
+
+def get_object_key(model, pk):
+    return '%s-%s' % (model._meta.model_name, pk)
+
+
+def get_list_key(model):
+    return '%s-list' % model._meta.app_label
+
+
+def list_keys(model):
+    def get_keys(request, *args, **kwargs):
+        return [get_list_key(model)]
+    return get_keys
+
+
+def object_keys(model):
+    def get_keys(request, *args, **kwargs):
+        return [get_object_key(model, kwargs['pk'])]
+    return get_keys
+
+
+def surrogate_keys(get_keys):
+    """Tag responses with the keys a caching proxy can purge them by.
+
+    ``get_keys(request, *args, **kwargs)`` names the keys; they are sent
+    space separated in SURROGATE_KEY_HEADER.
+    """
+    def decorator(view_func):
+        @functools.wraps(view_func)
+        def wrapped_view(request, *args, **kwargs):
+            response = view_func(request, *args, **kwargs)
+            keys = get_keys(request, *args, **kwargs)
+            response[settings.SURROGATE_KEY_HEADER] = ' '.join(keys)
+            return response
+        return wrapped_view
+    return decorator
+
+
+def send_purge(keys):
+    """Ask the proxy at PURGE_ENDPOINT to drop everything tagged ``keys``.
+
+    One request carries the whole key set. Errors are raised, so the
+    task sending it can retry.
+    """
+    request = Request(
+        settings.PURGE_ENDPOINT,
+        method = settings.PURGE_METHOD,
+        headers = {settings.SURROGATE_KEY_HEADER: ' '.join(keys)},
+    )
+    urlopen(request, timeout = settings.PURGE_TIMEOUT).close()
+
+
+def dispatch_purges(items):
+    from .tasks import purge_surrogate_keys
+
+    purge_surrogate_keys.delay(sorted(items))
+
+
+purge_buffer = CoalescingBuffer(
+    flush_callback = dispatch_purges,
+    merge = lambda old, new: new,
+    interval = settings.PURGE_FLUSH_INTERVAL,
+    max_size = settings.PURGE_FLUSH_SIZE,
+)
+
+
+def purge(keys):
+    """Purge ``keys`` in the next batch, when a PURGE_ENDPOINT is set.
+
+    The batch is dispatched by a Timer thread of the process that queued
+    the keys. Celery tasks send theirs as they finish (see
+    flush_task_purges()) and one-shot commands call
+    ``purge_buffer.flush()`` before they return.
+    """
+    if not settings.PURGE_ENDPOINT:
+        return
+    for key in keys:
+        purge_buffer.add(key, True)
+
+
+@task_postrun.connect
+def flush_task_purges(**kwargs):
+    # A prefork child may be recycled before its Timer fires, and it
+    # leaves without running atexit handlers.
+    purge_buffer.flush()
@@ -0,0 +1,8 @@
+from celery import task
+
+from .surrogate import send_purge
+
+
+@task(autoretry_for = (OSError,), retry_backoff = True, max_retries = 5)
+def purge_surrogate_keys(keys):
+    return send_purge(keys)
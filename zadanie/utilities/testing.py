@@ -0,0 +1,20 @@
+from unittest import mock
+
+
+def run_on_commit(callback):
+    callback()
+
+
+def commit_immediately(test_case):
+    """Run on_commit() callbacks right away for the rest of ``test_case``.
+
+    TestCase never commits the transaction it wraps every test in, so
+    page invalidation and search indexing would otherwise never run.
+    """
+    patcher = mock.patch(
+        'django.db.transaction.on_commit',
+        side_effect = run_on_commit,
+    )
+    on_commit = patcher.start()
+    test_case.addCleanup(patcher.stop)
+    return on_commit
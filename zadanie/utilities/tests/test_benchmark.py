@@ -0,0 +1,73 @@
+from django.test import SimpleTestCase
+
+from utilities.benchmark import compare, get_routes, percentile
+
+
+class TestPercentile(SimpleTestCase):
+
+    def test_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(50, percentile(values, 0.50))
+        self.assertEqual(95, percentile(values, 0.95))
+        self.assertEqual(99, percentile(values, 0.99))
+
+    def test_small_samples(self):
+        self.assertEqual(0, percentile([], 0.5))
+        self.assertEqual(7, percentile([7], 0.99))
+        self.assertEqual(3, percentile([3, 1, 2], 0.99))
+
+
+class TestGetRoutes(SimpleTestCase):
+
+    def test_every_named_route(self):
+        routes = dict(get_routes(['articles', 'blog']))
+        self.assertEqual(16, len(routes))
+        self.assertFalse(routes['articles:list'])
+        self.assertTrue(routes['articles:detail'])
+        self.assertTrue(routes['blog:entry-comments'])
+
+
+class TestCompare(SimpleTestCase):
+
+    def setUp(self):
+        self.baseline = {
+            'articles:detail': {
+                'p50': 10.0,
+                'p95': 20.0,
+                'p99': 30.0,
+                'queries': 3,
+                'alloc_kib': 100.0,
+            },
+        }
+
+    def get_regressed(self, current, threshold = 0.1):
+        rows = compare(
+            {'articles:detail': current},
+            self.baseline,
+            threshold,
+        )
+        return [row[1] for row in rows if row[5]]
+
+    def test_unchanged(self):
+        current = dict(self.baseline['articles:detail'])
+        self.assertEqual([], self.get_regressed(current))
+
+    def test_latency_within_threshold(self):
+        current = dict(self.baseline['articles:detail'], p95 = 21.0)
+        self.assertEqual([], self.get_regressed(current))
+
+    def test_latency_and_memory_beyond_threshold(self):
+        current = dict(
+            self.baseline['articles:detail'],
+            p99 = 40.0,
+            alloc_kib = 150.0,
+        )
+        self.assertEqual(['p99', 'alloc_kib'], self.get_regressed(current))
+
+    def test_one_more_query_regresses(self):
+        current = dict(self.baseline['articles:detail'], queries = 4)
+        self.assertEqual(['queries'], self.get_regressed(current))
+
+    def test_routes_missing_from_the_baseline_are_skipped(self):
+        rows = compare({'blog:entries': {'p50': 1.0}}, self.baseline, 0.1)
+        self.assertEqual([], rows)
@@ -0,0 +1,53 @@
+import operator
+
+from django.test import SimpleTestCase
+
+from ..buffers import CoalescingBuffer
+
+
+class TestCoalescingBuffer(SimpleTestCase):
+
+    def setUp(self):
+        self.flushed = []
+        self.buffer = CoalescingBuffer(
+            flush_callback = self.flushed.append,
+            merge = operator.add,
+            interval = 3600,
+            max_size = 3,
+        )
+
+    def tearDown(self):
+        self.buffer.flush()
+
+    def test_add_merges_values_of_the_same_key(self):
+        self.buffer.add('a', 1)
+        self.buffer.add('a', 2)
+        self.buffer.add('b', 1)
+        items_expected = {'a': 3, 'b': 1}
+        items_given = self.buffer.flush()
+        self.assertEqual(items_expected, items_given)
+        self.assertEqual([items_expected], self.flushed)
+
+    def test_add_starts_timer_once(self):
+        self.buffer.add('a', 1)
+        timer = self.buffer.timer
+        self.buffer.add('a', 1)
+        self.assertIs(timer, self.buffer.timer)
+
+    def test_buffer_flushes_when_full(self):
+        self.buffer.add('a', 1)
+        self.buffer.add('b', 1)
+        self.buffer.add('c', 1)
+        self.assertEqual([{'a': 1, 'b': 1, 'c': 1}], self.flushed)
+        self.assertEqual(0, len(self.buffer))
+        self.assertIsNone(self.buffer.timer)
+
+    def test_flush_of_empty_buffer_does_not_call_callback(self):
+        self.buffer.flush()
+        self.assertEqual([], self.flushed)
+
+    def test_buffer_flushes_after_interval(self):
+        self.buffer.interval = 0.01
+        self.buffer.add('a', 1)
+        self.buffer.timer.join(1)
+        self.assertEqual([{'a': 1}], self.flushed)
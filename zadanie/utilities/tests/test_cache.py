@@ -0,0 +1,361 @@
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import Http404, HttpResponse, HttpResponseNotFound
+from django.db import transaction
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TransactionTestCase,
+    override_settings,
+)
+
+from articles.models import Article
+
+from ..cache import (
+    acquire_lock,
+    bump_version,
+    cache_page_versioned,
+    get_list_version_name,
+    get_object_version_name,
+    get_page_cache_key,
+    get_versions,
+    invalidate_object,
+    read_through,
+)
+from ..metrics import collect
+from ..routers import is_pinned, reset_pin
+from ..testing import commit_immediately
+
+
+class TestVersions(SimpleTestCase):
+
+    def setUp(self):
+        commit_immediately(self)
+        cache.clear()
+
+    def test_version_names(self):
+        self.assertEqual(
+            'articles.article:list',
+            get_list_version_name(Article),
+        )
+        self.assertEqual(
+            'articles.article:7',
+            get_object_version_name(Article, 7),
+        )
+
+    def test_get_versions_is_stable(self):
+        versions_first = get_versions(['a', 'b'])
+        versions_second = get_versions(['a', 'b'])
+        self.assertEqual(versions_first, versions_second)
+
+    def test_bump_version_changes_only_that_version(self):
+        version_a, version_b = get_versions(['a', 'b'])
+        bump_version('a')
+        self.assertEqual([version_a + 1, version_b], get_versions(['a', 'b']))
+
+    def test_invalidate_object_bumps_object_and_list(self):
+        names = ['articles.article:1', 'articles.article:list']
+        versions_before = get_versions(names)
+        invalidate_object(Article, 1)
+        versions_after = get_versions(names)
+        self.assertNotEqual(versions_before[0], versions_after[0])
+        self.assertNotEqual(versions_before[1], versions_after[1])
+
+    def test_invalidate_object_can_leave_lists(self):
+        names = ['articles.article:1', 'articles.article:list']
+        versions_before = get_versions(names)
+        invalidate_object(Article, 1, lists = False)
+        versions_after = get_versions(names)
+        self.assertNotEqual(versions_before[0], versions_after[0])
+        self.assertEqual(versions_before[1], versions_after[1])
+
+
+class TestInvalidationOnCommit(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_versions_are_bumped_once_the_change_is_committed(self):
+        article = Article.objects.create(title = 'Pisa')
+        name = get_object_version_name(Article, article.pk)
+        version, = get_versions([name])
+        with transaction.atomic():
+            article.title = 'Lucca'
+            article.save()
+            self.assertEqual([version], get_versions([name]))
+        self.assertNotEqual([version], get_versions([name]))
+
+    def test_rolled_back_changes_bump_nothing(self):
+        article = Article.objects.create(title = 'Pisa')
+        name = get_object_version_name(Article, article.pk)
+        version, = get_versions([name])
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                article.save()
+                raise ValueError
+        self.assertEqual([version], get_versions([name]))
+
+
+class TestCachePageVersioned(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.calls = []
+
+        def view(request):
+            self.calls.append(request)
+            return HttpResponse('page')
+
+        def get_version_names(request):
+            return ['page']
+
+        self.view = cache_page_versioned(get_version_names)(view)
+        self.factory = RequestFactory()
+
+    def get(self, path = '/page/'):
+        request = self.factory.get(path)
+        request.user = AnonymousUser()
+        return self.view(request)
+
+    def test_second_request_is_served_from_cache(self):
+        self.get()
+        response = self.get()
+        self.assertEqual(1, len(self.calls))
+        self.assertEqual(200, response.status_code)
+
+    def test_bumped_version_misses(self):
+        self.get()
+        bump_version('page')
+        self.get()
+        self.assertEqual(2, len(self.calls))
+
+    def test_stale_page_is_not_stored_by_caches_in_front(self):
+        self.get()
+        bump_version('page')
+        acquire_lock(get_page_cache_key(self.factory.get('/page/')))
+        response = self.get()
+        self.assertEqual(1, len(self.calls))
+        self.assertIn('no-store', response['Cache-Control'])
+        self.assertIn('Age', response)
+
+    def test_cached_page_is_rendered_from_the_primary(self):
+        pinned = []
+
+        def view(request):
+            pinned.append(is_pinned())
+            return HttpResponse('page')
+
+        self.view = cache_page_versioned(lambda request: ['page'])(view)
+        reset_pin()
+        self.get()
+        self.assertEqual([True], pinned)
+        self.assertFalse(is_pinned())
+
+    def test_fresh_page_is_not_marked(self):
+        self.get()
+        response = self.get()
+        self.assertFalse(response.has_header('Cache-Control'))
+        self.assertFalse(response.has_header('Age'))
+
+    def test_page_that_is_gone_is_not_served_stale(self):
+        def view(request):
+            raise Http404
+
+        self.get()
+        bump_version('page')
+        self.view = cache_page_versioned(lambda request: ['page'])(view)
+        with self.assertRaises(Http404):
+            self.get()
+        acquire_lock(get_page_cache_key(self.factory.get('/page/')))
+        with self.settings(PAGE_CACHE_LOCK_WAIT = 0):
+            with self.assertRaises(Http404):
+                self.get()
+
+    def test_query_string_is_part_of_the_key(self):
+        self.get('/page/?after=a')
+        self.get('/page/?after=b')
+        self.assertEqual(2, len(self.calls))
+
+    def test_authenticated_user_is_not_cached(self):
+        request = self.factory.get('/page/')
+        request.user = type('User', (), {'is_authenticated': True})()
+        self.view(request)
+        self.view(request)
+        self.assertEqual(2, len(self.calls))
+
+    def test_error_responses_are_not_cached(self):
+        def view(request):
+            self.calls.append(request)
+            return HttpResponseNotFound()
+
+        not_found_view = cache_page_versioned(lambda request: ['x'])(view)
+        request = self.factory.get('/missing/')
+        request.user = AnonymousUser()
+        not_found_view(request)
+        not_found_view(request)
+        self.assertEqual(2, len(self.calls))
+
+
+@override_settings(
+    PAGE_CACHE_TIMEOUT = 60,
+    PAGE_CACHE_LOCK_WAIT = 1,
+    PAGE_CACHE_LOCK_POLL_INTERVAL = 0.01,
+)
+class TestReadThrough(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.calls = []
+        self.labels = (('route', self.id()),)
+
+    def regenerate(self, value = 'new'):
+        self.calls.append(value)
+        return value, 'rendered'
+
+    def read(self, version = 1):
+        value, result, stale_entry = read_through(
+            'key',
+            version,
+            self.regenerate,
+            self.labels,
+        )
+        return value, result
+
+    def store(self, value, version = 1, expires_in = 60, delta = 0):
+        expires = time.time() + expires_in
+        cache.set('key', (value, version, expires, delta))
+
+    def get_count(self, name, *labels):
+        return collect().get((name, self.labels + labels), 0)
+
+    def test_new_versions_are_regenerated_from_the_primary(self):
+        pinned = []
+
+        def regenerate():
+            pinned.append(is_pinned())
+            return 'new', 'rendered'
+
+        reset_pin()
+        read_through('key', 1, regenerate)
+        self.store('old', version = 1, expires_in = -1)
+        read_through('key', 2, regenerate)
+        self.assertEqual([True, True], pinned)
+
+    def test_old_values_are_refreshed_from_replicas(self):
+        pinned = []
+
+        def regenerate():
+            pinned.append(is_pinned())
+            return 'new', 'rendered'
+
+        reset_pin()
+        self.store('old', version = 1, expires_in = -1)
+        read_through('key', 1, regenerate)
+        self.assertEqual([False], pinned)
+
+    def test_miss_then_hit(self):
+        self.assertEqual(('new', 'rendered'), self.read())
+        self.assertEqual(('new', None), self.read())
+        self.assertEqual(1, len(self.calls))
+        self.assertEqual(1, self.get_count('zadanie_page_cache_misses_total'))
+        self.assertEqual(1, self.get_count(
+            'zadanie_page_cache_hits_total',
+            ('state', 'fresh'),
+        ))
+        self.assertEqual(1, self.get_count(
+            'zadanie_page_cache_regenerations_total',
+            ('reason', 'missing'),
+        ))
+
+    def test_stale_value_is_regenerated_by_the_lock_holder(self):
+        self.store('old', version = 1)
+        self.assertEqual(('new', 'rendered'), self.read(version = 2))
+        self.assertEqual(1, self.get_count(
+            'zadanie_page_cache_regenerations_total',
+            ('reason', 'expired'),
+        ))
+
+    def test_stale_value_is_served_while_another_worker_regenerates(self):
+        self.store('old', expires_in = -1)
+        acquire_lock('key')
+        self.assertEqual(('old', None), self.read())
+        self.assertEqual([], self.calls)
+        self.assertEqual(1, self.get_count(
+            'zadanie_page_cache_hits_total',
+            ('state', 'stale'),
+        ))
+
+    def test_stale_value_comes_with_its_entry(self):
+        self.store('old', version = 1)
+        acquire_lock('key')
+        value, result, stale_entry = read_through(
+            'key',
+            2,
+            self.regenerate,
+            self.labels,
+        )
+        self.assertEqual('old', value)
+        self.assertEqual(cache.get('key'), stale_entry)
+
+    def test_value_near_expiry_is_refreshed_early(self):
+        self.store('old', expires_in = 1, delta = 10)
+        with mock.patch('utilities.cache.random.random', return_value = 0.5):
+            self.assertEqual(('new', 'rendered'), self.read())
+        self.assertEqual(1, self.get_count(
+            'zadanie_page_cache_regenerations_total',
+            ('reason', 'early'),
+        ))
+
+    def test_value_far_from_expiry_is_not(self):
+        self.store('old', expires_in = 60, delta = 0.01)
+        with mock.patch('utilities.cache.random.random', return_value = 0.5):
+            self.assertEqual(('old', None), self.read())
+
+    def test_cold_miss_waits_for_the_worker_regenerating(self):
+        acquire_lock('key')
+        timer = threading.Timer(0.05, self.store, args = ('theirs',))
+        timer.start()
+        self.addCleanup(timer.cancel)
+        self.assertEqual(('theirs', None), self.read())
+        self.assertEqual([], self.calls)
+
+    def test_cold_miss_gives_up_waiting(self):
+        acquire_lock('key')
+        with self.settings(PAGE_CACHE_LOCK_WAIT = 0):
+            self.assertEqual(('new', 'rendered'), self.read())
+
+    def test_concurrent_workers_regenerate_once(self):
+        self.store('old', version = 1)
+        results = []
+
+        def regenerate():
+            self.calls.append('new')
+            time.sleep(0.1)
+            return 'new', 'rendered'
+
+        def worker():
+            results.append(read_through('key', 2, regenerate, self.labels))
+
+        threads = [threading.Thread(target = worker) for number in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(1, len(self.calls))
+        self.assertEqual(7, len([
+            result for result in results if result[:2] == ('old', None)
+        ]))
+
+    def test_value_that_is_gone_is_dropped(self):
+        self.store('old', version = 1)
+        self.assertEqual((None, 'gone', None), read_through(
+            'key',
+            2,
+            lambda: (None, 'gone'),
+            self.labels,
+        ))
+        self.assertIsNone(cache.get('key'))
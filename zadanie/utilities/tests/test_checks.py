@@ -0,0 +1,45 @@
+from django.test import SimpleTestCase, override_settings
+
+from celery.signals import worker_init
+
+from ..checks import check_shared_cache, check_shared_cache_deploy
+
+LOCAL_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+SHARED_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': '127.0.0.1:11211',
+    },
+}
+
+
+class TestSharedCacheChecks(SimpleTestCase):
+
+    @override_settings(CACHES = LOCAL_CACHES, DEBUG = False)
+    def test_process_local_cache_is_reported(self):
+        messages = check_shared_cache(None)
+        self.assertEqual(['utilities.W001'], [m.id for m in messages])
+        messages = check_shared_cache_deploy(None)
+        self.assertEqual(['utilities.E001'], [m.id for m in messages])
+
+    @override_settings(CACHES = LOCAL_CACHES, DEBUG = True)
+    def test_process_local_cache_is_fine_for_development(self):
+        self.assertEqual([], check_shared_cache(None))
+
+    @override_settings(CACHES = SHARED_CACHES, DEBUG = False)
+    def test_shared_cache(self):
+        self.assertEqual([], check_shared_cache(None))
+        self.assertEqual([], check_shared_cache_deploy(None))
+
+    @override_settings(CACHES = LOCAL_CACHES, DEBUG = False)
+    def test_worker_refuses_to_start_with_a_process_local_cache(self):
+        with self.assertRaises(SystemExit):
+            worker_init.send(sender = None)
+
+    @override_settings(CACHES = LOCAL_CACHES, DEBUG = True)
+    def test_worker_starts_with_a_process_local_cache_in_development(self):
+        worker_init.send(sender = None)
@@ -0,0 +1,308 @@
+import csv
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from articles.models import Article
+from blog.models import Entry
+
+from ..surrogate import purge_buffer
+from ..testing import commit_immediately
+
+
+class TestExportContent(TestCase):
+
+    def setUp(self):
+        in_the_past = timezone.now() - timezone.timedelta(days = 1)
+        self.article = Article.objects.create(
+            title = 'Assisi',
+            pub_date = in_the_past,
+        )
+        self.entry = Entry.objects.create(title = 'Gubbio')
+        self.comment = self.article.comments.create(body = 'bello')
+        self.entry.comments.create(body = 'anche')
+
+    def export(self, *args):
+        out = StringIO()
+        err = StringIO()
+        call_command('export_content', *args, stdout = out, stderr = err)
+        return out.getvalue()
+
+    def test_ndjson_streams_objects_followed_by_their_comments(self):
+        rows = [json.loads(line) for line in self.export().splitlines()]
+        types = [(row['type'], row['id']) for row in rows]
+        self.assertIn(('articles.article', self.article.pk), types)
+        self.assertIn(('blog.entry', self.entry.pk), types)
+        article_index = types.index(('articles.article', self.article.pk))
+        comment_row = rows[article_index + 1]
+        self.assertEqual('comments.comment', comment_row['type'])
+        self.assertEqual('bello', comment_row['body'])
+        self.assertEqual('articles.article', comment_row['object_type'])
+        self.assertEqual(self.article.pk, comment_row['object_id'])
+
+    def test_csv_has_one_header_and_a_row_per_record(self):
+        rows = list(csv.DictReader(StringIO(self.export('--format', 'csv'))))
+        self.assertEqual(4, len(rows))
+        article_row = [row for row in rows if row['title'] == 'Assisi'][0]
+        self.assertEqual('articles.article', article_row['type'])
+        self.assertEqual(self.article.pub_date.isoformat(), article_row['pub_date'])
+
+    def test_comments_are_fetched_per_chunk_of_objects(self):
+        for number in range(4):
+            Article.objects.create(title = 'extra %s' % number)
+        out = StringIO()
+        # One cursor per model and one comments query per chunk of two
+        # objects: three chunks of articles and one of entries.
+        with self.assertNumQueries(1 + 3 + 1 + 1):
+            call_command(
+                'export_content',
+                '--chunk-size', '2',
+                stdout = out,
+                stderr = StringIO(),
+            )
+        self.assertEqual(5 + 1 + 2, len(out.getvalue().splitlines()))
+
+    def test_since_exports_changed_and_commented_objects(self):
+        since = timezone.now()
+        Article.objects.filter(pk = self.article.pk).update(
+            modified = since - timezone.timedelta(hours = 1),
+        )
+        Entry.objects.filter(pk = self.entry.pk).update(
+            modified = since - timezone.timedelta(hours = 1),
+        )
+        self.entry.comments.create(body = 'nuovo')
+        rows = [
+            json.loads(line)
+            for line in self.export('--since', since.isoformat()).splitlines()
+        ]
+        records = [(row['type'], row.get('title') or row['body']) for row in rows]
+        records_expected = [
+            ('blog.entry', 'Gubbio'),
+            ('comments.comment', 'nuovo'),
+        ]
+        self.assertEqual(records_expected, records)
+
+    def test_invalid_since(self):
+        with self.assertRaises(CommandError):
+            self.export('--since', 'yesterday')
+
+    def test_output_file(self):
+        handle, path = tempfile.mkstemp(suffix = '.ndjson')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        call_command('export_content', '--output', path, stderr = StringIO())
+        with open(path) as export_file:
+            self.assertEqual(4, len(export_file.read().splitlines()))
+
+
+class TestImportContent(TestCase):
+
+    def setUp(self):
+        commit_immediately(self)
+        in_the_past = timezone.now() - timezone.timedelta(days = 1)
+        self.pub_date = in_the_past.replace(microsecond = 0)
+        self.records = [
+            {
+                'type': 'articles.article',
+                'id': 10,
+                'title': 'Lecce',
+                'body': 'Barocco',
+                'created': '2019-01-02T03:04:05+00:00',
+                'pub_date': self.pub_date.isoformat(),
+            },
+            {
+                'type': 'comments.comment',
+                'object_type': 'articles.article',
+                'object_id': 10,
+                'body': 'uno',
+                'created': '2019-01-03T00:00:00+00:00',
+            },
+            {
+                'type': 'comments.comment',
+                'object_type': 'articles.article',
+                'object_id': 10,
+                'body': 'due',
+            },
+            {'type': 'blog.entry', 'id': 20, 'title': 'Bari'},
+        ]
+        handle, self.path = tempfile.mkstemp(suffix = '.ndjson')
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+        self.write_records(self.records)
+
+    def write_records(self, records):
+        with open(self.path, 'w') as import_file:
+            for record in records:
+                import_file.write(json.dumps(record) + '\n')
+
+    def run_import(self, *args):
+        out = StringIO()
+        call_command(
+            'import_content', self.path, *args,
+            stdout = out,
+            stderr = StringIO(),
+        )
+        return out.getvalue()
+
+    def assert_imported(self):
+        article = Article.objects.get(pk = 10)
+        self.assertEqual('Lecce', article.title)
+        self.assertEqual(self.pub_date, article.pub_date)
+        self.assertTrue(article.is_published)
+        self.assertEqual(2, article.comments_count)
+        self.assertEqual(
+            ['due', 'uno'],
+            sorted(article.comments.values_list('body', flat = True)),
+        )
+        entry = Entry.objects.get(pk = 20)
+        self.assertFalse(entry.is_published)
+        self.assertEqual(0, entry.comments_count)
+        self.assertEqual([article], list(Article.published.all()))
+
+    def test_copy_import_keeps_timestamps(self):
+        output = self.run_import()
+        self.assert_imported()
+        article = Article.objects.get(pk = 10)
+        self.assertEqual(2019, article.created.year)
+        comment = article.comments.get(body = 'uno')
+        self.assertEqual(2019, comment.created.year)
+        self.assertIn('imported 2 objects and 2 comments', output)
+        self.assertIn('rows/s', output)
+
+    @override_settings(PURGE_ENDPOINT = 'http://127.0.0.1:9/purge')
+    def test_list_purges_are_sent_before_the_command_returns(self):
+        with mock.patch('utilities.tasks.purge_surrogate_keys.delay') as delay:
+            self.run_import()
+        delay.assert_called_once_with(['articles-list', 'blog-list'])
+        self.assertEqual(0, len(purge_buffer))
+
+    def test_bulk_create_import(self):
+        self.run_import('--no-copy')
+        self.assert_imported()
+
+    def test_imported_objects_are_searchable(self):
+        self.run_import()
+        article = Article.objects.filter(search_vector = 'barocco').get()
+        self.assertEqual(10, article.pk)
+
+    def test_sequences_are_moved_past_imported_ids(self):
+        self.run_import()
+        article = Article.objects.create(title = 'nuovo')
+        self.assertGreater(article.pk, 10)
+
+    def test_comments_may_come_before_their_object(self):
+        self.write_records(self.records[1:3] + self.records[:1])
+        self.run_import('--chunk-size', '1')
+        self.assertEqual(2, Article.objects.get(pk = 10).comments_count)
+
+    def test_comments_of_existing_objects_increase_count(self):
+        article = Article.objects.create(title = 'Otranto')
+        article.comments.create(body = 'old')
+        Article.objects.filter(pk = article.pk).update(comments_count = 1)
+        self.write_records([{
+            'type': 'comments.comment',
+            'object_type': 'articles.article',
+            'object_id': article.pk,
+            'body': 'new',
+        }])
+        self.run_import()
+        article.refresh_from_db()
+        self.assertEqual(2, article.comments_count)
+
+    def test_checkpoint_resumes_after_committed_records(self):
+        checkpoint = self.path + '.checkpoint'
+        self.addCleanup(os.remove, checkpoint)
+        with open(checkpoint, 'w') as checkpoint_file:
+            checkpoint_file.write('3')
+        output = self.run_import('--checkpoint', checkpoint)
+        self.assertFalse(Article.objects.exists())
+        self.assertTrue(Entry.objects.filter(pk = 20).exists())
+        self.assertIn('skipped 3 records', output)
+        with open(checkpoint) as checkpoint_file:
+            self.assertEqual('4', checkpoint_file.read())
+
+    def test_csv_import(self):
+        csv_path = self.path + '.csv'
+        self.addCleanup(os.remove, csv_path)
+        fields = [
+            'type', 'id', 'title', 'body', 'created', 'pub_date',
+            'object_type', 'object_id',
+        ]
+        with open(csv_path, 'w', newline = '') as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames = fields)
+            writer.writeheader()
+            for record in self.records:
+                writer.writerow(record)
+        call_command(
+            'import_content', csv_path,
+            stdout = StringIO(),
+            stderr = StringIO(),
+        )
+        self.assert_imported()
+
+    def test_export_import_round_trip(self):
+        self.run_import()
+        export = StringIO()
+        call_command('export_content', stdout = export, stderr = StringIO())
+        Article.objects.all().delete()
+        Entry.objects.all().delete()
+        self.write_records(
+            json.loads(line) for line in export.getvalue().splitlines()
+        )
+        self.run_import()
+        self.assert_imported()
+
+
+class TestBenchmarkRoutes(TestCase):
+
+    def benchmark(self, *args):
+        out = StringIO()
+        call_command(
+            'benchmark_routes',
+            '--objects', '3',
+            '--comments', '2',
+            '--requests', '2',
+            '--warmup', '0',
+            *args,
+            stdout = out,
+        )
+        return out.getvalue()
+
+    def test_every_route_is_reported(self):
+        output = self.benchmark()
+        for viewname in ['articles:list', 'articles:detail', 'blog:entries']:
+            self.assertIn(viewname, output)
+        self.assertNotIn('regressions', output)
+
+    def test_seeded_data_is_rolled_back(self):
+        self.benchmark()
+        self.assertEqual(0, Article.objects.count())
+        self.assertEqual(0, Entry.objects.count())
+
+    def test_saved_baseline_is_compared(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'baseline.json')
+            self.benchmark('--save-baseline', path)
+            with open(path) as baseline_file:
+                baseline = json.load(baseline_file)
+            self.assertEqual(200, baseline['routes']['articles:detail']['status'])
+            # Pretend the baseline needed fewer queries everywhere.
+            for result in baseline['routes'].values():
+                result['queries'] = -1
+            with open(path, 'w') as baseline_file:
+                json.dump(baseline, baseline_file)
+            output = self.benchmark('--baseline', path)
+            self.assertIn('REGRESSION', output)
+            with self.assertRaises(CommandError):
+                self.benchmark('--baseline', path, '--fail-on-regression')
+
+    def test_unreadable_baseline(self):
+        with self.assertRaises(CommandError):
+            self.benchmark('--baseline', '/nonexistent/baseline.json')
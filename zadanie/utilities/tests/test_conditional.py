@@ -0,0 +1,168 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+
+from articles.models import Article
+from comments.counters import update_comments_counts
+
+from ..conditional import (
+    conditional_page,
+    list_validators,
+    object_validators,
+)
+from ..publishing import publish_due
+from ..routers import is_pinned, reset_pin
+from ..testing import commit_immediately
+
+
+class TestObjectValidators(TestCase):
+
+    def setUp(self):
+        commit_immediately(self)
+        in_the_past = timezone.now() - timezone.timedelta(days = 1)
+        self.article = Article.objects.create(
+            title = 'Siena',
+            pub_date = in_the_past,
+        )
+        cache.clear()
+        self.get_validators = object_validators(Article.published)
+        self.request = RequestFactory().get('/')
+
+    def get_etag(self):
+        etag, last_modified = self.get_validators(
+            self.request,
+            pk = self.article.pk,
+        )
+        self.assertIsNone(last_modified)
+        return etag
+
+    def test_validators_cost_no_query(self):
+        self.get_etag()
+        with self.assertNumQueries(0):
+            self.get_etag()
+
+    def test_edit_changes_etag(self):
+        etag_before = self.get_etag()
+        self.article.save()
+        self.assertNotEqual(etag_before, self.get_etag())
+
+    def test_new_comment_changes_etag(self):
+        etag_before = self.get_etag()
+        self.article.comments.create(body = 'ciao')
+        self.assertNotEqual(etag_before, self.get_etag())
+
+    def test_deleting_an_older_comment_changes_etag(self):
+        older = self.article.comments.create(body = 'primo')
+        self.article.comments.create(body = 'secondo')
+        etag_before = self.get_etag()
+        older.delete()
+        self.assertNotEqual(etag_before, self.get_etag())
+
+    def test_comments_count_flush_changes_etag(self):
+        etag_before = self.get_etag()
+        update_comments_counts([('articles', 'article', self.article.pk, 1)])
+        self.assertNotEqual(etag_before, self.get_etag())
+
+
+class TestListValidators(TestCase):
+
+    def setUp(self):
+        commit_immediately(self)
+        cache.clear()
+        in_the_past = timezone.now() - timezone.timedelta(days = 1)
+        self.article = Article.objects.create(
+            title = 'Siena',
+            pub_date = in_the_past,
+        )
+        self.get_validators = list_validators(Article.published)
+        self.request = RequestFactory().get('/')
+
+    def test_validators_cost_no_query(self):
+        self.get_validators(self.request)
+        with self.assertNumQueries(0):
+            self.get_validators(self.request)
+
+    def test_edit_changes_validators(self):
+        etag_before, _ = self.get_validators(self.request)
+        self.article.save()
+        etag_after, last_modified = self.get_validators(self.request)
+        self.assertNotEqual(etag_before, etag_after)
+        self.assertIsNone(last_modified)
+
+    def test_delete_changes_etag(self):
+        Article.objects.create(pub_date = self.article.pub_date)
+        etag_before, _ = self.get_validators(self.request)
+        self.article.delete()
+        etag_after, _ = self.get_validators(self.request)
+        self.assertNotEqual(etag_before, etag_after)
+
+    def test_publishing_changes_etag(self):
+        in_the_future = timezone.now() + timezone.timedelta(days = 1)
+        article = Article.objects.create(pub_date = in_the_future)
+        etag_before, _ = self.get_validators(self.request)
+        Article.objects.filter(pk = article.pk).update(
+            pub_date = self.article.pub_date,
+        )
+        publish_due(Article)
+        etag_after, _ = self.get_validators(self.request)
+        self.assertNotEqual(etag_before, etag_after)
+
+
+class TestConditionalPage(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.calls = []
+        self.pinned = []
+        self.last_modified = timezone.now().replace(microsecond = 0)
+
+        def view(request):
+            self.calls.append(request)
+            return HttpResponse('page')
+
+        def get_validators(request):
+            self.pinned.append(is_pinned())
+            return ('v1', self.last_modified)
+
+        self.view = conditional_page(get_validators)(view)
+        self.factory = RequestFactory()
+
+    def get(self, user = None, **headers):
+        request = self.factory.get('/page/', **headers)
+        request.user = user or AnonymousUser()
+        return self.view(request)
+
+    def test_response_carries_validators(self):
+        response = self.get()
+        self.assertEqual('"v1"', response['ETag'])
+        self.assertIn('Last-Modified', response)
+
+    def test_validators_are_read_from_the_primary(self):
+        reset_pin()
+        self.get()
+        self.assertEqual([True], self.pinned)
+        self.assertFalse(is_pinned())
+
+    def test_matching_etag_returns_304_without_calling_view(self):
+        response = self.get(HTTP_IF_NONE_MATCH = '"v1"')
+        self.assertEqual(304, response.status_code)
+        self.assertEqual([], self.calls)
+
+    def test_not_matching_etag_calls_view(self):
+        response = self.get(HTTP_IF_NONE_MATCH = '"v0"')
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(1, len(self.calls))
+
+    def test_if_modified_since_returns_304(self):
+        last_modified = self.get()['Last-Modified']
+        response = self.get(HTTP_IF_MODIFIED_SINCE = last_modified)
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(1, len(self.calls))
+
+    def test_authenticated_user_is_not_checked(self):
+        user = type('User', (), {'is_authenticated': True})()
+        response = self.get(user = user, HTTP_IF_NONE_MATCH = '"v1"')
+        self.assertEqual(200, response.status_code)
+        self.assertNotIn('ETag', response)
@@ -0,0 +1,167 @@
+import json
+import os
+import tempfile
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from celery.signals import after_task_publish, before_task_publish
+
+from articles.models import Article
+
+from ..metrics import collect, render
+
+
+def get_value(samples, name, **labels):
+    return samples.get((name, tuple(labels.items())), 0)
+
+
+class TestRender(SimpleTestCase):
+
+    def test_histogram_buckets_are_ordered_and_cumulative(self):
+        route = (('route', 'articles:list'),)
+        samples = {
+            ('zadanie_request_duration_seconds_count', route): 2,
+            ('zadanie_request_duration_seconds_sum', route): 0.5,
+            (
+                'zadanie_request_duration_seconds_bucket',
+                route + (('le', '+Inf'),),
+            ): 2,
+            (
+                'zadanie_request_duration_seconds_bucket',
+                route + (('le', '0.25'),),
+            ): 1,
+            (
+                'zadanie_request_duration_seconds_bucket',
+                route + (('le', '0.1'),),
+            ): 1,
+        }
+        lines = render(samples).splitlines()
+        self.assertEqual(
+            '# TYPE zadanie_request_duration_seconds histogram',
+            lines[1],
+        )
+        self.assertEqual([
+            'zadanie_request_duration_seconds_bucket'
+            '{route="articles:list",le="0.1"} 1',
+            'zadanie_request_duration_seconds_bucket'
+            '{route="articles:list",le="0.25"} 1',
+            'zadanie_request_duration_seconds_bucket'
+            '{route="articles:list",le="+Inf"} 2',
+            'zadanie_request_duration_seconds_count'
+            '{route="articles:list"} 2',
+            'zadanie_request_duration_seconds_sum'
+            '{route="articles:list"} 0.5',
+        ], lines[2:])
+
+    def test_label_values_are_escaped(self):
+        samples = {
+            ('zadanie_request_queries_total', (('route', 'a"b\\c'),)): 3,
+        }
+        self.assertIn(
+            'zadanie_request_queries_total{route="a\\"b\\\\c"} 3',
+            render(samples),
+        )
+
+
+class TestMetricsMiddleware(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        in_the_past = timezone.now() - timezone.timedelta(days = 1)
+        self.article = Article.objects.create(
+            title = 'Spoleto',
+            pub_date = in_the_past,
+        )
+        self.url = reverse('articles:detail', kwargs = {'pk': self.article.pk})
+
+    def test_request_is_recorded_under_its_url_name(self):
+        before = collect()
+        response = self.client.get(self.url)
+        after = collect()
+        route = 'articles:detail'
+        for name in [
+            'zadanie_request_duration_seconds_count',
+            'zadanie_response_size_bytes_count',
+        ]:
+            self.assertEqual(
+                get_value(before, name, route = route) + 1,
+                get_value(after, name, route = route),
+            )
+        self.assertGreater(
+            get_value(after, 'zadanie_request_queries_total', route = route),
+            get_value(before, 'zadanie_request_queries_total', route = route),
+        )
+        size_sum = 'zadanie_response_size_bytes_sum'
+        self.assertEqual(
+            get_value(before, size_sum, route = route) + len(response.content),
+            get_value(after, size_sum, route = route),
+        )
+
+    def test_template_render_time_is_recorded(self):
+        name = 'zadanie_request_render_seconds_total'
+        before = get_value(collect(), name, route = 'articles:detail')
+        self.client.get(self.url)
+        after = get_value(collect(), name, route = 'articles:detail')
+        self.assertGreater(after, before)
+
+    def test_unknown_paths_share_one_label(self):
+        name = 'zadanie_request_duration_seconds_count'
+        before = get_value(collect(), name, route = '<unresolved>')
+        self.client.get('/no/such/page/')
+        self.client.get('/no/such/page/either/')
+        after = get_value(collect(), name, route = '<unresolved>')
+        self.assertEqual(before + 2, after)
+
+    def test_metrics_endpoint(self):
+        self.client.get(self.url)
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(200, response.status_code)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertContains(
+            response,
+            'zadanie_request_duration_seconds_count{route="articles:detail"}',
+        )
+
+    @override_settings(METRICS_ALLOWED_IPS = ['10.0.0.1'])
+    def test_metrics_endpoint_is_limited_to_allowed_addresses(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(404, response.status_code)
+        response = self.client.get(
+            reverse('metrics'),
+            REMOTE_ADDR = '10.0.0.1',
+        )
+        self.assertEqual(200, response.status_code)
+
+
+class TestAggregation(SimpleTestCase):
+
+    def test_totals_of_all_processes_are_summed(self):
+        name = 'zadanie_request_queries_total'
+        labels = [['route', 'blog:entries']]
+        own = get_value(collect(), name, route = 'blog:entries')
+        with tempfile.TemporaryDirectory() as directory:
+            other_process = os.path.join(directory, 'metrics-1.json')
+            with open(other_process, 'w') as samples_file:
+                json.dump([[[name, labels], 5]], samples_file)
+            with override_settings(METRICS_DIRECTORY = directory):
+                samples = collect()
+        self.assertEqual(
+            own + 5,
+            get_value(samples, name, route = 'blog:entries'),
+        )
+
+
+class TestCeleryEnqueueTime(SimpleTestCase):
+
+    def test_publish_time_is_recorded_per_task(self):
+        name = 'zadanie_celery_enqueue_seconds_count'
+        task = 'search.tasks.update_search_index'
+        before = get_value(collect(), name, task = task)
+        headers = {'id': 'a-task-id'}
+        before_task_publish.send(sender = task, headers = headers)
+        after_task_publish.send(sender = task, headers = headers)
+        after = get_value(collect(), name, task = task)
+        self.assertEqual(before + 1, after)
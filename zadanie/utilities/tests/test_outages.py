@@ -0,0 +1,185 @@
+from contextlib import contextmanager
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import InterfaceError, OperationalError, connection
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from articles.models import Article
+from blog.models import Entry
+from comments.counters import comments_count_buffer
+
+from ..cache import invalidate_object
+from ..outages import UNAVAILABLE_KEY, is_connection_error
+from ..outages import mark_database_unavailable
+from ..testing import commit_immediately
+
+
+class QueryCanceled(Exception):
+    pgcode = '57014'
+
+
+def refuse_connection(execute, sql, params, many, context):
+    raise OperationalError('could not connect to server')
+
+
+def cancel_query(execute, sql, params, many, context):
+    error = OperationalError('canceling statement due to statement timeout')
+    raise error from QueryCanceled()
+
+
+@contextmanager
+def database_down():
+    with connection.execute_wrapper(refuse_connection):
+        yield
+
+
+class TestIsConnectionError(SimpleTestCase):
+
+    def raised_from(self, pgcode):
+        cause = Exception()
+        cause.pgcode = pgcode
+        error = OperationalError()
+        error.__cause__ = cause
+        return error
+
+    def test_errors_without_a_server_answer(self):
+        self.assertTrue(is_connection_error(OperationalError()))
+        self.assertTrue(is_connection_error(InterfaceError()))
+
+    def test_connection_exceptions_and_shutdowns(self):
+        self.assertTrue(is_connection_error(self.raised_from('08006')))
+        self.assertTrue(is_connection_error(self.raised_from('57P01')))
+
+    def test_timeouts_and_deadlocks(self):
+        self.assertFalse(is_connection_error(self.raised_from('57014')))
+        self.assertFalse(is_connection_error(self.raised_from('40P01')))
+
+
+class TestServeStaleOnError(TestCase):
+
+    def setUp(self):
+        commit_immediately(self)
+        cache.clear()
+        self.addCleanup(cache.delete, UNAVAILABLE_KEY)
+        in_the_past = timezone.now() - timezone.timedelta(days = 1)
+        self.article = Article.objects.create(
+            title = 'Cortona',
+            pub_date = in_the_past,
+        )
+        self.entry = Entry.objects.create(
+            title = 'Montepulciano',
+            pub_date = in_the_past,
+        )
+        self.detail_url = reverse(
+            'articles:detail',
+            kwargs = {'pk': self.article.pk},
+        )
+
+    def render_then_change(self, url, obj):
+        # Validators come from the cache; a new version makes the page due
+        # for a render that needs the database.
+        rendered = self.client.get(url)
+        invalidate_object(type(obj), obj.pk)
+        return rendered
+
+    def test_cached_pages_are_served_stale(self):
+        urls = [
+            (self.detail_url, self.article),
+            (reverse('articles:list'), self.article),
+            (
+                reverse('blog:entry-detail', kwargs = {'pk': self.entry.pk}),
+                self.entry,
+            ),
+            (reverse('blog:entries'), self.entry),
+        ]
+        for url, obj in urls:
+            rendered = self.render_then_change(url, obj)
+            with database_down():
+                with self.assertLogs('utilities.outages', 'WARNING'):
+                    response = self.client.get(url)
+            self.assertEqual(200, response.status_code)
+            self.assertEqual(rendered.content, response.content)
+            self.assertEqual('111 - "Revalidation Failed"', response['Warning'])
+            self.assertIn('Age', response)
+            self.assertIn('no-store', response['Cache-Control'])
+            cache.delete(UNAVAILABLE_KEY)
+
+    def test_stale_pages_are_served_without_the_database(self):
+        self.render_then_change(self.detail_url, self.article)
+        with database_down():
+            with self.assertLogs('utilities.outages', 'WARNING'):
+                self.client.get(self.detail_url)
+            with self.assertNumQueries(0):
+                response = self.client.get(self.detail_url)
+        self.assertIn('Warning', response)
+
+    def test_pages_never_rendered_still_fail(self):
+        with database_down():
+            with self.assertRaises(OperationalError):
+                self.client.get(self.detail_url)
+
+    def test_canceled_query_does_not_mark_the_database_down(self):
+        self.render_then_change(self.detail_url, self.article)
+        with connection.execute_wrapper(cancel_query):
+            with self.assertRaises(OperationalError):
+                self.client.get(self.detail_url)
+        self.assertIsNone(cache.get(UNAVAILABLE_KEY))
+
+    def test_pages_are_fresh_again_once_the_database_is_back(self):
+        self.render_then_change(self.detail_url, self.article)
+        with database_down():
+            with self.assertLogs('utilities.outages', 'WARNING'):
+                self.client.get(self.detail_url)
+        with self.settings(DATABASE_UNAVAILABLE_SECONDS = 0):
+            mark_database_unavailable()
+        response = self.client.get(self.detail_url)
+        self.assertNotIn('Warning', response)
+
+
+class TestUnavailableOnDatabaseError(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.delete, UNAVAILABLE_KEY)
+        in_the_past = timezone.now() - timezone.timedelta(days = 1)
+        self.article = Article.objects.create(
+            title = 'Arezzo',
+            pub_date = in_the_past,
+        )
+        self.detail_url = reverse(
+            'articles:detail',
+            kwargs = {'pk': self.article.pk},
+        )
+
+    def tearDown(self):
+        with mock.patch('comments.tasks.flush_comments_count.delay'):
+            comments_count_buffer.flush()
+
+    def test_comment_post_gets_a_503(self):
+        with database_down():
+            with self.assertLogs('utilities.outages', 'WARNING'):
+                response = self.client.post(self.detail_url, {'body': 'ciao'})
+        self.assertEqual(503, response.status_code)
+        self.assertEqual('5', response['Retry-After'])
+        self.assertContains(response, 'try again', status_code = 503)
+
+    def test_following_posts_do_not_wait_for_the_database(self):
+        with database_down():
+            with self.assertLogs('utilities.outages', 'WARNING'):
+                self.client.post(self.detail_url, {'body': 'ciao'})
+            with self.assertNumQueries(0):
+                response = self.client.post(self.detail_url, {'body': 'ciao'})
+        self.assertEqual(503, response.status_code)
+
+    def test_canceled_query_is_not_a_503(self):
+        with connection.execute_wrapper(cancel_query):
+            with self.assertRaises(OperationalError):
+                self.client.post(self.detail_url, {'body': 'ciao'})
+        self.assertIsNone(cache.get(UNAVAILABLE_KEY))
+
+    def test_comment_post_works_with_the_database_up(self):
+        response = self.client.post(self.detail_url, {'body': 'ciao'})
+        self.assertEqual(302, response.status_code)
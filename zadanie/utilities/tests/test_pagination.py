@@ -0,0 +1,115 @@
+from django.http import Http404
+from django.test import TestCase
+from django.utils import timezone
+
+from articles.models import Article
+
+from ..pagination import (
+    KeysetPage,
+    decode_cursor,
+    encode_cursor,
+    get_keyset_ordering,
+    keyset_paginate,
+)
+
+
+class TestKeysetPage(TestCase):
+
+    def test_page_without_cursors_has_no_other_pages(self):
+        page = KeysetPage(['a', 'b'], None, None)
+        self.assertFalse(page.has_next())
+        self.assertFalse(page.has_previous())
+        self.assertFalse(page.has_other_pages())
+        self.assertEqual(['a', 'b'], list(page))
+        self.assertEqual(2, len(page))
+
+    def test_page_with_next_cursor_has_other_pages(self):
+        page = KeysetPage(['a'], 'cursor', None)
+        self.assertTrue(page.has_next())
+        self.assertTrue(page.has_other_pages())
+
+
+class TestKeysetOrdering(TestCase):
+
+    def test_ordering_adds_id_as_tiebreaker(self):
+        ordering_expected = (['modified', 'id'], True)
+        ordering_given = get_keyset_ordering(Article)
+        self.assertEqual(ordering_expected, ordering_given)
+
+
+class TestCursor(TestCase):
+
+    def test_cursor_round_trip(self):
+        in_the_past = timezone.now() - timezone.timedelta(days = 1)
+        article = Article.objects.create(
+            title = 'Torino',
+            body = 'test',
+            pub_date = in_the_past,
+        )
+        fields = ['modified', 'id']
+        cursor = encode_cursor(article, fields)
+        values_expected = [article.modified, article.id]
+        values_given = decode_cursor(cursor, Article, fields)
+        self.assertEqual(values_expected, values_given)
+
+    def test_invalid_cursor_raises_404(self):
+        fields = ['modified', 'id']
+        with self.assertRaises(Http404):
+            decode_cursor('not-a-cursor', Article, fields)
+        with self.assertRaises(Http404):
+            decode_cursor(encode_cursor(object(), []), Article, fields)
+
+
+class TestKeysetPaginate(TestCase):
+
+    def setUp(self):
+        in_the_past = timezone.now() - timezone.timedelta(days = 1)
+        for number in range(5):
+            Article.objects.create(
+                title = 'article %s' % number,
+                body = 'test',
+                pub_date = in_the_past,
+            )
+        # same modified for all rows forces the id tiebreaker
+        Article.objects.update(modified = in_the_past)
+        self.expected = list(Article.objects.order_by('-modified', '-id'))
+
+    def test_first_page(self):
+        page = keyset_paginate(Article.objects.all(), 2)
+        self.assertEqual(self.expected[:2], page.object_list)
+        self.assertTrue(page.has_next())
+        self.assertFalse(page.has_previous())
+
+    def test_walks_forward_and_back(self):
+        queryset = Article.objects.all()
+        first = keyset_paginate(queryset, 2)
+        second = keyset_paginate(queryset, 2, after = first.next_cursor)
+        third = keyset_paginate(queryset, 2, after = second.next_cursor)
+        self.assertEqual(self.expected[2:4], second.object_list)
+        self.assertEqual(self.expected[4:], third.object_list)
+        self.assertFalse(third.has_next())
+        self.assertTrue(third.has_previous())
+        back = keyset_paginate(queryset, 2, before = third.previous_cursor)
+        self.assertEqual(self.expected[2:4], back.object_list)
+        self.assertTrue(back.has_next())
+        self.assertTrue(back.has_previous())
+        cursor = back.previous_cursor
+        first_again = keyset_paginate(queryset, 2, before = cursor)
+        self.assertEqual(self.expected[:2], first_again.object_list)
+        self.assertFalse(first_again.has_previous())
+
+    def test_page_query_does_not_use_offset(self):
+        queryset = Article.objects.all()
+        first = keyset_paginate(queryset, 2)
+        with self.assertNumQueries(1) as context:
+            keyset_paginate(queryset, 2, after = first.next_cursor)
+        sql = context.captured_queries[0]['sql']
+        self.assertNotIn('OFFSET', sql)
+
+    def test_page_query_bounds_the_leading_field(self):
+        queryset = Article.objects.all()
+        first = keyset_paginate(queryset, 2)
+        with self.assertNumQueries(1) as context:
+            keyset_paginate(queryset, 2, after = first.next_cursor)
+        sql = context.captured_queries[0]['sql']
+        self.assertIn('"modified" <= ', sql)
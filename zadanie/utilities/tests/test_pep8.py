@@ -0,0 +1,47 @@
+from django.test import TestCase
+
+import pycodestyle
+
+
+class TestCodeFormat(TestCase):
+
+    def test_style(self):
+        list_of_error_codes_to_ignore = ['E251']
+        list_of_files = [
+            'utilities/buffers.py',
+            'utilities/bulk.py',
+            'utilities/apps.py',
+            'utilities/benchmark.py',
+            'utilities/cache.py',
+            'utilities/checks.py',
+            'utilities/conditional.py',
+            'utilities/management/commands/benchmark_middleware.py',
+            'utilities/management/commands/benchmark_routes.py',
+            'utilities/management/commands/export_content.py',
+            'utilities/management/commands/import_content.py',
+            'utilities/management/commands/profiling_token.py',
+            'utilities/management/commands/query_report.py',
+            'utilities/management/commands/trace_collector.py',
+            'utilities/metrics.py',
+            'utilities/outages.py',
+            'utilities/pagination.py',
+            'utilities/pipeline.py',
+            'utilities/profiling.py',
+            'utilities/publishing.py',
+            'utilities/queries.py',
+            'utilities/routers.py',
+            'utilities/surrogate.py',
+            'utilities/tasks.py',
+            'utilities/testing.py',
+            'utilities/tracing.py',
+            'utilities/utilities.py',
+            'utilities/views.py',
+        ]
+        style = pycodestyle.StyleGuide(
+            ignore = list_of_error_codes_to_ignore,
+            quiet = True,
+        )
+        result = style.check_files(list_of_files)
+        number_of_errors_expected = 0
+        number_of_errors_given = result.total_errors
+        self.assertEqual(number_of_errors_expected, number_of_errors_given)
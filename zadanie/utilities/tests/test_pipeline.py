@@ -0,0 +1,168 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from articles.models import Article
+from comments.counters import comments_count_buffer
+
+from ..pipeline import FAST, FULL
+
+
+class TestRouteAwarePipeline(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        in_the_past = timezone.now() - timezone.timedelta(days = 1)
+        self.article = Article.objects.create(
+            title = 'Narni',
+            pub_date = in_the_past,
+        )
+        self.list_url = reverse('articles:list')
+        self.detail_url = reverse(
+            'articles:detail',
+            kwargs = {'pk': self.article.pk},
+        )
+
+    def test_anonymous_list_takes_the_fast_path(self):
+        response = self.client.get(self.list_url)
+        self.assertEqual(FAST, response.wsgi_request._pipeline)
+        self.assertEqual('Cookie', response['Vary'])
+        self.assertEqual('public, max-age=0', response['Cache-Control'])
+        self.assertFalse(response.wsgi_request.user.is_authenticated)
+        self.assertContains(response, 'Sign In / Up')
+        self.assertEqual({}, dict(response.cookies))
+
+    def test_fast_path_skips_sessions_and_messages(self):
+        response = self.client.get(self.list_url)
+        request = response.wsgi_request
+        self.assertFalse(hasattr(request, 'session'))
+        self.assertFalse(hasattr(request, '_messages'))
+
+    def test_routes_outside_the_list_take_the_full_path(self):
+        response = self.client.get(reverse('articles:create'))
+        self.assertEqual(FULL, response.wsgi_request._pipeline)
+        self.assertIn('Cookie', response['Vary'])
+
+    def test_session_cookie_takes_the_full_path(self):
+        user = get_user_model().objects.create_user(
+            username = 'anna',
+            password = 'somepass',
+        )
+        self.client.force_login(user)
+        response = self.client.get(self.list_url)
+        self.assertEqual(FULL, response.wsgi_request._pipeline)
+        self.assertContains(response, 'Sign Out')
+        self.assertFalse(response.has_header('Cache-Control'))
+
+    def test_messages_cookie_takes_the_full_path(self):
+        self.client.cookies['messages'] = 'pending'
+        response = self.client.get(self.list_url)
+        self.assertEqual(FULL, response.wsgi_request._pipeline)
+
+    def test_csrf_cookie_keeps_the_fast_path(self):
+        self.client.get(reverse('csrf-token'))
+        response = self.client.get(self.list_url)
+        self.assertEqual(FAST, response.wsgi_request._pipeline)
+        self.assertEqual('public, max-age=0', response['Cache-Control'])
+
+    def test_blocking_cookies_follow_the_cookie_settings(self):
+        with self.settings(SESSION_COOKIE_NAME = 'zadanie_session'):
+            self.client.cookies['zadanie_session'] = 'abc'
+            response = self.client.get(self.list_url)
+        self.assertEqual(FULL, response.wsgi_request._pipeline)
+
+    def test_session_storage_of_messages_sets_no_cookie_to_block(self):
+        storage = 'django.contrib.messages.storage.session.SessionStorage'
+        with self.settings(MESSAGE_STORAGE = storage):
+            self.client.cookies['messages'] = 'pending'
+            response = self.client.get(self.list_url)
+        self.assertEqual(FAST, response.wsgi_request._pipeline)
+
+    def test_posts_are_still_csrf_protected(self):
+        client = Client(enforce_csrf_checks = True)
+        response = client.post(self.detail_url, {'body': 'ciao'})
+        self.assertEqual(403, response.status_code)
+
+    def test_unknown_paths_take_the_full_path(self):
+        response = self.client.get('/no/such/page/')
+        self.assertEqual(404, response.status_code)
+        self.assertEqual(FULL, response.wsgi_request._pipeline)
+
+
+class TestCacheSafeCsrf(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        in_the_past = timezone.now() - timezone.timedelta(days = 1)
+        self.article = Article.objects.create(
+            title = 'Spello',
+            pub_date = in_the_past,
+        )
+        self.detail_url = reverse(
+            'articles:detail',
+            kwargs = {'pk': self.article.pk},
+        )
+
+    def tearDown(self):
+        with mock.patch('comments.tasks.flush_comments_count.delay'):
+            comments_count_buffer.flush()
+
+    def test_detail_page_is_the_same_for_every_anonymous_visitor(self):
+        first = Client().get(self.detail_url)
+        second = Client().get(self.detail_url)
+        self.assertEqual(FAST, first.wsgi_request._pipeline)
+        self.assertEqual(first.content, second.content)
+        self.assertNotIn(b'name="csrfmiddlewaretoken"', first.content)
+        self.assertContains(first, reverse('csrf-token'))
+        self.assertEqual('Cookie', first['Vary'])
+        self.assertEqual({}, dict(first.cookies))
+
+    def test_token_endpoint_is_not_cached(self):
+        response = self.client.get(reverse('csrf-token'))
+        self.assertEqual(FULL, response.wsgi_request._pipeline)
+        self.assertTrue(response.json()['token'])
+        self.assertIn('csrftoken', response.cookies)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_comment_without_a_token_is_rejected(self):
+        client = Client(enforce_csrf_checks = True)
+        client.get(reverse('csrf-token'))
+        response = client.post(self.detail_url, {'body': 'ciao'})
+        self.assertEqual(403, response.status_code)
+
+    def test_comment_with_the_fetched_token_is_accepted(self):
+        client = Client(enforce_csrf_checks = True)
+        token = client.get(reverse('csrf-token')).json()['token']
+        response = client.post(
+            self.detail_url,
+            {'body': 'ciao', 'csrfmiddlewaretoken': token},
+        )
+        self.assertRedirects(
+            response,
+            self.detail_url,
+            fetch_redirect_response = False,
+        )
+
+
+class TestBenchmarkMiddleware(TestCase):
+
+    def test_both_stacks_are_reported(self):
+        out = StringIO()
+        call_command(
+            'benchmark_middleware',
+            'articles:list',
+            '--requests', '2',
+            '--warmup', '1',
+            stdout = out,
+        )
+        output = out.getvalue()
+        self.assertIn('flat', output)
+        self.assertIn('pipeline', output)
+        self.assertIn('Vary: Cookie', output)
+        self.assertIn('Cache-Control: public', output)
@@ -0,0 +1,154 @@
+import cProfile
+import os
+import pstats
+import shutil
+import tempfile
+import time
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from articles.models import Article
+from comments.tasks import increase_comments_count
+
+from ..profiling import (
+    enforce_disk_limit,
+    get_collapsed_stacks,
+    make_token,
+)
+
+
+def inner():
+    return sum(range(20000))
+
+
+def outer():
+    return [inner() for _ in range(20)]
+
+
+class ProfilingTestMixin:
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        profiling_settings = override_settings(
+            PROFILING_DIRECTORY = self.directory,
+        )
+        profiling_settings.enable()
+        self.addCleanup(profiling_settings.disable)
+
+    def get_profiles(self):
+        return sorted(os.listdir(self.directory))
+
+
+class TestProfilingMiddleware(ProfilingTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        in_the_past = timezone.now() - timezone.timedelta(days = 1)
+        Article.objects.create(title = 'Orvieto', pub_date = in_the_past)
+        self.url = reverse('articles:list')
+
+    def test_requests_are_not_profiled_by_default(self):
+        self.client.get(self.url)
+        self.assertEqual([], self.get_profiles())
+
+    def test_signed_header_profiles_the_request(self):
+        response = self.client.get(self.url, HTTP_X_PROFILE = make_token())
+        profiles = self.get_profiles()
+        self.assertEqual(1, len(profiles))
+        self.assertEqual(profiles[0], response['X-Profile-File'])
+        self.assertTrue(profiles[0].endswith('-articles-list.prof'))
+        path = os.path.join(self.directory, profiles[0])
+        stats = pstats.Stats(path)
+        self.assertTrue(stats.total_tt > 0)
+
+    def test_forged_header_is_ignored(self):
+        response = self.client.get(self.url, HTTP_X_PROFILE = 'profile:x:y')
+        self.assertEqual([], self.get_profiles())
+        self.assertFalse(response.has_header('X-Profile-File'))
+
+    @override_settings(PROFILING_SAMPLE_RATE = 1)
+    def test_sampled_requests_are_profiled(self):
+        response = self.client.get(self.url)
+        self.assertEqual(1, len(self.get_profiles()))
+        self.assertFalse(response.has_header('X-Profile-File'))
+
+    @override_settings(PROFILING_SAMPLE_RATE = 1, PROFILING_FORMAT = 'collapsed')
+    def test_collapsed_stacks(self):
+        self.client.get(self.url)
+        profiles = self.get_profiles()
+        self.assertTrue(profiles[0].endswith('-articles-list.collapsed'))
+        with open(os.path.join(self.directory, profiles[0])) as profile_file:
+            lines = profile_file.read().splitlines()
+        self.assertTrue(lines)
+        for line in lines:
+            stack, weight = line.rsplit(' ', 1)
+            self.assertGreater(int(weight), 0)
+
+    def test_token_command(self):
+        out = StringIO()
+        call_command('profiling_token', stdout = out)
+        header, token = out.getvalue().strip().split(': ')
+        self.assertEqual('X-Profile', header)
+        self.client.get(self.url, HTTP_X_PROFILE = token)
+        self.assertEqual(1, len(self.get_profiles()))
+
+
+class TestTaskProfiling(ProfilingTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.article = Article.objects.create(title = 'Todi')
+
+    @override_settings(
+        PROFILING_SAMPLE_RATE = 1,
+        PROFILING_TASKS = ['comments.tasks.increase_comments_count'],
+    )
+    def test_listed_tasks_are_profiled(self):
+        increase_comments_count.apply(
+            args = ('articles', 'article', self.article.pk),
+        )
+        profiles = self.get_profiles()
+        self.assertEqual(1, len(profiles))
+        self.assertTrue(
+            profiles[0].endswith('-comments.tasks.increase_comments_count.prof')
+        )
+
+    @override_settings(PROFILING_SAMPLE_RATE = 1)
+    def test_other_tasks_are_not(self):
+        increase_comments_count.apply(
+            args = ('articles', 'article', self.article.pk),
+        )
+        self.assertEqual([], self.get_profiles())
+
+
+class TestCollapsedStacks(SimpleTestCase):
+
+    def test_stacks_lead_from_callers_to_callees(self):
+        profiler = cProfile.Profile()
+        profiler.runcall(outer)
+        stacks = get_collapsed_stacks(pstats.Stats(profiler))
+        inner_stacks = [stack for stack in stacks if stack.endswith('(inner)')]
+        self.assertTrue(inner_stacks)
+        for stack in inner_stacks:
+            self.assertIn('(outer);', stack)
+
+
+class TestDiskLimit(SimpleTestCase):
+
+    def test_oldest_profiles_are_removed(self):
+        with tempfile.TemporaryDirectory() as directory:
+            now = time.time()
+            for number in range(4):
+                path = os.path.join(directory, '%s.prof' % number)
+                with open(path, 'w') as profile_file:
+                    profile_file.write('x' * 100)
+                os.utime(path, (now + number, now + number))
+            enforce_disk_limit(directory, 250)
+            self.assertEqual(['2.prof', '3.prof'], sorted(os.listdir(directory)))
@@ -0,0 +1,54 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from articles.models import Article
+from articles.tasks import publish_due_articles
+from blog.models import Entry
+from blog.tasks import publish_due_entries
+
+from ..cache import get_list_version_name, get_object_version_name
+from ..cache import get_versions
+from ..publishing import publish_due
+from ..testing import commit_immediately
+
+
+class TestPublishDue(TestCase):
+
+    def setUp(self):
+        commit_immediately(self)
+        cache.clear()
+        in_the_future = timezone.now() + timezone.timedelta(days = 1)
+        self.due = Article.objects.create(pub_date = in_the_future)
+        self.scheduled = Article.objects.create(pub_date = in_the_future)
+        in_the_past = timezone.now() - timezone.timedelta(minutes = 1)
+        Article.objects.filter(pk = self.due.pk).update(pub_date = in_the_past)
+
+    def test_flips_only_rows_whose_pub_date_has_passed(self):
+        pks = publish_due(Article)
+        self.assertEqual([self.due.pk], pks)
+        self.assertEqual([self.due], list(Article.published.all()))
+
+    def test_invalidates_object_and_list_pages(self):
+        names = [
+            get_object_version_name(Article, self.due.pk),
+            get_list_version_name(Article),
+        ]
+        object_version, list_version = get_versions(names)
+        publish_due(Article)
+        versions_given = get_versions(names)
+        self.assertEqual([object_version + 1, list_version + 1], versions_given)
+
+    def test_second_run_has_nothing_to_do(self):
+        publish_due(Article)
+        with self.assertNumQueries(1):
+            pks = publish_due(Article)
+        self.assertEqual([], pks)
+
+    def test_tasks_publish_their_models(self):
+        in_the_future = timezone.now() + timezone.timedelta(days = 1)
+        entry = Entry.objects.create(pub_date = in_the_future)
+        in_the_past = timezone.now() - timezone.timedelta(minutes = 1)
+        Entry.objects.filter(pk = entry.pk).update(pub_date = in_the_past)
+        self.assertEqual([self.due.pk], publish_due_articles())
+        self.assertEqual([entry.pk], publish_due_entries())
@@ -0,0 +1,128 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from articles.models import Article
+from comments.tasks import increase_comments_count
+
+from ..queries import QueryObserver, fingerprint, get_report, query_totals
+
+
+class TestFingerprint(SimpleTestCase):
+
+    def test_literals_and_placeholders(self):
+        self.assertEqual(
+            'SELECT "a"."id" FROM "a" WHERE ("a"."title" = ? AND "a"."id" > ?)',
+            fingerprint(
+                'SELECT "a"."id" FROM "a" '
+                'WHERE ("a"."title" = \'it\'\'s\' AND "a"."id" > 42)'
+            ),
+        )
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id = %s LIMIT 21'),
+            fingerprint('SELECT *   FROM t\nWHERE id = 7 LIMIT 1'),
+        )
+
+    def test_lists_of_any_length(self):
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s)'),
+            fingerprint('SELECT * FROM t WHERE id IN (1, 2, 3, 4)'),
+        )
+        self.assertEqual(
+            'INSERT INTO t (a, b) VALUES (?+), ...',
+            fingerprint('INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)'),
+        )
+
+    def test_identifiers_with_digits_are_kept(self):
+        self.assertIn('U0', fingerprint('SELECT U0."id" FROM "t" U0'))
+
+
+class TestQueryObserver(TestCase):
+
+    def setUp(self):
+        self.articles = [
+            Article.objects.create(title = 'Gubbio %s' % number)
+            for number in range(12)
+        ]
+
+    def get_rows(self, view):
+        return get_report(query_totals.collect(), view = view)
+
+    def test_repeated_statement_is_reported_as_n_plus_one(self):
+        observer = QueryObserver()
+        with observer.observe():
+            for article in self.articles:
+                Article.objects.get(pk = article.pk)
+        with self.assertLogs('utilities.queries', 'WARNING') as logs:
+            observer.finish('test:repeated')
+        self.assertIn('12 queries', logs.output[0])
+        rows = self.get_rows('test:repeated')
+        self.assertEqual(1, len(rows))
+        self.assertEqual(12, rows[0]['queries'])
+        self.assertEqual(1, rows[0]['repeated'])
+        self.assertEqual(12, rows[0]['per_unit'])
+
+    def test_statements_under_the_threshold_are_not(self):
+        observer = QueryObserver()
+        with observer.observe():
+            Article.objects.get(pk = self.articles[0].pk)
+        observer.finish('test:single')
+        rows = self.get_rows('test:single')
+        self.assertEqual(0, rows[0]['repeated'])
+
+    @override_settings(QUERY_OBSERVER_SAMPLE_RATE = 1)
+    def test_sampled_requests_are_grouped_by_url_name(self):
+        cache.clear()
+        article = self.articles[0]
+        article.pub_date = timezone.now() - timezone.timedelta(days = 1)
+        article.save()
+        url = reverse('articles:detail', kwargs = {'pk': article.pk})
+        units_before = sum(
+            row['units'] for row in self.get_rows('articles:detail')
+        )
+        self.client.get(url)
+        rows = self.get_rows('articles:detail')
+        self.assertTrue(rows)
+        self.assertGreater(sum(row['units'] for row in rows), units_before)
+
+    @override_settings(QUERY_OBSERVER_SAMPLE_RATE = 0)
+    def test_unsampled_requests_are_left_alone(self):
+        rows_before = self.get_rows('articles:list')
+        self.client.get(reverse('articles:list'))
+        self.assertEqual(rows_before, self.get_rows('articles:list'))
+
+    @override_settings(QUERY_OBSERVER_SAMPLE_RATE = 1)
+    def test_tasks_are_grouped_by_task_name(self):
+        increase_comments_count.apply(
+            args = ('articles', 'article', self.articles[0].pk),
+        )
+        rows = self.get_rows('comments.tasks.increase_comments_count')
+        self.assertTrue(rows)
+
+    def test_report_command(self):
+        observer = QueryObserver()
+        with observer.observe():
+            for article in self.articles:
+                Article.objects.get(pk = article.pk)
+        with self.assertLogs('utilities.queries', 'WARNING'):
+            observer.finish('test:command')
+        out = StringIO()
+        call_command(
+            'query_report',
+            '--view', 'test:command',
+            '--order-by', 'repeated',
+            stdout = out,
+        )
+        lines = out.getvalue().splitlines()
+        self.assertIn('N+1', lines[0])
+        self.assertTrue(lines[1].startswith('test:command'))
+        self.assertIn('FROM "articles_article"', lines[1])
+
+    def test_report_command_without_data(self):
+        out = StringIO()
+        call_command('query_report', '--view', 'nothing', stdout = out)
+        self.assertEqual('No queries observed.\n', out.getvalue())
@@ -0,0 +1,182 @@
+import unittest
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.db import connections
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from articles.models import Article
+from comments.counters import comments_count_buffer
+from comments.models import Comment
+from users.models import CustomUser
+
+from ..routers import (
+    PIN_COOKIE_NAME,
+    REPLICA_HINT,
+    PrimaryPinMiddleware,
+    ReplicaRouter,
+    is_pinned,
+    pin_to_primary,
+    read_from_replica,
+    reading_from_primary,
+    reset_pin,
+)
+
+
+@override_settings(REPLICA_DATABASES = ['replica_0', 'replica_1'])
+class TestReplicaRouter(SimpleTestCase):
+
+    def setUp(self):
+        reset_pin()
+        self.addCleanup(reset_pin)
+        self.router = ReplicaRouter()
+
+    def read(self, model):
+        return self.router.db_for_read(model, **{REPLICA_HINT: True})
+
+    def test_marked_reads_go_to_replicas(self):
+        for model in (Article, Comment):
+            self.assertIn(self.read(model), ['replica_0', 'replica_1'])
+
+    def test_reads_without_the_hint_are_left_to_default(self):
+        self.assertIsNone(self.router.db_for_read(Article))
+        self.assertIsNone(self.router.db_for_read(CustomUser))
+
+    def test_writes_go_to_primary(self):
+        self.assertEqual('default', self.router.db_for_write(Article))
+
+    def test_reads_after_write_go_to_primary(self):
+        self.router.db_for_write(Comment)
+        self.assertEqual('default', self.read(Article))
+
+    def test_session_writes_do_not_pin(self):
+        self.router.db_for_write(Session)
+        self.assertIn(self.read(Article), ['replica_0', 'replica_1'])
+
+    def test_reads_inside_reading_from_primary_go_to_primary(self):
+        with reading_from_primary():
+            self.assertEqual('default', self.read(Article))
+        self.assertFalse(is_pinned())
+
+    def test_pinned_reads_go_to_primary(self):
+        pin_to_primary()
+        self.assertEqual('default', self.read(Article))
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(self.router.allow_migrate('replica_0', 'articles'))
+        self.assertIsNone(self.router.allow_migrate('default', 'articles'))
+
+    @override_settings(REPLICA_DATABASES = [])
+    def test_without_replicas_reads_are_left_to_default(self):
+        self.assertIsNone(self.read(Article))
+
+
+class TestReadFromReplica(SimpleTestCase):
+
+    def test_published_listings_are_marked(self):
+        queryset = Article.published.filter(title = 'Rovereto')
+        self.assertTrue(queryset._hints.get(REPLICA_HINT))
+
+    def test_other_querysets_are_not_marked(self):
+        self.assertFalse(Article.objects.all()._hints.get(REPLICA_HINT))
+
+    def test_marking_leaves_the_queryset_alone(self):
+        queryset = Article.objects.all()
+        read_from_replica(queryset)
+        self.assertFalse(queryset._hints.get(REPLICA_HINT))
+
+
+@override_settings(READ_YOUR_WRITES_SECONDS = 5)
+class TestPrimaryPinMiddleware(SimpleTestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.pinned_during_request = []
+
+    def get_response(self, request):
+        self.pinned_during_request.append(is_pinned())
+        return HttpResponse()
+
+    def writing_response(self, request):
+        ReplicaRouter().db_for_write(Comment)
+        return HttpResponse()
+
+    def test_write_sets_pin_cookie(self):
+        middleware = PrimaryPinMiddleware(self.writing_response)
+        response = middleware(self.factory.post('/'))
+        cookie = response.cookies[PIN_COOKIE_NAME]
+        self.assertEqual(5, cookie['max-age'])
+        self.assertFalse(is_pinned())
+
+    def test_read_does_not_set_cookie(self):
+        middleware = PrimaryPinMiddleware(self.get_response)
+        response = middleware(self.factory.get('/'))
+        self.assertNotIn(PIN_COOKIE_NAME, response.cookies)
+        self.assertEqual([False], self.pinned_during_request)
+
+    def test_posts_read_from_the_primary(self):
+        middleware = PrimaryPinMiddleware(self.get_response)
+        middleware(self.factory.post('/'))
+        self.assertEqual([True], self.pinned_during_request)
+        self.assertFalse(is_pinned())
+
+    def test_cookie_pins_request(self):
+        middleware = PrimaryPinMiddleware(self.get_response)
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE_NAME] = '1'
+        middleware(request)
+        self.assertEqual([True], self.pinned_during_request)
+        self.assertFalse(is_pinned())
+
+
+@unittest.skipUnless(
+    settings.REPLICA_DATABASES,
+    'set DATABASE_REPLICA_HOSTS to test with a local replica alias',
+)
+class TestReadYourWrites(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        in_the_past = timezone.now() - timezone.timedelta(days = 1)
+        self.article = Article.objects.create(
+            title = 'Trento',
+            pub_date = in_the_past,
+        )
+        self.path = reverse('articles:detail', kwargs = {'pk': self.article.pk})
+        # Comment pages are not page cached, so every GET reads them.
+        self.comments_path = reverse(
+            'articles:comments',
+            kwargs = {'pk': self.article.pk},
+        )
+
+    def tearDown(self):
+        with mock.patch('comments.tasks.flush_comments_count.delay'):
+            comments_count_buffer.flush()
+
+    def count_queries(self, alias):
+        return CaptureQueriesContext(connections[alias])
+
+    def test_reads_use_replica_until_a_write(self):
+        replica = settings.REPLICA_DATABASES[0]
+        with override_settings(REPLICA_DATABASES = [replica]):
+            with self.count_queries(replica) as replica_queries:
+                response = self.client.get(self.comments_path)
+            self.assertEqual(200, response.status_code)
+            self.assertTrue(replica_queries.captured_queries)
+            response = self.client.post(self.path, {'body': 'Buono'})
+            self.assertEqual(302, response.status_code)
+            self.assertIn(PIN_COOKIE_NAME, response.cookies)
+            with self.count_queries(replica) as replica_queries:
+                response = self.client.get(self.comments_path)
+            self.assertEqual([], replica_queries.captured_queries)
+            self.assertContains(response, 'Buono')
@@ -0,0 +1,157 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from articles.models import Article
+from blog.models import Entry
+from comments.models import Comment
+from comments.tasks import flush_comments_count
+
+from ..surrogate import purge_buffer, send_purge
+from ..tasks import purge_surrogate_keys
+from ..testing import commit_immediately
+
+DELAY_PATH = 'utilities.tasks.purge_surrogate_keys.delay'
+
+
+class PurgeStubHandler(BaseHTTPRequestHandler):
+
+    def do_PURGE(self):
+        self.server.purges.append(
+            (self.command, self.path, self.headers['Surrogate-Key']),
+        )
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestSurrogateKeys(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        in_the_past = timezone.now() - timezone.timedelta(days = 1)
+        self.article = Article.objects.create(
+            title = 'Todi',
+            pub_date = in_the_past,
+        )
+        self.entry = Entry.objects.create(
+            title = 'Orvieto',
+            pub_date = in_the_past,
+        )
+
+    def get_keys(self, viewname, **kwargs):
+        response = self.client.get(reverse(viewname, kwargs = kwargs))
+        return response['Surrogate-Key']
+
+    def test_detail_pages(self):
+        self.assertEqual(
+            'article-%s' % self.article.pk,
+            self.get_keys('articles:detail', pk = self.article.pk),
+        )
+        self.assertEqual(
+            'entry-%s' % self.entry.pk,
+            self.get_keys('blog:entry-detail', pk = self.entry.pk),
+        )
+
+    def test_comment_pages_belong_to_their_object(self):
+        self.assertEqual(
+            'article-%s' % self.article.pk,
+            self.get_keys('articles:comments', pk = self.article.pk),
+        )
+
+    def test_list_pages(self):
+        self.assertEqual('articles-list', self.get_keys('articles:list'))
+        self.assertEqual('blog-list', self.get_keys('blog:entries'))
+
+    def test_cached_pages_keep_their_keys(self):
+        self.get_keys('articles:list')
+        self.assertEqual('articles-list', self.get_keys('articles:list'))
+
+
+@override_settings(PURGE_ENDPOINT = 'http://127.0.0.1:9/purge')
+class TestPurgeOnChange(TestCase):
+
+    def setUp(self):
+        commit_immediately(self)
+        self.article = Article.objects.create(title = 'Spoleto')
+        self.flush()
+
+    def tearDown(self):
+        self.flush()
+
+    def flush(self):
+        with mock.patch(DELAY_PATH) as delay:
+            purge_buffer.flush()
+        return delay
+
+    def test_edit_purges_the_object_and_its_lists(self):
+        self.article.title = 'Trevi'
+        self.article.save()
+        delay = self.flush()
+        delay.assert_called_once_with(
+            ['article-%s' % self.article.pk, 'articles-list'],
+        )
+
+    def test_comment_purges_only_the_object(self):
+        Comment.objects.create(content_object = self.article, body = 'ciao')
+        delay = self.flush()
+        delay.assert_called_once_with(['article-%s' % self.article.pk])
+
+    def test_changes_are_sent_in_one_batch(self):
+        entry = Entry.objects.create(title = 'Foligno')
+        self.article.save()
+        self.article.save()
+        delay = self.flush()
+        delay.assert_called_once_with([
+            'article-%s' % self.article.pk,
+            'articles-list',
+            'blog-list',
+            'entry-%s' % entry.pk,
+        ])
+
+    def test_purges_of_a_task_are_sent_as_it_finishes(self):
+        deltas = [('articles', 'article', self.article.pk, 1)]
+        with mock.patch(DELAY_PATH) as delay:
+            flush_comments_count.apply(args = [deltas])
+        delay.assert_called_once_with(['article-%s' % self.article.pk])
+        self.assertEqual(0, len(purge_buffer))
+
+    def test_nothing_is_queued_without_an_endpoint(self):
+        with self.settings(PURGE_ENDPOINT = None):
+            self.article.save()
+        self.assertEqual(0, len(purge_buffer))
+
+
+class TestSendPurge(SimpleTestCase):
+
+    def setUp(self):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), PurgeStubHandler)
+        server.purges = []
+        thread = threading.Thread(target = server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.server = server
+        self.endpoint = 'http://127.0.0.1:%s/purge' % server.server_port
+
+    def test_one_request_per_key_set(self):
+        with self.settings(PURGE_ENDPOINT = self.endpoint):
+            purge_surrogate_keys.apply(args = [['article-1', 'articles-list']])
+        self.assertEqual(
+            [('PURGE', '/purge', 'article-1 articles-list')],
+            self.server.purges,
+        )
+
+    def test_unreachable_endpoint_raises_for_a_retry(self):
+        with self.settings(PURGE_ENDPOINT = 'http://127.0.0.1:9/purge'):
+            with self.assertRaises(OSError):
+                send_purge(['article-1'])
@@ -0,0 +1,257 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from celery.signals import after_task_publish, before_task_publish
+
+from articles.models import Article
+from comments.tasks import increase_comments_count
+
+from ..tracing import (
+    CollectorHandler,
+    Span,
+    get_current_span,
+    parse_traceparent,
+    span,
+    span_buffer,
+    start_trace,
+)
+
+TRACE_ID = '4bf92f3577b34da6a3ce929d0e0e4736'
+PARENT_ID = '00f067aa0ba902b7'
+
+
+class TracingTestMixin:
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'spans.jsonl')
+        tracing_settings = override_settings(TRACING_EXPORT_PATH = self.path)
+        tracing_settings.enable()
+        self.addCleanup(tracing_settings.disable)
+        span_buffer.flush()
+
+    def get_spans(self):
+        span_buffer.flush()
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path) as spans_file:
+            return [json.loads(line) for line in spans_file]
+
+
+class TestTraceparent(SimpleTestCase):
+
+    def test_parse(self):
+        self.assertEqual(
+            (TRACE_ID, PARENT_ID, True),
+            parse_traceparent('00-%s-%s-01' % (TRACE_ID, PARENT_ID)),
+        )
+        self.assertEqual(
+            (TRACE_ID, PARENT_ID, False),
+            parse_traceparent('00-%s-%s-00' % (TRACE_ID, PARENT_ID)),
+        )
+
+    def test_invalid(self):
+        for value in [None, '', 'garbage', '00-%s-%s' % (TRACE_ID, PARENT_ID)]:
+            self.assertIsNone(parse_traceparent(value))
+
+
+class TestSpans(TracingTestMixin, SimpleTestCase):
+
+    def test_nothing_is_traced_without_an_exporter(self):
+        with self.settings(TRACING_EXPORT_PATH = None):
+            self.assertIsNone(start_trace('x', '00-%s-%s-01' % (
+                TRACE_ID,
+                PARENT_ID,
+            )))
+
+    def test_children_share_the_trace(self):
+        with self.settings(TRACING_SAMPLE_RATE = 1):
+            with start_trace('root') as root:
+                with span('child') as child:
+                    self.assertIs(child, get_current_span())
+        self.assertIsNone(get_current_span())
+        spans = {
+            span_dict['name']: span_dict for span_dict in self.get_spans()
+        }
+        self.assertEqual(root.trace_id, spans['child']['trace_id'])
+        self.assertEqual(root.span_id, spans['child']['parent_id'])
+        self.assertIsNone(spans['root']['parent_id'])
+
+    def test_span_outside_a_trace_is_a_no_op(self):
+        with span('orphan') as orphan:
+            self.assertIsNone(orphan)
+        self.assertEqual([], self.get_spans())
+
+    def test_errors_are_recorded(self):
+        with self.settings(TRACING_SAMPLE_RATE = 1):
+            with self.assertRaises(ValueError):
+                with start_trace('failing'):
+                    raise ValueError('boom')
+        self.assertEqual('ValueError: boom', self.get_spans()[0]['error'])
+
+    def test_publish_passes_the_trace_in_task_headers(self):
+        headers = {'id': 'task-id'}
+        with self.settings(TRACING_SAMPLE_RATE = 1):
+            with start_trace('root') as root:
+                before_task_publish.send(sender = 'some.task', headers = headers)
+                after_task_publish.send(sender = 'some.task', headers = headers)
+        trace_id, parent_id, sampled = parse_traceparent(headers['traceparent'])
+        self.assertEqual(root.trace_id, trace_id)
+        publish_span = [
+            span_dict for span_dict in self.get_spans()
+            if span_dict['name'] == 'celery.publish some.task'
+        ][0]
+        self.assertEqual(publish_span['span_id'], parent_id)
+
+
+class TestTracingMiddleware(TracingTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        in_the_past = timezone.now() - timezone.timedelta(days = 1)
+        self.article = Article.objects.create(
+            title = 'Perugia',
+            pub_date = in_the_past,
+        )
+        self.url = reverse('articles:detail', kwargs = {'pk': self.article.pk})
+
+    def test_unsampled_requests_are_not_traced(self):
+        response = self.client.get(self.url)
+        self.assertFalse(response.has_header('X-Trace-Id'))
+        self.assertEqual([], self.get_spans())
+
+    @override_settings(TRACING_SAMPLE_RATE = 1)
+    def test_request_view_template_and_query_spans(self):
+        response = self.client.get(self.url)
+        spans = self.get_spans()
+        trace_id = response['X-Trace-Id']
+        self.assertTrue(all(
+            span_dict['trace_id'] == trace_id for span_dict in spans
+        ))
+        by_name = {span_dict['name']: span_dict for span_dict in spans}
+        request_span = by_name['HTTP GET articles:detail']
+        view_span = by_name['view articles:detail']
+        render_span = by_name['template.render']
+        self.assertEqual('200', str(request_span['attributes']['http.status_code']))
+        self.assertEqual(request_span['span_id'], view_span['parent_id'])
+        self.assertEqual(view_span['span_id'], render_span['parent_id'])
+        query_spans = [
+            span_dict for span_dict in spans if span_dict['name'] == 'db.query'
+        ]
+        self.assertTrue(query_spans)
+        self.assertIn(
+            'FROM "articles_article"',
+            ' '.join(
+                query_span['attributes']['db.statement']
+                for query_span in query_spans
+            ),
+        )
+
+    def test_incoming_trace_is_continued(self):
+        response = self.client.get(
+            self.url,
+            HTTP_TRACEPARENT = '00-%s-%s-01' % (TRACE_ID, PARENT_ID),
+        )
+        self.assertEqual(TRACE_ID, response['X-Trace-Id'])
+        request_span = [
+            span_dict for span_dict in self.get_spans()
+            if span_dict['name'].startswith('HTTP ')
+        ][0]
+        self.assertEqual(PARENT_ID, request_span['parent_id'])
+
+    def test_unsampled_incoming_trace_is_not(self):
+        response = self.client.get(
+            self.url,
+            HTTP_TRACEPARENT = '00-%s-%s-00' % (TRACE_ID, PARENT_ID),
+        )
+        self.assertFalse(response.has_header('X-Trace-Id'))
+
+
+class TestTaskTracing(TracingTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.article = Article.objects.create(title = 'Assisi')
+
+    def run_task(self, **options):
+        increase_comments_count.apply(
+            args = ('articles', 'article', self.article.pk),
+            **options
+        )
+
+    def test_task_continues_the_trace_of_its_headers(self):
+        traceparent = '00-%s-%s-01' % (TRACE_ID, PARENT_ID)
+        self.run_task(headers = {'traceparent': traceparent})
+        spans = self.get_spans()
+        task_span = [
+            span_dict for span_dict in spans
+            if span_dict['name'].startswith('celery.task')
+        ][0]
+        self.assertEqual(TRACE_ID, task_span['trace_id'])
+        self.assertEqual(PARENT_ID, task_span['parent_id'])
+        self.assertEqual('SUCCESS', task_span['attributes']['celery.state'])
+        query_spans = [
+            span_dict for span_dict in spans if span_dict['name'] == 'db.query'
+        ]
+        self.assertTrue(query_spans)
+        for query_span in query_spans:
+            self.assertEqual(task_span['span_id'], query_span['parent_id'])
+
+    def test_eager_task_runs_inside_the_calling_span(self):
+        with self.settings(TRACING_SAMPLE_RATE = 1):
+            with start_trace('caller') as caller:
+                self.run_task()
+        task_span = [
+            span_dict for span_dict in self.get_spans()
+            if span_dict['name'].startswith('celery.task')
+        ][0]
+        self.assertEqual(caller.span_id, task_span['parent_id'])
+
+    def test_untraced_task(self):
+        self.run_task()
+        self.assertEqual([], self.get_spans())
+
+
+class TestCollector(TracingTestMixin, SimpleTestCase):
+
+    def test_spans_are_posted_to_the_collector(self):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), CollectorHandler)
+        server.output_path = self.path
+        thread = threading.Thread(target = server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        endpoint = 'http://127.0.0.1:%s/v1/traces' % server.server_port
+        root = Span('root', TRACE_ID, PARENT_ID, {'key': 'value'})
+        root.finish()
+        with self.settings(
+            TRACING_EXPORT_PATH = None,
+            TRACING_OTLP_ENDPOINT = endpoint,
+        ):
+            span_buffer.flush()
+        spans = self.get_spans()
+        self.assertEqual(1, len(spans))
+        self.assertEqual(root.to_dict(), spans[0])
+
+    def test_unreachable_collector_drops_spans(self):
+        root = Span('root', TRACE_ID)
+        root.finish()
+        with self.settings(
+            TRACING_EXPORT_PATH = None,
+            TRACING_OTLP_ENDPOINT = 'http://127.0.0.1:9/v1/traces',
+        ):
+            with self.assertLogs('utilities.tracing', 'WARNING'):
+                span_buffer.flush()
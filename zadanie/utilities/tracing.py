@@ -0,0 +1,424 @@
+import json
+import logging
+import random
+import re
+import secrets
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from http.server import BaseHTTPRequestHandler
+from urllib.error import URLError
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.db import connections
+
+from celery.signals import (
+    after_task_publish,
+    before_task_publish,
+    task_postrun,
+    task_prerun,
+)
+
+from .buffers import CoalescingBuffer
+from .metrics import get_route
+from .queries import fingerprint
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT_HEADER = 'traceparent'
+TRACEPARENT_RE = re.compile(
+    r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$',
+)
+
+_state = threading.local()
+_export_lock = threading.Lock()
+
+
+def get_stack():
+    stack = getattr(_state, 'stack', None)
+    if stack is None:
+        stack = _state.stack = []
+    return stack
+
+
+def get_current_span():
+    stack = get_stack()
+    return stack[-1] if stack else None
+
+
+def is_enabled():
+    return bool(settings.TRACING_EXPORT_PATH or settings.TRACING_OTLP_ENDPOINT)
+
+
+def parse_traceparent(value):
+    """``(trace_id, parent_id, sampled)`` of a W3C traceparent, or None."""
+    match = TRACEPARENT_RE.match((value or '').strip().lower())
+    if match is None:
+        return None
+    trace_id, parent_id, flags = match.groups()
+    return trace_id, parent_id, bool(int(flags, 16) & 1)
+
+
+class Span:
+    """A timed operation of a trace; finish() hands it to the exporter."""
+
+    def __init__(self, name, trace_id, parent_id = None, attributes = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.error = None
+        self.start = time.time_ns()
+        self.end = None
+        get_stack().append(self)
+
+    @property
+    def traceparent(self):
+        return '00-%s-%s-01' % (self.trace_id, self.span_id)
+
+    def finish(self, error = None):
+        if self.end is not None:
+            return
+        self.end = time.time_ns()
+        if error is not None:
+            self.error = '%s: %s' % (type(error).__name__, error)
+        stack = get_stack()
+        if self in stack:
+            stack.remove(self)
+        span_buffer.add(self.span_id, self.to_dict())
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start_ns': self.start,
+            'end_ns': self.end,
+            'duration_ms': (self.end - self.start) / 1000000,
+            'attributes': self.attributes,
+            'error': self.error,
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.finish(error = exc_value)
+
+
+def start_trace(name, traceparent = None, **attributes):
+    """Root span of a request or task, or None when it is not traced.
+
+    A sampled incoming traceparent is always continued; otherwise a new
+    trace starts at TRACING_SAMPLE_RATE.
+    """
+    if not is_enabled():
+        return None
+    parent = parse_traceparent(traceparent)
+    if parent is not None:
+        trace_id, parent_id, sampled = parent
+        if not sampled:
+            return None
+    else:
+        rate = settings.TRACING_SAMPLE_RATE
+        if rate <= 0 or random.random() >= rate:
+            return None
+        trace_id = secrets.token_hex(16)
+        parent_id = None
+    return Span(name, trace_id, parent_id, attributes)
+
+
+def start_span(name, **attributes):
+    """Child of the current span, or None outside of a traced unit."""
+    current = get_current_span()
+    if current is None:
+        return None
+    return Span(name, current.trace_id, current.span_id, attributes)
+
+
+@contextmanager
+def span(name, **attributes):
+    child = start_span(name, **attributes)
+    if child is None:
+        yield None
+        return
+    with child:
+        yield child
+
+
+def trace_queries():
+    """Give every query of the current unit a span, once per thread."""
+    stack = ExitStack()
+    if getattr(_state, 'tracing_queries', False):
+        return stack
+    _state.tracing_queries = True
+    stack.callback(setattr, _state, 'tracing_queries', False)
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(trace_query))
+    return stack
+
+
+def trace_query(execute, sql, params, many, context):
+    attributes = {
+        'db.statement': fingerprint(sql),
+        'db.alias': context['connection'].alias,
+    }
+    with span('db.query', **attributes):
+        return execute(sql, params, many, context)
+
+
+def to_otlp(spans):
+    """Spans as an OTLP/HTTP JSON ExportTraceServiceRequest."""
+    def to_attributes(attributes):
+        return [
+            {'key': key, 'value': {'stringValue': str(value)}}
+            for key, value in sorted(attributes.items())
+        ]
+
+    otlp_spans = []
+    for span_dict in spans:
+        otlp_span = {
+            'traceId': span_dict['trace_id'],
+            'spanId': span_dict['span_id'],
+            'name': span_dict['name'],
+            'startTimeUnixNano': str(span_dict['start_ns']),
+            'endTimeUnixNano': str(span_dict['end_ns']),
+            'attributes': to_attributes(span_dict['attributes']),
+            'status': {'code': 2 if span_dict['error'] else 1},
+        }
+        if span_dict['parent_id']:
+            otlp_span['parentSpanId'] = span_dict['parent_id']
+        if span_dict['error']:
+            otlp_span['status']['message'] = span_dict['error']
+        otlp_spans.append(otlp_span)
+    service_name = {'service.name': settings.TRACING_SERVICE_NAME}
+    return {
+        'resourceSpans': [{
+            'resource': {'attributes': to_attributes(service_name)},
+            'scopeSpans': [{
+                'scope': {'name': __name__},
+                'spans': otlp_spans,
+            }],
+        }],
+    }
+
+
+def from_otlp(payload):
+    """Flat span dicts of an OTLP/HTTP JSON request."""
+    spans = []
+    for resource_spans in payload.get('resourceSpans', []):
+        for scope_spans in resource_spans.get('scopeSpans', []):
+            for otlp_span in scope_spans.get('spans', []):
+                start = int(otlp_span['startTimeUnixNano'])
+                end = int(otlp_span['endTimeUnixNano'])
+                spans.append({
+                    'trace_id': otlp_span['traceId'],
+                    'span_id': otlp_span['spanId'],
+                    'parent_id': otlp_span.get('parentSpanId'),
+                    'name': otlp_span['name'],
+                    'start_ns': start,
+                    'end_ns': end,
+                    'duration_ms': (end - start) / 1000000,
+                    'attributes': {
+                        attribute['key']: attribute['value']['stringValue']
+                        for attribute in otlp_span.get('attributes', [])
+                    },
+                    'error': otlp_span.get('status', {}).get('message'),
+                })
+    return spans
+
+
+def write_spans(spans, path):
+    with _export_lock:
+        with open(path, 'a') as spans_file:
+            for span_dict in spans:
+                spans_file.write(json.dumps(span_dict) + '\n')
+
+
+def export_spans(items):
+    spans = sorted(
+        items.values(),
+        key = lambda span_dict: span_dict['start_ns'],
+    )
+    if settings.TRACING_EXPORT_PATH:
+        write_spans(spans, settings.TRACING_EXPORT_PATH)
+    if settings.TRACING_OTLP_ENDPOINT:
+        request = Request(
+            settings.TRACING_OTLP_ENDPOINT,
+            data = json.dumps(to_otlp(spans)).encode(),
+            headers = {'Content-Type': 'application/json'},
+        )
+        try:
+            urlopen(request, timeout = 5).close()
+        except (OSError, URLError) as error:
+            logger.warning(
+                'Dropped %s spans, the collector failed: %s',
+                len(spans),
+                error,
+            )
+
+
+span_buffer = CoalescingBuffer(
+    flush_callback = export_spans,
+    merge = lambda old, new: new,
+    interval = settings.TRACING_FLUSH_INTERVAL,
+    max_size = settings.TRACING_FLUSH_SIZE,
+)
+
+
+class TracingMiddleware:
+    """Trace sampled requests, and requests continuing a sampled trace.
+
+    It goes first in MIDDLEWARE. The request span covers all of the
+    middleware, every query gets a span, and its process_template_response
+    runs right before rendering, which it wraps in a span of its own.
+    The trace id is sent back in X-Trace-Id.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_span = start_trace(
+            'HTTP %s' % request.method,
+            traceparent = request.META.get('HTTP_TRACEPARENT'),
+            **{
+                'http.method': request.method,
+                'http.target': request.path,
+            }
+        )
+        if request_span is None:
+            return self.get_response(request)
+        try:
+            with request_span:
+                with trace_queries():
+                    response = self.get_response(request)
+                route = get_route(request)
+                request_span.name = 'HTTP %s %s' % (request.method, route)
+                request_span.attributes['http.route'] = route
+                request_span.attributes['http.status_code'] = (
+                    response.status_code
+                )
+        finally:
+            # Drop spans a failed render left open.
+            _state.stack = []
+        response['X-Trace-Id'] = request_span.trace_id
+        return response
+
+    def process_template_response(self, request, response):
+        template_name = response.template_name
+        if isinstance(template_name, (list, tuple)):
+            template_name = ', '.join(template_name)
+        render_span = start_span(
+            'template.render',
+            **{'template.name': template_name},
+        )
+        if render_span is not None:
+            response.add_post_render_callback(
+                lambda response: render_span.finish(),
+            )
+        return response
+
+
+class ViewTracingMiddleware:
+    """Span of URL resolution, the view and its rendering.
+
+    It goes after the other middleware, so the time between this span
+    and the request span is what the middleware cost.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with span('django.view') as view_span:
+            response = self.get_response(request)
+            if view_span is not None:
+                view_span.name = 'view %s' % get_route(request)
+        return response
+
+
+@before_task_publish.connect
+def start_publish_span(sender = None, headers = None, **kwargs):
+    if headers is None:
+        return
+    publish_span = start_span(
+        'celery.publish %s' % sender,
+        **{'celery.task_name': sender},
+    )
+    if publish_span is not None:
+        headers[TRACEPARENT_HEADER] = publish_span.traceparent
+        _state.publishing = (headers.get('id'), publish_span)
+
+
+@after_task_publish.connect
+def finish_publish_span(headers = None, **kwargs):
+    task_id, publish_span = getattr(_state, 'publishing', (None, None))
+    if publish_span is None or task_id != (headers or {}).get('id'):
+        return
+    _state.publishing = (None, None)
+    publish_span.finish()
+
+
+def get_task_traceparent(task):
+    traceparent = getattr(task.request, TRACEPARENT_HEADER, None)
+    if traceparent is None:
+        headers = getattr(task.request, 'headers', None) or {}
+        traceparent = headers.get(TRACEPARENT_HEADER)
+    return traceparent
+
+
+@task_prerun.connect
+def start_task_span(task_id = None, task = None, **kwargs):
+    name = 'celery.task %s' % task.name
+    attributes = {'celery.task_name': task.name, 'celery.task_id': task_id}
+    traceparent = get_task_traceparent(task)
+    if traceparent is None and get_current_span() is not None:
+        # An eager task runs inside the span that called it.
+        task_span = start_span(name, **attributes)
+    else:
+        task_span = start_trace(name, traceparent, **attributes)
+    if task_span is not None:
+        _state.task = (task_id, task_span, trace_queries())
+
+
+@task_postrun.connect
+def finish_task_span(task_id = None, state = None, **kwargs):
+    traced = getattr(_state, 'task', None)
+    if traced is None or traced[0] != task_id:
+        return
+    _state.task = None
+    running_task_id, task_span, queries = traced
+    queries.close()
+    task_span.attributes['celery.state'] = state
+    task_span.finish()
+
+
+class CollectorHandler(BaseHTTPRequestHandler):
+    """Stand-in for an OTLP/HTTP collector that appends spans to JSONL.
+
+    The server it runs in needs an ``output_path`` attribute.
+    """
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            payload = json.loads(self.rfile.read(length))
+            spans = from_otlp(payload)
+        except (ValueError, KeyError, TypeError):
+            self.send_response(400)
+            self.end_headers()
+            return
+        write_spans(spans, self.server.output_path)
+        body = b'{}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
@@ -11,5 +11,5 @@ def hundred_years_from_now():
 def yesterday():
     now = timezone.now()
     one_day = timezone.timedelta(days = 1)
-    yesterday =  now - one_day
+    yesterday = now - one_day
     return yesterday
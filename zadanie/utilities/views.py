@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse
+from django.middleware.csrf import get_token
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.cache import never_cache
+from django.views.decorators.csrf import ensure_csrf_cookie
+
+from .metrics import collect, render
+
+
+class PublishedDetailMixin:
+    """Serve the page of a published object with two prebuilt views.
+
+    GET goes to ``display_view_class`` and POST to
+    ``add_comment_view_class``. Their view functions are built once per
+    class instead of calling as_view() on every request, and each of
+    them looks the object up only once.
+    """
+    display_view_class = None
+    add_comment_view_class = None
+
+    @classmethod
+    def get_handlers(cls):
+        handlers = cls.__dict__.get('_handlers')
+        if handlers is None:
+            handlers = {
+                'get': cls.display_view_class.as_view(),
+                'post': cls.add_comment_view_class.as_view(),
+            }
+            cls._handlers = handlers
+        return handlers
+
+    def get(self, request, *args, **kwargs):
+        handler = self.get_handlers()['get']
+        return handler(request, *args, **kwargs)
+
+    def post(self, request, *args, **kwargs):
+        handler = self.get_handlers()['post']
+        return handler(request, *args, **kwargs)
+
+
+class MetricsView(View):
+    """Request metrics of all workers in the Prometheus text format."""
+
+    def get(self, request, *args, **kwargs):
+        allowed_ips = settings.METRICS_ALLOWED_IPS
+        if allowed_ips and request.META.get('REMOTE_ADDR') not in allowed_ips:
+            raise Http404
+        return HttpResponse(
+            render(collect()),
+            content_type = 'text/plain; version=0.0.4; charset=utf-8',
+        )
+
+
+@method_decorator(never_cache, name = 'get')
+@method_decorator(ensure_csrf_cookie, name = 'get')
+class CsrfTokenView(View):
+    """The visitor's CSRF token, for forms on pages shared by everyone."""
+
+    def get(self, request, *args, **kwargs):
+        return JsonResponse({'token': get_token(request)})
@@ -11,7 +11,7 @@ https://docs.djangoproject.com/en/2.1/ref/settings/
 """
 
 import os
-from decouple import config
+from decouple import Csv, config
 
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
@@ -38,6 +38,7 @@ DJANGO_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
+    'django.contrib.postgres',
     'django.contrib.sites',
     'django.contrib.staticfiles',
 ]
@@ -49,7 +50,6 @@ THIRD_PARTY_APPS = [
     'allauth.socialaccount.providers.facebook',
     'allauth.socialaccount.providers.twitter',
     'coverage',
-    'debug_toolbar',
     'haystack',
     'widget_tweaks',
 ]
@@ -58,7 +58,9 @@ LOCAL_APPS = [
     'articles.apps.ArticlesConfig',
     'blog.apps.BlogConfig',
     'comments.apps.CommentsConfig',
+    'search.apps.SearchConfig',
     'users.apps.UsersConfig',
+    'utilities.apps.UtilitiesConfig',
 ]
 
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
@@ -66,8 +68,27 @@ INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 MIDDLEWARE = [
 
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
+    'utilities.tracing.TracingMiddleware',
+    'utilities.metrics.MetricsMiddleware',
+    'utilities.queries.QueryObserverMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'utilities.routers.PrimaryPinMiddleware',
+    'utilities.pipeline.RouteAwarePipelineMiddleware',
+    'utilities.tracing.ViewTracingMiddleware',
+    'utilities.profiling.ProfilingMiddleware',
+]
+
+# utilities.pipeline.RouteAwarePipelineMiddleware runs cookie-less
+# anonymous GETs of FAST_PATH_ROUTES through FAST_PATH_MIDDLEWARE, which
+# leaves out sessions, CSRF, auth and messages, and marks them public
+# with this max-age; every other request goes through
+# FULL_PATH_MIDDLEWARE. A session or messages cookie (named by
+# SESSION_COOKIE_NAME and MESSAGE_STORAGE) or one in
+# FAST_PATH_BLOCKING_COOKIES means the full path. Fast responses keep
+# Vary: Cookie, since pages show who is signed in.
+# Detail pages render no CSRF token; their comment forms fetch it from the
+# uncached csrf-token view, and comment POSTs take the full path.
+FULL_PATH_MIDDLEWARE = [
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -75,6 +96,27 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
+FAST_PATH_MIDDLEWARE = [
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+FAST_PATH_ROUTES = [
+    'home',
+    'articles:list',
+    'articles:detail',
+    'articles:comments',
+    'blog:entries',
+    'blog:entry-detail',
+    'blog:entry-comments',
+    'search:search',
+    'search:suggest',
+]
+FAST_PATH_BLOCKING_COOKIES = []
+FAST_PATH_MAX_AGE = 0
+
+# The admin looks for its middleware in MIDDLEWARE only; it runs from
+# FULL_PATH_MIDDLEWARE, which every admin request goes through.
+SILENCED_SYSTEM_CHECKS = ['admin.E408', 'admin.E409', 'admin.E410']
 
 ROOT_URLCONF = 'zadanie.urls'
 
@@ -106,9 +148,94 @@ DATABASES = {
         'NAME': config('DATABASE_NAME'),
         'USER': config('DATABASE_USER'),
         'PASSWORD': config('DATABASE_PASSWORD'),
+        'OPTIONS': {
+            'connect_timeout': config(
+                'DATABASE_CONNECT_TIMEOUT',
+                default=3,
+                cast=int,
+            ),
+        },
     }
 }
 
+# After a connection error the database is taken for down for this many
+# seconds: cached list and detail pages are served stale without trying
+# it (utilities.outages) and comment POSTs get a 503 with Retry-After.
+DATABASE_UNAVAILABLE_SECONDS = 5
+
+# Every host listed in DATABASE_REPLICA_HOSTS becomes a replica_<n> alias
+# of the default database; utilities.routers.ReplicaRouter reads the
+# published listings and comment pages marked by read_from_replica() from
+# them. Reads that feed a write stay on the primary.
+DATABASE_REPLICA_HOSTS = config(
+    'DATABASE_REPLICA_HOSTS',
+    default='',
+    cast=Csv(),
+)
+
+REPLICA_DATABASES = []
+for number, host in enumerate(DATABASE_REPLICA_HOSTS):
+    alias = 'replica_%s' % number
+    DATABASES[alias] = dict(
+        DATABASES['default'],
+        HOST=host,
+        TEST={'MIRROR': 'default'},
+    )
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ['utilities.routers.ReplicaRouter']
+
+# After a write the visitor reads from the primary for this many seconds.
+READ_YOUR_WRITES_SECONDS = 5
+
+
+# Cache
+# https://docs.djangoproject.com/en/2.1/topics/cache/
+
+# Every web and Celery process has to share the cache: versions bumped
+# by one have to reach the others (utilities.checks). The process-local
+# default is only fit for development and tests.
+
+CACHES = {
+    'default': {
+        'BACKEND': config(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': config('CACHE_LOCATION', default='zadanie'),
+    }
+}
+
+# Cached pages are invalidated through version keys (utilities.cache).
+# A page is fresh for PAGE_CACHE_TIMEOUT seconds and kept stale for
+# PAGE_CACHE_STALE_TIMEOUT more. One worker at a time regenerates a
+# page, holding a lock for at most PAGE_CACHE_LOCK_TIMEOUT seconds, while
+# the others serve the stale page; with nothing cached they wait for it
+# up to PAGE_CACHE_LOCK_WAIT seconds. Fresh pages are regenerated early
+# with a probability that grows near expiry, scaled by the beta. The
+# stale page is also what visitors get while the database is down, so
+# it is kept for a long time.
+PAGE_CACHE_TIMEOUT = 60 * 60
+PAGE_CACHE_STALE_TIMEOUT = 24 * 60 * 60
+PAGE_CACHE_LOCK_TIMEOUT = 10
+PAGE_CACHE_LOCK_WAIT = 2
+PAGE_CACHE_LOCK_POLL_INTERVAL = 0.05
+PAGE_CACHE_EARLY_REFRESH_BETA = 1.0
+
+# Pages of articles, entries and their lists carry surrogate keys
+# (article-42, entry-7, articles-list, blog-list) in this header. When
+# they change, their keys are collected for PURGE_FLUSH_INTERVAL seconds
+# (or up to PURGE_FLUSH_SIZE keys) and a Celery task sends one
+# PURGE_METHOD request per batch, with the keys in the same header, to
+# PURGE_ENDPOINT. Without an endpoint nothing is purged. Celery tasks
+# send the keys they queued as soon as they finish.
+SURROGATE_KEY_HEADER = config('SURROGATE_KEY_HEADER', default='Surrogate-Key')
+PURGE_ENDPOINT = config('PURGE_ENDPOINT', default=None)
+PURGE_METHOD = config('PURGE_METHOD', default='PURGE')
+PURGE_TIMEOUT = 5
+PURGE_FLUSH_INTERVAL = 1
+PURGE_FLUSH_SIZE = 256
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
@@ -154,6 +281,14 @@ STATIC_URL = '/static/'
 # Debug config
 # ----------------
 
+# The toolbar is only installed in development.
+if DEBUG:
+    INSTALLED_APPS += ['debug_toolbar']
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index('django.middleware.security.SecurityMiddleware'),
+        'debug_toolbar.middleware.DebugToolbarMiddleware',
+    )
+
 DEBUG_TOOLBAR_CONFIG = {
     'DISABLE_PANELS': [
         'debug_toolbar.panels.redirects.RedirectsPanel',
@@ -172,6 +307,100 @@ INTERNAL_IPS = ['127.0.0.1', '10.0.2.2']
 
 CELERY_TASK_ALWAYS_EAGER = False
 
+# Articles and entries whose pub_date has passed are flipped to
+# is_published by these jobs, every PUBLISH_DUE_INTERVAL seconds.
+PUBLISH_DUE_INTERVAL = 60
+
+CELERY_BEAT_SCHEDULE = {
+    'publish-due-articles': {
+        'task': 'articles.tasks.publish_due_articles',
+        'schedule': PUBLISH_DUE_INTERVAL,
+    },
+    'publish-due-entries': {
+        'task': 'blog.tasks.publish_due_entries',
+        'schedule': PUBLISH_DUE_INTERVAL,
+    },
+}
+
+# ----------------
+# Comments
+# ----------------
+
+# New comments are counted in memory and written to comments_count in
+# one batch per interval (seconds) or once this many objects are pending.
+COMMENTS_COUNT_FLUSH_INTERVAL = 2
+COMMENTS_COUNT_FLUSH_SIZE = 500
+# recount_comments leaves alone objects commented in the last this many
+# seconds, whose counts may still be waiting in a buffer or a queued task.
+COMMENTS_COUNT_SETTLE_SECONDS = 60
+
+# Number of comments shown on a detail page and returned by "load more".
+COMMENTS_PAGE_SIZE = 20
+
+# ----------------
+# Metrics
+# ----------------
+
+# utilities.metrics.MetricsMiddleware buffers samples in memory and adds
+# them to the totals of the process every interval (seconds) or once
+# this many series are pending. With a directory, every worker writes
+# its totals there and /metrics serves the sum over all of them.
+METRICS_DIRECTORY = config('METRICS_DIRECTORY', default=None)
+METRICS_FLUSH_INTERVAL = 10
+METRICS_FLUSH_SIZE = 1000
+
+# utilities.queries fingerprints every SQL statement of this share of
+# requests and Celery tasks; "manage.py query_report" shows the totals.
+# A statement run more than QUERY_REPEAT_THRESHOLD times in one request
+# is reported as a possible N+1 pattern.
+QUERY_OBSERVER_SAMPLE_RATE = config(
+    'QUERY_OBSERVER_SAMPLE_RATE',
+    default=0.01,
+    cast=float,
+)
+QUERY_REPEAT_THRESHOLD = 10
+QUERY_SLOW_SECONDS = 0.1
+
+# Addresses allowed to read /metrics; everyone when empty.
+METRICS_ALLOWED_IPS = config('METRICS_ALLOWED_IPS', default='', cast=Csv())
+
+# ----------------
+# Profiling
+# ----------------
+
+# utilities.profiling.ProfilingMiddleware runs this share of requests
+# under cProfile, as well as requests sending PROFILING_HEADER with a
+# token from "manage.py profiling_token". Celery tasks named in
+# PROFILING_TASKS are sampled at the same rate. Profiles are written as
+# pstats or collapsed stacks (for flamegraph.pl) to the directory, whose
+# oldest files are removed beyond PROFILING_MAX_BYTES. Without a
+# directory nothing is profiled.
+PROFILING_DIRECTORY = config('PROFILING_DIRECTORY', default=None)
+PROFILING_SAMPLE_RATE = config('PROFILING_SAMPLE_RATE', default=0, cast=float)
+PROFILING_FORMAT = config('PROFILING_FORMAT', default='pstats')
+PROFILING_HEADER = 'X-Profile'
+PROFILING_TOKEN_MAX_AGE = 3600
+PROFILING_MAX_BYTES = 100 * 1024 * 1024
+PROFILING_TASKS = config('PROFILING_TASKS', default='', cast=Csv())
+
+# ----------------
+# Tracing
+# ----------------
+
+# utilities.tracing traces this share of requests, and every request or
+# task continuing a sampled W3C traceparent, with spans for the
+# middleware, the view, templates, queries and Celery publish and run.
+# Finished spans are appended to TRACING_EXPORT_PATH as JSON lines
+# and/or POSTed to an OTLP/HTTP collector ("manage.py trace_collector"
+# is a local stand-in) every interval (seconds) or once this many are
+# pending. Nothing is traced while neither is set.
+TRACING_SAMPLE_RATE = config('TRACING_SAMPLE_RATE', default=0, cast=float)
+TRACING_EXPORT_PATH = config('TRACING_EXPORT_PATH', default=None)
+TRACING_OTLP_ENDPOINT = config('TRACING_OTLP_ENDPOINT', default=None)
+TRACING_FLUSH_INTERVAL = 5
+TRACING_FLUSH_SIZE = 1000
+TRACING_SERVICE_NAME = 'zadanie'
+
 # ----------------
 # Django - Allauth
 # ----------------
@@ -245,6 +474,49 @@ HAYSTACK_CONNECTIONS = {
     },
 }
 
+# reindex_search sends this many objects per batch to the haystack
+# backend from this many worker processes.
+SEARCH_REINDEX_BATCH_SIZE = 500
+SEARCH_REINDEX_WORKERS = 4
+
+# reindex_search keeps the start of its last successful run in this file
+# and only sends objects changed since then on the next run. The default
+# var/ directory is created on the first run and ignored by git.
+SEARCH_REINDEX_STATE_PATH = config(
+    'SEARCH_REINDEX_STATE_PATH',
+    default=os.path.join(BASE_DIR, 'var', 'last-reindex'),
+)
+
+# ----------------
+# Search
+# ----------------
+
+# 'postgres' serves /search/ from the search_vector columns of Article
+# and Entry, 'solr' from the haystack connection above.
+SEARCH_BACKEND = config('SEARCH_BACKEND', default='postgres')
+
+# Text search configuration used to build and to query search_vector.
+SEARCH_CONFIG = 'english'
+
+# With Solr, saved and deleted articles and entries are queued and sent
+# to the index in one batch per interval (seconds) or once this many
+# objects are pending.
+if SEARCH_BACKEND == 'solr':
+    HAYSTACK_SIGNAL_PROCESSOR = 'search.processors.QueuedSignalProcessor'
+
+SEARCH_INDEX_FLUSH_INTERVAL = 2
+SEARCH_INDEX_FLUSH_SIZE = 500
+
+# /search/suggest/ returns at most SUGGEST_LIMIT titles for fragments of
+# at least SUGGEST_MIN_LENGTH characters and caches every fragment for
+# SUGGEST_CACHE_TIMEOUT seconds, which is how long a new title may take
+# to be suggested. Only SUGGEST_CANDIDATE_FACTOR times the limit of
+# matching titles per model are ranked.
+SUGGEST_CACHE_TIMEOUT = 60
+SUGGEST_CANDIDATE_FACTOR = 5
+SUGGEST_LIMIT = 8
+SUGGEST_MIN_LENGTH = 2
+
 # ----------------
 # Users
 # ----------------
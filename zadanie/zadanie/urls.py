@@ -21,6 +21,7 @@ from django.views.generic import TemplateView
 
 from django_registration.backends.activation.views import RegistrationView
 from users.forms import CustomUserForm
+from utilities.views import CsrfTokenView, MetricsView
 
 
 urlpatterns = [
@@ -39,7 +40,17 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('articles/', include('articles.urls', namespace = 'articles')),
     path('blog/', include('blog.urls', namespace = 'blog')),
-    path('search/', include('haystack.urls')),
+    path('metrics', MetricsView.as_view(), name = 'metrics'),
+    path('csrf-token/', CsrfTokenView.as_view(), name = 'csrf-token'),
+]
+
+if settings.SEARCH_BACKEND == 'solr':
+    search_urls = 'search.solr_urls'
+else:
+    search_urls = 'search.urls'
+
+urlpatterns += [
+    path('search/', include(search_urls, namespace = 'search')),
 ]
 
 if settings.DEBUG: